@@ -9,19 +9,26 @@ local level, but this will at least provide a foundation.
 
 import argparse
 import logging
-from .conductor import SubmissionConductor
-from .pipeline_interface import PipelineInterface
-from .project import Project
+from ._lazy import lazy_attributes
 from ._version import __version__
+from .const import PROJECT_FILENAME, STATUS_FLAGS
 from .parser_types import *
 
-# Not used here, but make this the main import interface between peppy and
-# looper, so that other modules within this package need not worry about
-# the locations of some of the peppy declarations. Effectively, concentrate
-# the connection between peppy and looper here, to the extent possible.
-from peppy import \
-    FLAGS, IMPLICATIONS_DECLARATION, SAMPLE_INDEPENDENT_PROJECT_SECTIONS, \
-    SAMPLE_NAME_COLNAME
+# The main classes are imported on first use, so that the command-line
+# interface can start without importing peppy, and pandas with it.
+#
+# Make this the main import interface between peppy and looper, so that
+# other modules within this package need not worry about the locations of
+# some of the peppy declarations. Effectively, concentrate the connection
+# between peppy and looper here, to the extent possible.
+__getattr__ = lazy_attributes(__name__, {
+    "SubmissionConductor": ".conductor",
+    "PipelineInterface": ".pipeline_interface",
+    "Project": ".project",
+    "FLAGS": "peppy",
+    "IMPLICATIONS_DECLARATION": "peppy",
+    "SAMPLE_INDEPENDENT_PROJECT_SECTIONS": "peppy",
+    "SAMPLE_NAME_COLNAME": "peppy"})
 
 __classes__ = ["PipelineInterface"]
 __all__ = ["Project", "PipelineInterface", "SubmissionConductor"]
@@ -113,7 +120,8 @@ def build_parser():
             "destroy": "Remove all files of the project.",
             "check": "Checks flag status of current runs.",
             "clean": "Runs clean scripts to remove intermediate "
-                     "files of already processed jobs."}
+                     "files of already processed jobs.",
+            "cancel": "Cancel the scheduler's jobs for samples."}
 
     subparsers = parser.add_subparsers(dest="command")
 
@@ -133,10 +141,110 @@ def build_parser():
                      "flag file exists marking the run (e.g. as "
                      "'running' or 'failed'). Set this option to ignore flags "
                      "and submit the runs anyway. Default=False")
+        subparser.add_argument(
+                "--ignore-queued", dest="ignore_queued", default=False,
+                action=_StoreBoolActionType, type=html_checkbox(checked=False),
+                help="Don't ask the scheduler for the jobs it has, and submit "
+                     "samples whose latest jobs are still queued or running. "
+                     "By default, the scheduler is queried once per run "
+                     "(squeue or qstat), except for a dry run, and such "
+                     "samples are skipped. Default=False")
         subparser.add_argument(
                 "-t", "--time-delay", dest="time_delay",
                 type=html_range(min_val=0, max_val=30, value=0), default=0,
                 help="Time delay in seconds between job submissions.")
+        subparser.add_argument(
+                "--submit-workers", dest="submit_workers",
+                type=html_range(min_val=1, max_val=32, value=1), default=1,
+                help="Number of job submissions to run concurrently; the time "
+                     "delay applies across all of them. Default=1")
+        subparser.add_argument(
+                "--async-submit", dest="async_submit", default=False,
+                action=_StoreBoolActionType, type=html_checkbox(checked=False),
+                help="Determine settings for, write and submit jobs in "
+                     "asynchronous stages, overlapping with the processing of "
+                     "later samples; requires Python 3.5 or later. "
+                     "Default: False")
+        subparser.add_argument(
+                "--array", dest="array", default=False,
+                action=_StoreBoolActionType, type=html_checkbox(checked=False),
+                help="Submit each pipeline's jobs as the tasks of a single "
+                     "array job (SLURM sbatch or SGE qsub), one task per job "
+                     "that would otherwise be submitted. Default: False")
+        subparser.add_argument(
+                "--array-size", dest="array_size",
+                type=html_range(min_val=1, max_val=100000, value=1000),
+                default=1000,
+                help="Maximum number of tasks in an array job. Default=1000")
+        subparser.add_argument(
+                "--pack", dest="pack", choices=["ffd", "lpt"], default=None,
+                help="With --lumpn or --lump, hold every sample until all "
+                     "have been considered, then pack them into jobs: 'ffd' "
+                     "(first-fit decreasing) fills each job as fully as the "
+                     "limits allow, largest inputs first; 'lpt' (longest "
+                     "processing time) balances total input size over as "
+                     "few jobs as the limits allow. Default: jobs are "
+                     "closed in sample order as soon as a limit's reached")
+        subparser.add_argument(
+                "--predict-resources", dest="predict_resources",
+                default=False, action=_StoreBoolActionType,
+                type=html_checkbox(checked=False),
+                help="Request the memory and time predicted for each job "
+                     "from the input sizes and resource use of the "
+                     "pipeline's past runs, in place of those of its "
+                     "resource package. Runs are recorded by run, and their "
+                     "resource use is filled in by summarize, and by run "
+                     "or rerun with this option. Default: False")
+        subparser.add_argument(
+                "--write-workers", dest="write_workers",
+                type=html_range(min_val=1, max_val=32, value=4), default=4,
+                help="Number of sample YAML files to write concurrently. "
+                     "Default=4")
+        subparser.add_argument(
+                "--shared-project-yaml", dest="shared_project_yaml",
+                default=False, action=_StoreBoolActionType,
+                type=html_checkbox(checked=False),
+                help="Write project data once, to {}, and reference that "
+                     "file from each sample YAML file rather than embedding "
+                     "the data. Default: False".format(PROJECT_FILENAME))
+        subparser.add_argument(
+                "--reimport-pipelines", dest="reimport_pipelines",
+                default=False, action=_StoreBoolActionType,
+                type=html_checkbox(checked=False),
+                help="Import each pipeline module to find its Sample subtype, "
+                     "disregarding where previous runs found it. "
+                     "Default: False")
+        subparser.add_argument(
+                "--stream", dest="stream", default=False,
+                action=_StoreBoolActionType, type=html_checkbox(checked=False),
+                help="Build samples a chunk at a time, as they're processed, "
+                     "so that memory use doesn't grow with the number of "
+                     "samples. Default: False")
+        subparser.add_argument(
+                "--chunk-size", dest="chunk_size",
+                type=html_range(min_val=1, max_val=100000, value=1000),
+                default=1000,
+                help="Number of samples to build at a time with --stream. "
+                     "Default=1000")
+        subparser.add_argument(
+                "--watch", dest="watch", default=False,
+                action=_StoreBoolActionType, type=html_checkbox(checked=False),
+                help="Keep running after the samples are processed, and "
+                     "submit each sample that's added or changed in the "
+                     "sample table, or whose missing inputs appear, until "
+                     "interrupted. Default: False")
+        subparser.add_argument(
+                "--watch-interval", dest="watch_interval",
+                type=html_range(min_val=1, max_val=3600, value=60), default=60,
+                help="Seconds between checks of the sample table and of "
+                     "missing inputs with --watch. Default=60")
+        subparser.add_argument(
+                "--flush-timeout", dest="flush_timeout",
+                type=html_range(min_val=0, max_val=86400, value=600),
+                default=600,
+                help="Seconds that a sample may wait with --watch in a job "
+                     "that's not yet full before the job is submitted "
+                     "anyway. Default=600")
         subparser.add_argument(
                 "--allow-duplicate-names", default=False,
                 action=_StoreBoolActionType, type=html_checkbox(checked=False),
@@ -175,14 +283,39 @@ def build_parser():
     destroy_subparser = add_subparser("destroy")
     check_subparser = add_subparser("check")
     clean_subparser = add_subparser("clean")
+    cancel_subparser = add_subparser("cancel")
+
+    summarize_subparser.add_argument(
+            "--parse-workers", dest="parse_workers",
+            type=html_range(min_val=1, max_val=32, value=1), default=1,
+            help="Number of processes with which to read samples' objects "
+                 "files. Default=1")
+    summarize_subparser.add_argument(
+            "--report-workers", dest="report_workers",
+            type=html_range(min_val=1, max_val=32, value=1), default=1,
+            help="Number of processes with which to render sample and "
+                 "object report pages. Default=1")
+    summarize_subparser.add_argument(
+            "--full", action=_StoreBoolActionType, default=False,
+            type=html_checkbox(checked=False),
+            help="Rebuild the whole summary, disregarding what was cached "
+                 "from previous summaries. Default=False")
 
     check_subparser.add_argument(
             "-A", "--all-folders", action=_StoreBoolActionType, default=False, type=html_checkbox(checked=False),
             help="Check status for all project's output folders, not just "
                  "those for samples specified in the config file used. Default=False")
     check_subparser.add_argument(
-            "-F", "--flags", nargs='*', default=FLAGS, type=html_select(choices=FLAGS),
+            "-F", "--flags", nargs='*', default=STATUS_FLAGS,
+            type=html_select(choices=STATUS_FLAGS),
             help="Check on only these flags/status values.")
+    check_subparser.add_argument(
+            "--scheduler", action=_StoreBoolActionType, default=False,
+            type=html_checkbox(checked=False),
+            help="Also query the cluster scheduler (squeue or qstat), once, "
+                 "for the state of the project's jobs: queued, running, or "
+                 "lost (flagged as running but no longer scheduled). "
+                 "Default=False")
 
     destroy_subparser.add_argument(
             "--force-yes", action=_StoreBoolActionType, default=False, type=html_checkbox(checked=False),
@@ -194,9 +327,15 @@ def build_parser():
             help="Provide upfront confirmation of cleaning intent, "
                  "to skip console query.  Default=False")
 
+    cancel_subparser.add_argument(
+            "--force-yes", action=_StoreBoolActionType, default=False, type=html_checkbox(checked=False),
+            help="Provide upfront confirmation of cancellation intent, "
+                 "to skip console query.  Default=False")
+
     # Common arguments
     for subparser in [run_subparser, rerun_subparser, summarize_subparser,
-                      destroy_subparser, check_subparser, clean_subparser]:
+                      destroy_subparser, check_subparser, clean_subparser,
+                      cancel_subparser]:
         subparser.add_argument(
                 "config_file",
                 help="Project configuration file (YAML).")
@@ -204,6 +343,10 @@ def build_parser():
                 "--file-checks", dest="file_checks",
                 action=_StoreBoolActionType, default=True, type=html_checkbox(checked=True),
                 help="Perform input file checks. Default=True.")
+        subparser.add_argument(
+                "--no-cache", dest="use_cache", action="store_false",
+                help="Build the project from its files, rather than reusing "
+                     "the project cached when last built from them.")
         subparser.add_argument(
                 "-d", "--dry-run", dest="dry_run",
                 action=_StoreBoolActionType, default=False, type=html_checkbox(checked=False),
@@ -0,0 +1,57 @@
+""" Deferred import of module attributes, for fast command-line startup """
+
+import importlib
+import sys
+import types
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+def lazy_attributes(module_name, sources):
+    """
+    Create a module-level __getattr__ that imports attributes on first use.
+
+    Python calls a module's __getattr__ only as of version 3.7; for 3.5 and
+    3.6, the module's class is changed to one that calls it likewise. Python
+    2.7 allows neither, so there each attribute is imported right away.
+
+    :param str module_name: name of the module that provides the attributes
+    :param Mapping[str, str] sources: name of the module from which to
+        import each attribute, relative to module_name's package if it
+        begins with a dot
+    :return callable: function to bind as the module's __getattr__
+    """
+    module = sys.modules[module_name]
+    package = module_name if hasattr(module, "__path__") \
+        else module_name.rpartition(".")[0]
+
+    def __getattr__(name):
+        try:
+            source = sources[name]
+        except KeyError:
+            raise AttributeError("module '{}' has no attribute '{}'".
+                                 format(module_name, name))
+        value = getattr(importlib.import_module(source, package), name)
+        setattr(module, name, value)
+        return value
+
+    if sys.version_info < (3, 5):
+        for name in sources:
+            __getattr__(name)
+    elif sys.version_info < (3, 7):
+        module.__class__ = _DeferringModule
+    return __getattr__
+
+
+class _DeferringModule(types.ModuleType):
+    """ Module that calls its own __getattr__ for an attribute it lacks. """
+
+    def __getattr__(self, name):
+        try:
+            hook = self.__dict__["__getattr__"]
+        except KeyError:
+            raise AttributeError("module '{}' has no attribute '{}'".
+                                 format(self.__name__, name))
+        return hook(name)
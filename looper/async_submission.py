@@ -0,0 +1,211 @@
+""" Staged, asynchronous job submission (Python 3.5+ only) """
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import sys
+import threading
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["SubmissionPipeline"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SubmissionPipeline(object):
+    """
+    Pipeline of stages through which each job is prepared, written, submitted.
+
+    The stages run on an event loop of their own, in a background thread,
+    so that the caller may go on building jobs while earlier ones are in
+    flight. A job's settings are determined in the first stage, its script is
+    rendered in the second, and its submission command is run, as a
+    subprocess awaited on the loop, in the third. Consecutive stages are
+    connected by bounded queues, so a job handed to the pipeline waits
+    for room there rather than piling up ahead of a slow scheduler.
+
+    As with a SubmissionPool, at most 'workers' submission commands are in
+    flight at once, and every submission is subject to the same rate limit,
+    however many conductors share the pipeline.
+    """
+
+    def __init__(self, workers=1, delay=0, queue_size=8):
+        """
+        Start the event loop and its stages.
+
+        :param int workers: number of submission commands that may be in
+            flight at once
+        :param float delay: minimum time (in seconds) between the starts of
+            consecutive submission commands
+        :param int queue_size: number of jobs that may wait between stages
+        :raise ValueError: if the worker count or queue size isn't positive
+        """
+        if workers < 1:
+            raise ValueError(
+                "Submission worker count must be positive: {}".format(workers))
+        if queue_size < 1:
+            raise ValueError(
+                "Submission queue size must be positive: {}".format(queue_size))
+        self.workers = workers
+        self.delay = float(delay)
+        self.queue_size = queue_size
+        self.num_submitted = 0
+        self._errors = []
+        self._queue = None
+        self._executor = ThreadPoolExecutor(2)
+        self._loop = asyncio.new_event_loop()
+        if sys.version_info < (3, 8):
+            # Until 3.8, subprocess exit is noticed only by a loop that's
+            # attached, from the main thread, to the child watcher.
+            asyncio.get_child_watcher().attach_loop(self._loop)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self._ready.wait()
+
+    def submit(self, prepare, render, callback, capture=False):
+        """
+        Hand a job to the pipeline, waiting for room in its first queue.
+
+        :param function() -> object prepare: function that determines the
+            job's settings, run in the first stage
+        :param function(object) -> str render: function of the prepared
+            settings that writes the job's script, returning the full shell
+            command that submits it, run in the second stage
+        :param function(bool, str) -> object callback: function to call with
+            the indication of whether the submission command succeeded, and
+            its output; a job that fails in an earlier stage is reported
+            as a failed submission, without output
+        :param bool capture: whether to capture the submission command's
+            output, for the callback; if not, the callback's given null
+        """
+        asyncio.run_coroutine_threadsafe(
+            self._queue.put((prepare, render, callback, capture)),
+            self._loop).result()
+
+    def join(self):
+        """
+        Wait for every job to pass through the pipeline, then stop it.
+
+        :raise Exception: the first error raised by a job's callback
+        """
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(
+            self._queue.put(None), self._loop).result()
+        self._thread.join()
+        self._thread = None
+        self._loop.close()
+        self._executor.shutdown()
+        if self._errors:
+            raise self._errors[0]
+
+    def _run(self):
+        """ Run the stages on the pipeline's loop until they're finished. """
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._stages())
+
+    async def _stages(self):
+        # Queues are bound to the loop that's running as they're created.
+        self._queue = asyncio.Queue(self.queue_size)
+        rendering = asyncio.Queue(self.queue_size)
+        submission = asyncio.Queue(self.queue_size)
+        self._ready.set()
+        await asyncio.gather(
+            self._prepare(self._queue, rendering),
+            self._render(rendering, submission),
+            self._submit(submission))
+
+    async def _prepare(self, inbox, outbox):
+        """ Determine the settings for each job. """
+        while True:
+            job = await inbox.get()
+            if job is None:
+                break
+            prepare, render, callback, capture = job
+            try:
+                settings = await self._loop.run_in_executor(
+                    self._executor, prepare)
+            except Exception as e:
+                self._fail(callback, e)
+                continue
+            await outbox.put((settings, render, callback, capture))
+        await outbox.put(None)
+
+    async def _render(self, inbox, outbox):
+        """ Write each job's script. """
+        while True:
+            job = await inbox.get()
+            if job is None:
+                break
+            settings, render, callback, capture = job
+            try:
+                command = await self._loop.run_in_executor(
+                    self._executor, render, settings)
+            except Exception as e:
+                self._fail(callback, e)
+                continue
+            await outbox.put((command, callback, capture))
+        await outbox.put(None)
+
+    async def _submit(self, inbox):
+        """ Run each job's submission command, as the rate limit permits. """
+        slots = asyncio.Semaphore(self.workers)
+        in_flight = []
+        next_start = 0.0
+        while True:
+            job = await inbox.get()
+            if job is None:
+                break
+            await slots.acquire()
+            now = self._loop.time()
+            if next_start > now:
+                await asyncio.sleep(next_start - now)
+                now = next_start
+            next_start = now + self.delay
+            in_flight.append(asyncio.ensure_future(
+                self._run_command(slots, *job)))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    def _fail(self, callback, error):
+        """ Report a job that couldn't be submitted as a failed submission. """
+        _LOGGER.warning("Job not submitted: %s", error)
+        try:
+            callback(False, None)
+        except Exception as e:
+            self._errors.append(e)
+
+    async def _run_command(self, slots, command, callback, capture):
+        """ Run a submission command, then record its result. """
+        try:
+            _LOGGER.debug("Running submission command: %s", command)
+            output = None
+            try:
+                proc = await asyncio.create_subprocess_shell(
+                    command,
+                    stdout=asyncio.subprocess.PIPE if capture else None)
+                stdout, _ = await proc.communicate()
+            except Exception as e:
+                self._fail(callback, e)
+                return
+            if capture:
+                output = stdout.decode("utf-8", "replace")
+                sys.stdout.write(output)
+                sys.stdout.flush()
+            if proc.returncode != 0:
+                _LOGGER.warning("Submission failed: %s", command)
+            else:
+                self.num_submitted += 1
+            try:
+                callback(proc.returncode == 0, output)
+            except Exception as e:
+                self._errors.append(e)
+        finally:
+            slots.release()
@@ -1,15 +1,21 @@
 """ Pipeline job submission orchestration """
 
 import logging
+from multiprocessing.pool import ThreadPool
 import os
 import re
 import subprocess
+import sys
+import threading
 import time
 
 from .const import *
 from .exceptions import JobSubmissionException
+from .packing import PACKING_METHODS, WEIGHTED_METHODS, pack
+from .scheduler import job_name, parse_job_id, reports_job_id, \
+    scheduler_program
 from .utils import \
-    create_looper_args_text, grab_project_data, fetch_sample_flags
+    create_looper_args_text, fetch_sample_flags, project_snapshot
 
 from peppy import Sample, VALID_READ_TYPES
 
@@ -21,6 +27,10 @@ __email__ = "vreuter@virginia.edu"
 _LOGGER = logging.getLogger(__name__)
 
 
+# Reason for which a sample whose job is still in the scheduler is skipped
+QUEUED_JOB_SKIP_REASON = "Job already queued"
+
+
 class SubmissionConductor(object):
     """
     Collects and then submits pipeline jobs.
@@ -36,7 +46,12 @@ class SubmissionConductor(object):
     def __init__(self, pipeline_key, pipeline_interface, cmd_base, prj,
                  dry_run=False, delay=0, sample_subtype=None, extra_args=None,
                  ignore_flags=False, compute_variables=None,
-                 max_cmds=None, max_size=None, automatic=True):
+                 max_cmds=None, max_size=None, automatic=True,
+                 submission_pool=None, status_index=None, sample_writer=None,
+                 project_data=None, flush_skipped=False,
+                 submission_pipeline=None, array_size=None, packing=None,
+                 resource_history=None, predict_resources=False, ledger=None,
+                 scheduled_jobs=None):
         """
         Create a job submission manager.
 
@@ -74,6 +89,58 @@ class SubmissionConductor(object):
             size of inputs used by the commands lumped into single job script.
         :param bool automatic: Whether the submission should be automatic once
             the pool reaches capacity.
+        :param SubmissionPool submission_pool: Workers with which to run
+            submission commands concurrently, optional; if unspecified, each
+            job is submitted (and delay respected) on the calling thread.
+            When given, the pool's rate limit supersedes this conductor's
+            own delay.
+        :param looper.sample_status.SampleStatusIndex status_index: Index of
+            sample output folders from which to determine flags, optional;
+            if unspecified, each sample's folder is listed as it's added.
+        :param looper.sample_writer.SampleWriter sample_writer: Writer of
+            sample YAML files, optional; if unspecified, each subtype sample's
+            file is written directly as its job is submitted.
+        :param looper.utils.ProjectSnapshot project_data: Sample-independent
+            project data to share among samples, optional; if unspecified,
+            it's taken from the project once for this conductor.
+        :param bool flush_skipped: Whether to write the script for each
+            pool of skipped samples as soon as the pool fills, rather than
+            holding the pools until write_skipped_sample_scripts is called.
+        :param looper.async_submission.SubmissionPipeline submission_pipeline:
+            Stages through which to determine each job's settings, write its
+            script and submit it, asynchronously, optional; when given, it
+            supersedes any submission pool, and its rate limit supersedes
+            this conductor's own delay.
+        :param int array_size: Upper bound on the number of tasks in a
+            single array job, optional; when given, each pool is held as a
+            task rather than submitted as a job of its own, and the held
+            pools are submitted together, as one array job, once there are
+            this many of them or submission is forced. Each array job is
+            submitted on the calling thread.
+        :param str packing: Name of the bin-packing heuristic by which to
+            assign samples to jobs (a key of looper.packing.PACKING_METHODS),
+            optional; when given, every sample is held until submission is
+            forced, then the samples are packed into jobs within the command
+            count and input size limits, rather than each job being closed
+            as soon as a limit's reached, in the order samples are added.
+        :param looper.resource_history.ResourceHistory resource_history:
+            Record of samples' input sizes and resource use, optional; if
+            given, each sample submitted is recorded there.
+        :param bool predict_resources: Whether to request the memory and
+            time predicted from the resource history for each job, in place
+            of those of its resource package, where there's enough history.
+        :param looper.ledger.SubmissionLedger ledger: Record of the jobs
+            submitted for samples, optional; if given, each job submitted
+            is recorded there, along with its scheduler's ID for it, which
+            is read from the submission command's output.
+        :param Iterable[looper.scheduler.ScheduledJob] scheduled_jobs: Jobs
+            in the scheduler, from a single query, optional; if given, a
+            sample whose latest job for this pipeline (by its ID in the
+            ledger, or else by name) is among them is skipped, rather than
+            submitted again.
+        :raise ValueError: if array jobs are requested but the compute
+            package's submission command doesn't support them, or if the
+            packing heuristic is unknown
         """
 
         super(SubmissionConductor, self).__init__()
@@ -94,6 +161,13 @@ class SubmissionConductor(object):
         self.ignore_flags = ignore_flags
         self.prj = prj
         self.automatic = automatic
+        self.submission_pool = submission_pool
+        self.submission_pipeline = submission_pipeline
+        self.status_index = status_index
+        self.sample_writer = sample_writer
+        self.prj_data = project_snapshot(prj) if project_data is None \
+            else project_data
+        self.flush_skipped = flush_skipped
 
         if max_cmds is None and max_size is None:
             self.max_cmds = 1
@@ -106,19 +180,66 @@ class SubmissionConductor(object):
             self.max_cmds = max_cmds
         self.max_size = max_size or float("inf")
 
+        self.array_size = array_size
+        if array_size is not None:
+            if array_size < 1:
+                raise ValueError(
+                    "Array job task count must be positive: {}".
+                    format(array_size))
+            self._array_spec = array_job_spec(
+                prj.dcc.compute.submission_command)
+            if self._array_spec is None:
+                raise ValueError(
+                    "Array jobs aren't supported for submission command: "
+                    "{}".format(prj.dcc.compute.submission_command))
+        self._array_tasks = []
+
+        if packing is not None and packing not in PACKING_METHODS:
+            raise ValueError("Unknown packing method: '{}'; choose from: {}".
+                             format(packing, ", ".join(sorted(PACKING_METHODS))))
+        # Packing matters only if a job may have more than one command.
+        self.packing = None if self.max_cmds == 1 else packing
+
+        self.resource_history = resource_history
+        self.predict_resources = predict_resources
+        self.ledger = ledger
+        self.update_scheduled_jobs(scheduled_jobs)
+
         self._failed_sample_names = []
         self._pool = []
         self._curr_size = 0
+        # When the first of the samples waiting for submission was added
+        self._pooled_since = None
         self._reset_curr_skips()
         self._skipped_sample_pools = []
+        self._num_skipped_scripts = 0
+        # Names of the samples in skipped pools, including those written, and
+        # the size of each sample in a pool not yet written, as when added
+        self._skipped_names = set()
+        self._skip_sizes = {}
         self._num_good_job_submissions = 0
         self._num_total_job_submissions = 0
         self._num_cmds_submitted = 0
+        self._submission_errors = []
+        # Submissions may complete on pool worker threads.
+        self._tally_lock = threading.Lock()
 
     @property
     def failed_samples(self):
         return self._failed_sample_names
 
+    @property
+    def submission_errors(self):
+        """
+        Return the errors from submissions that ran on a submission pool.
+
+        Serial submission raises each failure directly; with a pool, failures
+        surface only once the job's command has run, so they're held here.
+
+        :return list[JobSubmissionException]: error for each failed submission
+        """
+        return self._submission_errors
+
     @property
     def num_cmd_submissions(self):
         """
@@ -159,7 +280,11 @@ class SubmissionConductor(object):
             raise TypeError("If provided, sample_subtype must extend {}".
                             format(Sample.__name__))
 
-        flag_files = fetch_sample_flags(self.prj, sample, self.pl_name)
+        if self.status_index is None:
+            flag_files = fetch_sample_flags(self.prj, sample, self.pl_name)
+        else:
+            flag_files = self.status_index.flag_files(
+                sample.sample_name, self.pl_name)
 
         use_this_sample = True
 
@@ -180,12 +305,21 @@ class SubmissionConductor(object):
                                  os.path.basename(fp)) for fp in flag_files]))
                 _LOGGER.debug("NO SUBMISSION")
 
+        # A sample's job may be waiting in the scheduler before its pipeline
+        # writes any flag.
+        queued_job = use_this_sample and self._queued_job(sample)
+        if queued_job:
+            _LOGGER.info("> Skipping sample '%s' for pipeline '%s', job "
+                         "already in scheduler: %s", sample.name,
+                         self.pl_name, queued_job)
+            use_this_sample = False
+
         sample = sample_subtype(sample)
         _LOGGER.debug("Created %s instance: '%s'",
                       sample_subtype.__name__, sample.name)
-        sample.prj = grab_project_data(self.prj)
+        sample.prj = self.prj_data
         
-        skip_reasons = []
+        skip_reasons = [QUEUED_JOB_SKIP_REASON] if queued_job else []
         
         try:
             # Add pipeline-specific attributes.
@@ -240,25 +374,109 @@ class SubmissionConductor(object):
 
         this_sample_size = float(sample.input_file_size)
 
+        # A sample considered again, as when its inputs are awaited, keeps its
+        # earlier skip if it's skipped again, and is dropped from the skipped
+        # pools if it's submitted.
+        already_skipped = sample.name in self._skipped_names
+
         if use_this_sample and not skip_reasons:
             assert argstring is not None, \
                 "Failed to create argstring for sample: {}".format(sample.name)
+            if already_skipped:
+                self._drop_skip(sample.name)
+            if not self._pool and not self._array_tasks:
+                self._pooled_since = time.time()
             self._pool.append((sample, argstring))
             self._curr_size += this_sample_size
-            if self.automatic and self._is_full(self._pool, self._curr_size):
+            if self.automatic and self.packing is None and \
+                    self._is_full(self._pool, self._curr_size):
                 self.submit()
-        elif argstring is not None:
+        elif argstring is not None and not already_skipped:
             self._curr_skip_size += this_sample_size
             self._curr_skip_pool.append((sample, argstring))
+            self._skipped_names.add(sample.name)
+            self._skip_sizes[sample.name] = this_sample_size
             if self._is_full(self._curr_skip_pool, self._curr_skip_size):
                 self._skipped_sample_pools.append(
                     (self._curr_skip_pool, self._curr_skip_size))
                 self._reset_curr_skips()
+                if self.flush_skipped:
+                    for script in self.write_skipped_sample_scripts():
+                        _LOGGER.info("Script for skipped samples: %s", script)
 
         return skip_reasons
 
-    def _get_settings_looptext_prjtext(self, size):
+    def update_scheduled_jobs(self, scheduled_jobs):
+        """
+        Set the jobs in the scheduler, with which samples' jobs are matched.
+
+        :param Iterable[looper.scheduler.ScheduledJob] scheduled_jobs: jobs
+            in the scheduler; if null, samples aren't checked for jobs
+        """
+        if scheduled_jobs is None:
+            self._scheduled_ids = self._scheduled_names = None
+        else:
+            scheduled_jobs = list(scheduled_jobs)
+            self._scheduled_ids = {j.job_id for j in scheduled_jobs}
+            self._scheduled_names = {j.name for j in scheduled_jobs}
+
+    def flush(self, timeout):
+        """
+        Submit the samples waiting for submission, if they've waited long.
+
+        A job that's not yet full is submitted once the first of its samples
+        has waited for the given time, so that samples that come in slowly
+        aren't held indefinitely.
+
+        :param float timeout: number of seconds that a sample may wait
+        :return bool: Whether a job was submitted (or would've been if
+            not for dry run)
+        """
+        if not self._pool and not self._array_tasks:
+            return False
+        if time.time() - self._pooled_since < timeout:
+            return False
+        _LOGGER.debug("Flushing samples waiting over %s s: %s",
+                      timeout, self.pl_name)
+        return self.submit(force=True)
+
+    def _predicted_runtimes(self):
+        """
+        Predict each pooled sample's runtime, by which to balance packed jobs.
+
+        :return list[float] | NoneType: predicted runtime of each sample in
+            the pool, or null if the packing heuristic doesn't balance loads
+            or there's too little history from which to predict them all
+        """
+        if self.resource_history is None or \
+                self.packing not in WEIGHTED_METHODS:
+            return None
+        runtimes = []
+        for s, _ in self._pool:
+            size = float(s.input_file_size)
+            cores = self.pl_iface.choose_resource_package(
+                self.pl_key, size).get("cores")
+            runtime = self.resource_history.predict_runtime(
+                self.pl_name, size,
+                cores=(self.compute_variables or {}).get("cores", cores))
+            if runtime is None:
+                return None
+            runtimes.append(runtime)
+        _LOGGER.debug("Balancing jobs by predicted runtime: %s", self.pl_name)
+        return runtimes
+
+    def _get_settings_looptext_prjtext(self, size, count=1):
         settings = self.pl_iface.choose_resource_package(self.pl_key, size)
+        if self.predict_resources and self.resource_history is not None:
+            # Explicit compute variables take precedence over predictions.
+            cores = (self.compute_variables or {}).get(
+                "cores", settings.get("cores"))
+            predicted = self.resource_history.predict(
+                self.pl_name, size, count=count, cores=cores)
+            if predicted:
+                _LOGGER.debug("Predicted resources for %d sample(s) "
+                              "(%.2f Gb): %s", count, size, predicted)
+                settings.update(predicted)
         settings.update(self.compute_variables or {})
         if self.uses_looper_args:
             settings.setdefault("cores", 1)
@@ -282,74 +500,309 @@ class SubmissionConductor(object):
             not for dry run)
         """
 
+        if self._pool and self.packing is not None:
+            if not force:
+                _LOGGER.debug("No submission (samples are packed into jobs "
+                              "once submission is forced): %s", self.pl_name)
+                return False
+            jobs = pack(self._pool, self.packing, max_size=self.max_size,
+                        max_count=self.max_cmds,
+                        weights=self._predicted_runtimes())
+            _LOGGER.debug("Packed %d sample(s) into %d job(s): %s",
+                          len(self._pool), len(jobs), self.pl_name)
+            submitted, error = False, None
+            for i, (pool, size) in enumerate(jobs):
+                self._pool, self._curr_size = pool, size
+                # A failed job doesn't keep the others from submission.
+                try:
+                    submitted = self._submit_pool(
+                        final=i == len(jobs) - 1) or submitted
+                except JobSubmissionException as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return submitted
+
         if not self._pool:
+            if force and self._array_tasks:
+                return self._submit_array()
             _LOGGER.debug("No submission (no pooled samples): %s", self.pl_name)
             submitted = False
 
         elif force or self._is_full(self._pool, self._curr_size):
-            _LOGGER.debug("Determining submission settings for %d sample "
-                         "(%.2f Gb)", len(self._pool), self._curr_size)
-            settings, looper_argtext, prj_argtext = \
-                self._get_settings_looptext_prjtext(self._curr_size)
-            assert all(map(lambda cmd_part: isinstance(cmd_part, str),
-                           [self.cmd_base, prj_argtext, looper_argtext])), \
-                "Each command component must be a string."
-
-            # Ensure that each sample is individually represented on disk,
-            # specific to subtype as applicable (should just be a single
-            # subtype for each submission conductor, but some may just be
-            # the base Sample while others are the single valid subtype.)
-            for s, _ in self._pool:
-                if type(s) is Sample:
-                    exp_fname = "{}.yaml".format(s.name)
-                    exp_fpath = os.path.join(
-                            self.prj.metadata[SUBMISSION_SUBDIR_KEY], exp_fname)
-                    if not os.path.isfile(exp_fpath):
-                        _LOGGER.warning("Missing %s file will be created: '%s'",
-                                     Sample.__name__, exp_fpath)
-                else:
-                    subtype_name = s.__class__.__name__
-                    _LOGGER.debug("Writing %s representation to disk: '%s'",
-                                  subtype_name, s.name)
-                    s.to_yaml(subs_folder_path=self.prj.metadata[SUBMISSION_SUBDIR_KEY])
+            submitted = self._submit_pool(final=force)
+
+        else:
+            _LOGGER.debug("No submission (pool is not full and submission "
+                          "was not forced): %s", self.pl_name)
+            submitted = False
 
-            script = self.write_script(self._pool, settings,
-                prj_argtext=prj_argtext, looper_argtext=looper_argtext)
+        return submitted
 
-            self._num_total_job_submissions += 1
+    def _submit_pool(self, final=True):
+        """
+        Submit the current pool's commands as a job.
 
-            # Determine whether to actually do the submission.
-            _LOGGER.info("Job script (n=%d; %.2f Gb): %s",
-                         len(self._pool), self._curr_size, script)
-            if self.dry_run:
-                _LOGGER.info("Dry run, not submitted")
+        :param bool final: Whether no more pools follow, so that any held
+            array job tasks should be submitted along with this one.
+        :return bool: Whether a job was submitted (or would've been if
+            not for dry run)
+        """
+        # Ensure that each sample is individually represented on disk,
+        # specific to subtype as applicable (should just be a single
+        # subtype for each submission conductor, but some may just be
+        # the base Sample while others are the single valid subtype.)
+        sample_files = []
+        for s, _ in self._pool:
+            if type(s) is Sample:
+                exp_fname = "{}.yaml".format(s.name)
+                exp_fpath = os.path.join(
+                        self.prj.metadata[SUBMISSION_SUBDIR_KEY], exp_fname)
+                sample_files.append(exp_fpath)
+                if self.sample_writer is not None and \
+                        self.sample_writer.has_written(exp_fpath):
+                    continue
+                if not os.path.isfile(exp_fpath):
+                    _LOGGER.warning("Missing %s file will be created: '%s'",
+                                 Sample.__name__, exp_fpath)
             else:
-                sub_cmd = self.prj.dcc.compute.submission_command
-                submission_command = "{} {}".format(sub_cmd, script)
-                # Capture submission command return value so that we can
-                # intercept and report basic submission failures; #167
-                try:
-                    subprocess.check_call(submission_command, shell=True)
-                except subprocess.CalledProcessError:
-                    self._failed_sample_names.extend(
-                            [s.name for s in self._samples])
-                    self._reset_pool()
-                    raise JobSubmissionException(sub_cmd, script)
-                time.sleep(self.delay)
-
-            # Update the job and command submission tallies.
-            _LOGGER.debug("SUBMITTED")
-            submitted = True
-            self._num_good_job_submissions += 1
-            self._num_cmds_submitted += len(self._pool)
+                subtype_name = s.__class__.__name__
+                _LOGGER.debug("Writing %s representation to disk: '%s'",
+                              subtype_name, s.name)
+                if self.sample_writer is None:
+                    s.to_yaml(subs_folder_path=self.prj.metadata[SUBMISSION_SUBDIR_KEY])
+                else:
+                    sample_files.append(self.sample_writer.write(s))
+        # A job may read its samples' files as soon as it's submitted.
+        if self.sample_writer is not None:
+            self.sample_writer.wait(sample_files)
+
+        if self.resource_history is not None and not self.dry_run:
+            cores = self.pl_iface.choose_resource_package(
+                self.pl_key, self._curr_size).get("cores")
+            self.resource_history.record_submission(
+                self.pl_name,
+                [(s.name, float(s.input_file_size)) for s, _ in self._pool],
+                cores=(self.compute_variables or {}).get("cores", cores))
+
+        if self.array_size is not None:
+            self._array_tasks.append((self._pool, self._curr_size))
             self._reset_pool()
+            if final or len(self._array_tasks) >= self.array_size:
+                return self._submit_array()
+            return False
 
+        if self.submission_pipeline is not None and not self.dry_run:
+            self._queue_job()
+            # Tallies are updated by the callback, once the job's
+            # submission command has actually run.
+            self._reset_pool()
+            return True
+
+        _LOGGER.debug("Determining submission settings for %d sample "
+                     "(%.2f Gb)", len(self._pool), self._curr_size)
+        settings, looper_argtext, prj_argtext = \
+            self._get_settings_looptext_prjtext(
+                self._curr_size, count=len(self._pool))
+        resources = self._resources(settings, self._curr_size)
+        assert all(map(lambda cmd_part: isinstance(cmd_part, str),
+                       [self.cmd_base, prj_argtext, looper_argtext])), \
+            "Each command component must be a string."
+
+        script = self.write_script(self._pool, settings,
+            prj_argtext=prj_argtext, looper_argtext=looper_argtext)
+
+        self._num_total_job_submissions += 1
+
+        # Determine whether to actually do the submission.
+        _LOGGER.info("Job script (n=%d; %.2f Gb): %s",
+                     len(self._pool), self._curr_size, script)
+        if self.dry_run:
+            _LOGGER.info("Dry run, not submitted")
+        elif self.submission_pool is not None:
+            sub_cmd = self.prj.dcc.compute.submission_command
+            self.submission_pool.submit(
+                "{} {}".format(sub_cmd, script),
+                self._make_submission_callback(sub_cmd, script, resources),
+                capture=self._captures_job_id(sub_cmd))
+            # Tallies are updated by the callback, once the job's
+            # submission command has actually run.
+            self._reset_pool()
+            return True
         else:
-            _LOGGER.debug("No submission (pool is not full and submission "
-                          "was not forced): %s", self.pl_name)
-            submitted = False
+            sub_cmd = self.prj.dcc.compute.submission_command
+            submission_command = "{} {}".format(sub_cmd, script)
+            # Capture submission command return value so that we can
+            # intercept and report basic submission failures; #167
+            try:
+                output = run_submission(submission_command,
+                                        capture=self._captures_job_id(sub_cmd))
+            except subprocess.CalledProcessError:
+                self._failed_sample_names.extend(
+                        [s.name for s in self._samples])
+                self._reset_pool()
+                raise JobSubmissionException(sub_cmd, script)
+            self._record_submission(
+                sub_cmd, script, [s.name for s in self._samples], resources,
+                output)
+            time.sleep(self.delay)
 
-        return submitted
+        # Update the job and command submission tallies.
+        _LOGGER.debug("SUBMITTED")
+        self._num_good_job_submissions += 1
+        self._num_cmds_submitted += len(self._pool)
+        self._reset_pool()
+        return True
+
+
+    def _submit_array(self):
+        """
+        Submit the held pools as a single array job, one task per pool.
+
+        Every task gets the resources chosen for the largest pool.
+
+        :return bool: Whether the array job was submitted (or would've been
+            if not for dry run)
+        :raise JobSubmissionException: if the submission command fails
+        """
+        tasks = [pool for pool, _ in self._array_tasks]
+        size, count = max((s, len(p)) for p, s in self._array_tasks)
+        self._array_tasks = []
+        sample_names = [s.name for pool in tasks for s, _ in pool]
+        settings, looper_argtext, prj_argtext = \
+            self._get_settings_looptext_prjtext(size, count=count)
+        script = self.write_array_script(
+            tasks, settings, prj_argtext=prj_argtext,
+            looper_argtext=looper_argtext)
+        self._num_total_job_submissions += 1
+        _LOGGER.info("Array job script (%d tasks; n=%d; %.2f Gb per task): %s",
+                     len(tasks), len(sample_names), size, script)
+        if self.dry_run:
+            _LOGGER.info("Dry run, not submitted")
+        else:
+            sub_cmd = self.prj.dcc.compute.submission_command
+            submission_command = "{} {} {}".format(
+                sub_cmd, self._array_spec["option"].format(len(tasks)), script)
+            try:
+                output = run_submission(submission_command,
+                                        capture=self._captures_job_id(sub_cmd))
+            except subprocess.CalledProcessError:
+                self._failed_sample_names.extend(sample_names)
+                raise JobSubmissionException(sub_cmd, script)
+            self._record_submission(sub_cmd, script, sample_names,
+                                    self._resources(settings, size), output)
+            time.sleep(self.delay)
+        self._num_good_job_submissions += 1
+        self._num_cmds_submitted += len(sample_names)
+        return True
+
+    def _queue_job(self):
+        """
+        Hand the current pool's job to the submission pipeline.
+
+        The job's name is determined here, in submission order; its settings
+        and script are left to the pipeline's stages.
+        """
+        pool, size = self._pool, self._curr_size
+        jobname = self._jobname(pool)
+        self._num_total_job_submissions += 1
+        sub_cmd = self.prj.dcc.compute.submission_command
+        script = os.path.join(
+            self.prj.metadata[SUBMISSION_SUBDIR_KEY], jobname + ".sub")
+        # Filled in as the job's settings are determined, before submission
+        resources = {}
+
+        def prepare():
+            _LOGGER.debug("Determining submission settings for %d sample "
+                          "(%.2f Gb)", len(pool), size)
+            return self._get_settings_looptext_prjtext(size, count=len(pool))
+
+        def render(prepared):
+            settings, looper_argtext, prj_argtext = prepared
+            resources.update(self._resources(settings, size) or {})
+            written = self.write_script(
+                pool, settings, prj_argtext=prj_argtext,
+                looper_argtext=looper_argtext, jobname=jobname)
+            _LOGGER.info("Job script (n=%d; %.2f Gb): %s",
+                         len(pool), size, written)
+            return "{} {}".format(sub_cmd, written)
+
+        self.submission_pipeline.submit(
+            prepare, render,
+            self._make_submission_callback(sub_cmd, script, resources),
+            capture=self._captures_job_id(sub_cmd))
+
+    def _make_submission_callback(self, sub_cmd, script, resources=None):
+        """
+        Create the function with which to record a pooled submission's result.
+
+        The current pool is captured here, since it's reset before the
+        submission command runs.
+
+        :param str sub_cmd: the compute package's submission command
+        :param str script: path to the job script being submitted
+        :param Mapping resources: the job's resource settings
+        :return function(bool, str) -> NoneType: function to call with the
+            indication of whether the submission command succeeded, and
+            its output, if captured
+        """
+        sample_names = [s.name for s in self._samples]
+
+        def record(succeeded, output=None):
+            if succeeded:
+                self._record_submission(
+                    sub_cmd, script, sample_names, resources, output)
+            with self._tally_lock:
+                if succeeded:
+                    self._num_good_job_submissions += 1
+                    self._num_cmds_submitted += len(sample_names)
+                else:
+                    self._failed_sample_names.extend(sample_names)
+                    self._submission_errors.append(
+                        JobSubmissionException(sub_cmd, script))
+
+        return record
+
+    def _queued_job(self, sample):
+        """
+        Find a sample's job for this pipeline that's still in the scheduler.
+
+        :param peppy.Sample sample: sample whose job to find
+        :return str | NoneType: ID or name of the sample's job, if it's
+            among the scheduled jobs
+        """
+        if self._scheduled_ids is None:
+            return None
+        entry = self.ledger and self.ledger.latest(sample.name, self.pl_key)
+        if entry and entry.job_id:
+            # A recorded job is known by its ID, as names may be reused.
+            return entry.job_id if entry.job_id in self._scheduled_ids \
+                else None
+        name = job_name(self.pl_key, sample.name)
+        return name if name in self._scheduled_names else None
+
+    def _captures_job_id(self, sub_cmd):
+        """ Whether to read job IDs from the output of job submissions. """
+        return self.ledger is not None and reports_job_id(sub_cmd)
+
+    def _record_submission(self, sub_cmd, script, sample_names, resources,
+                           output):
+        """ Record a submitted job in the ledger, if there is one. """
+        if self.ledger is None:
+            return
+        job_id = parse_job_id(sub_cmd, output)
+        if job_id is None and reports_job_id(sub_cmd):
+            _LOGGER.warning("No job ID in output of submission: %s", script)
+        self.ledger.record(
+            job_id, os.path.splitext(os.path.basename(script))[0],
+            self.pl_key, sample_names, script, sub_cmd, resources)
+
+    def _resources(self, settings, size):
+        """ The settings for a job from its pipeline's resource package. """
+        if self.ledger is None:
+            return None
+        package = self.pl_iface.choose_resource_package(self.pl_key, size)
+        return {k: settings[k] for k in package if k in settings}
 
     def _is_full(self, pool, size):
         """
@@ -374,9 +827,12 @@ class SubmissionConductor(object):
         """
         return [s for s, _ in self._pool]
 
-    def _jobname(self, pool):
+    def _jobname(self, pool, skipped=False, array=False):
         """ Create the name for a job submission. """
-        if 1 == self.max_cmds:
+        if array:
+            # An array job is numbered among this conductor's submissions.
+            name = "array{}".format(self._num_total_job_submissions + 1)
+        elif 1 == self.max_cmds:
             assert 1 == len(pool), \
                 "If there's a single-command limit on job submission, jobname " \
                 "must be determined with exactly one sample in the pool, but " \
@@ -390,9 +846,13 @@ class SubmissionConductor(object):
             # submission counter, but add 1 to the index so that we get a
             # name concordant with 1-based, not 0-based indexing.
             name = "lump{}".format(self._num_total_job_submissions + 1)
-        return "{}_{}".format(self.pl_key, name)
+            if skipped:
+                # Skipped lumps are numbered apart from those submitted.
+                name = "skipped_lump{}".format(self._num_skipped_scripts + 1)
+        return job_name(self.pl_key, name)
 
-    def write_script(self, pool, template_values, prj_argtext, looper_argtext):
+    def write_script(self, pool, template_values, prj_argtext, looper_argtext,
+                     skipped=False, jobname=None):
         """
         Create the script for job submission.
 
@@ -400,9 +860,59 @@ class SubmissionConductor(object):
             keys and the values with which to replace them.
         :param str prj_argtext: Command text related to Project data.
         :param str looper_argtext: Command text related to looper arguments.
+        :param bool skipped: Whether the pool is of skipped samples.
+        :param str jobname: Name for the job, if already determined.
         :return str: Path to the job submission script created.
         """
 
+        commands = self._commands(pool, prj_argtext, looper_argtext)
+        jobname = jobname or self._jobname(pool, skipped=skipped)
+        submission_base = os.path.join(
+                self.prj.metadata[SUBMISSION_SUBDIR_KEY], jobname)
+        logfile = submission_base + ".log"
+        template_values["JOBNAME"] = jobname
+        template_values["CODE"] = "\n".join(commands)
+        template_values["LOGFILE"] = logfile
+        submission_script = submission_base + ".sub"
+
+        _LOGGER.debug("> Creating submission script; command count: %d", len(commands))
+        return self.prj.dcc.write_script(submission_script, template_values)
+
+    def write_array_script(self, pools, template_values, prj_argtext,
+                           looper_argtext):
+        """
+        Create the script for an array job, and the manifest of its tasks.
+
+        The manifest has a line for each task, with the commands of one pool;
+        each task of the array job runs the line given by its task index.
+
+        :param Sequence[list] pools: Pools of samples, one for each task.
+        :param Mapping template_values: Collection of template placeholder
+            keys and the values with which to replace them.
+        :param str prj_argtext: Command text related to Project data.
+        :param str looper_argtext: Command text related to looper arguments.
+        :return str: Path to the job submission script created.
+        """
+        jobname = self._jobname(None, array=True)
+        submission_base = os.path.join(
+                self.prj.metadata[SUBMISSION_SUBDIR_KEY], jobname)
+        manifest = submission_base + ".tasks"
+        with open(manifest, 'w') as f:
+            for pool in pools:
+                f.write(" ; ".join(
+                    self._commands(pool, prj_argtext, looper_argtext)) + "\n")
+        template_values["JOBNAME"] = jobname
+        template_values["CODE"] = "eval \"$(sed -n \"${{{}}}p\" '{}')\"".\
+            format(self._array_spec["index"], manifest)
+        template_values["LOGFILE"] = "{}_{}.log".format(
+            submission_base, self._array_spec["log_index"])
+        _LOGGER.debug("> Creating array job script; task count: %d", len(pools))
+        return self.prj.dcc.write_script(
+            submission_base + ".sub", template_values)
+
+    def _commands(self, pool, prj_argtext, looper_argtext):
+        """ Create the command for each of a pool's samples. """
+
         # Determine the command text for the project, looper, and extra args.
         texts = [prj_argtext, looper_argtext, self.extra_args_text]
         extra_parts_text = " ".join([t for t in texts if t])
@@ -414,27 +924,26 @@ class SubmissionConductor(object):
             b = self.cmd_base
             return (argstr and "{} {}".format(b, argstr.strip(" "))) or b
 
-        # Create the individual commands to lump into this job.
-        commands = [get_final_cmd(get_base_cmd(argstring)) for _, argstring in pool]
+        return [get_final_cmd(get_base_cmd(argstring)) for _, argstring in pool]
 
-        jobname = self._jobname(pool)
-        submission_base = os.path.join(
-                self.prj.metadata[SUBMISSION_SUBDIR_KEY], jobname)
-        logfile = submission_base + ".log"
-        template_values["JOBNAME"] = jobname
-        template_values["CODE"] = "\n".join(commands)
-        template_values["LOGFILE"] = logfile
-        submission_script = submission_base + ".sub"
+    def write_skipped_sample_scripts(self):
+        """
+        For any sample skipped during initial processing, write submission script.
 
-        _LOGGER.debug("> Creating submission script; command count: %d", len(commands))
-        return self.prj.dcc.write_script(submission_script, template_values)
+        Each pool of skipped samples is written once, and then released.
 
-    def write_skipped_sample_scripts(self):
-        """ For any sample skipped during initial processing, write submission script. """
+        :return list[str]: paths to the scripts written
+        """
         scripts = []
         for pool, size in self._skipped_sample_pools:
-            settings, looptext, prjtext = self._get_settings_looptext_prjtext(size)
-            scripts.append(self.write_script(pool, settings, prjtext, looptext))
+            settings, looptext, prjtext = \
+                self._get_settings_looptext_prjtext(size, count=len(pool))
+            scripts.append(self.write_script(
+                pool, settings, prjtext, looptext, skipped=True))
+            self._num_skipped_scripts += 1
+            for s, _ in pool:
+                self._skip_sizes.pop(s.name, None)
+        self._skipped_sample_pools = []
         return scripts
 
     def _reset_pool(self):
@@ -445,3 +954,127 @@ class SubmissionConductor(object):
     def _reset_curr_skips(self):
         self._curr_skip_pool = []
         self._curr_skip_size = 0
+
+    def _drop_skip(self, name):
+        """ Remove a sample from the pools of skipped samples. """
+        self._skipped_names.discard(name)
+        size = self._skip_sizes.pop(name, None)
+        if size is None:
+            # The sample's pool has been written already.
+            return
+        if any(s.name == name for s, _ in self._curr_skip_pool):
+            self._curr_skip_pool = [(s, argstring) for s, argstring in
+                                    self._curr_skip_pool if s.name != name]
+            self._curr_skip_size -= size
+            return
+        pools = []
+        for pool, pool_size in self._skipped_sample_pools:
+            kept = [(s, argstring) for s, argstring in pool if s.name != name]
+            if len(kept) < len(pool):
+                pool_size -= size
+            if kept:
+                pools.append((kept, pool_size))
+        self._skipped_sample_pools = pools
+
+
+def run_submission(submission_command, capture=False):
+    """
+    Run a job's submission command.
+
+    :param str submission_command: full shell command that submits a job
+    :param bool capture: whether to capture the command's standard output,
+        which is then passed on to this process's own
+    :return str | NoneType: the command's output, if captured
+    :raise subprocess.CalledProcessError: if the command fails
+    """
+    if not capture:
+        subprocess.check_call(submission_command, shell=True)
+        return None
+    output = subprocess.check_output(submission_command, shell=True).\
+        decode("utf-8", "replace")
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    return output
+
+
+def array_job_spec(submission_command):
+    """
+    Determine how a scheduler's submission command makes an array job.
+
+    :param str submission_command: the compute package's submission command
+    :return Mapping | NoneType: the option (a format string for the task
+        count) that makes an array job of a script, the environment variable
+        holding a task's index, and the placeholder for that index in a log
+        file path; null if the scheduler isn't known to support array jobs
+    """
+    return ARRAY_JOB_SCHEDULERS.get(scheduler_program(submission_command))
+
+
+class SubmissionPool(object):
+    """
+    Bounded pool of workers that run job submission commands concurrently.
+
+    A single pool may be shared by several conductors; every submission drawn
+    from it is subject to the same rate limit, so the scheduler sees at most
+    one new submission per 'delay' seconds however many workers are used.
+    """
+
+    def __init__(self, workers, delay=0):
+        """
+        Start the workers.
+
+        :param int workers: number of submission commands that may be in
+            flight at once
+        :param float delay: minimum time (in seconds) between the starts of
+            consecutive submission commands, across all workers
+        :raise ValueError: if the worker count isn't positive
+        """
+        if workers < 1:
+            raise ValueError(
+                "Submission worker count must be positive: {}".format(workers))
+        self.workers = workers
+        self.delay = float(delay)
+        self._pool = ThreadPool(workers)
+        self._pending = []
+        self._rate_lock = threading.Lock()
+        self._next_start = 0.0
+
+    def submit(self, submission_command, callback, capture=False):
+        """
+        Queue a submission command for a worker to run.
+
+        :param str submission_command: full shell command that submits a job
+        :param function(bool, str) -> object callback: function to call with
+            the indication of whether the command succeeded, and its output
+        :param bool capture: whether to capture the command's output, for the
+            callback; if not, the callback's given null
+        """
+        def run():
+            self._wait_for_turn()
+            _LOGGER.debug("Running submission command: %s", submission_command)
+            try:
+                output = run_submission(submission_command, capture=capture)
+            except subprocess.CalledProcessError:
+                _LOGGER.warning("Submission failed: %s", submission_command)
+                callback(False, None)
+            else:
+                callback(True, output)
+        self._pending.append(self._pool.apply_async(run))
+
+    def join(self):
+        """ Wait for every queued submission to finish, then stop the workers. """
+        self._pool.close()
+        self._pool.join()
+        # Surface any error other than a failed submission command.
+        for result in self._pending:
+            result.get()
+        self._pending = []
+
+    def _wait_for_turn(self):
+        """ Block until the global rate limit permits another submission. """
+        with self._rate_lock:
+            now = time.time()
+            if self._next_start > now:
+                time.sleep(self._next_start - now)
+                now = self._next_start
+            self._next_start = now + self.delay
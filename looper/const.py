@@ -5,13 +5,30 @@ __email__ = "vreuter@virginia.edu"
 
 
 __all__ = ["RESULTS_SUBDIR_KEY", "SUBMISSION_SUBDIR_KEY", "TEMPLATES_DIRNAME", "APPEARANCE_BY_FLAG",
-           "NO_DATA_PLACEHOLDER"]
+           "NO_DATA_PLACEHOLDER", "PROJECT_FILENAME", "STATUS_FLAGS",
+           "ARRAY_JOB_SCHEDULERS"]
 
 
 RESULTS_SUBDIR_KEY = "results_subdir"
 SUBMISSION_SUBDIR_KEY = "submission_subdir"
 TEMPLATES_DIRNAME = "jinja_templates"
 NO_DATA_PLACEHOLDER = "NA"
+# Name of the file in the submission folder shared by samples for their
+# project's data
+PROJECT_FILENAME = "project.yaml"
+# Run status flags, as peppy's FLAGS; here so that modules that need only
+# these, like the command-line parser, needn't import peppy (and pandas).
+STATUS_FLAGS = ["completed", "running", "failed", "waiting", "partial"]
+# For each scheduler's submission program that supports array jobs: the
+# option that makes an array of a script's tasks (given their count), the
+# environment variable that holds a task's index, and the placeholder for
+# that index in the path to a task's log file
+ARRAY_JOB_SCHEDULERS = {
+    "sbatch": {"option": "--array=1-{}", "index": "SLURM_ARRAY_TASK_ID",
+               "log_index": "%a"},
+    "qsub": {"option": "-t 1-{}", "index": "SGE_TASK_ID",
+             "log_index": "$TASK_ID"}
+}
 APPEARANCE_BY_FLAG = {
     "completed": {
         "button_class": "table-success",
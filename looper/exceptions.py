@@ -15,7 +15,7 @@ else:
 
 _all__ = ["InvalidResourceSpecificationException", "JobSubmissionException",
           "LooperError", "MissingPipelineConfigurationException",
-          "PipelineInterfaceConfigError"]
+          "PipelineInterfaceConfigError", "SchedulerQueryException"]
 
 
 class LooperError(Exception):
@@ -56,3 +56,13 @@ class PipelineInterfaceConfigError(LooperError):
         if not isinstance(context, str) and isinstance(context, Iterable):
             context = "Missing section(s): {}".format(", ".join(context))
         super(PipelineInterfaceConfigError, self).__init__(context)
+
+
+class SchedulerQueryException(LooperError):
+    """ Error type for when a command to the scheduler about its jobs fails. """
+
+    def __init__(self, command, reason):
+        self.command = command
+        reason = "Error for scheduler command {}: {}".\
+                format(" ".join(command), reason)
+        super(SchedulerQueryException, self).__init__(reason)
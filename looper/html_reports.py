@@ -4,12 +4,15 @@ import os
 import glob
 import pandas as _pd
 import logging
+import multiprocessing
 import jinja2
-import re
 import sys
 
 from ._version import __version__ as v
 from .const import TEMPLATES_DIRNAME, APPEARANCE_BY_FLAG, NO_DATA_PLACEHOLDER
+from .sample_status import COMMANDS_SUFFIX, LOG_SUFFIX, MEMORY_LOG_KEY, \
+    PROFILE_SUFFIX, RUNTIME_LOG_KEY, SampleStatusIndex, scan_log
+from .summary_cache import fingerprint
 from copy import copy as cp
 _LOGGER = logging.getLogger("looper")
 
@@ -17,14 +20,26 @@ _LOGGER = logging.getLogger("looper")
 class HTMLReportBuilder(object):
     """ Generate HTML summary report for project/samples """
 
-    def __init__(self, prj):
+    def __init__(self, prj, status_index=None, cache=None, workers=1):
         """
         The Project defines the instance.
 
         :param Project prj: Project with which to work/operate on
+        :param looper.sample_status.SampleStatusIndex status_index: index of
+            the project's sample output folders, optional; if unspecified,
+            one is built here.
+        :param looper.summary_cache.SummaryCache cache: values parsed from
+            sample logs and digests of pages rendered previously, optional;
+            if provided, logs and pages are reused where unchanged.
+        :param int workers: number of processes with which to render sample
+            and object pages
         """
         super(HTMLReportBuilder, self).__init__()
         self.prj = prj
+        self.status_index = SampleStatusIndex.from_project(prj) \
+            if status_index is None else status_index
+        self.cache = cache
+        self.workers = workers
         self.j_env = get_jinja_env()
         self.reports_dir = get_reports_dir(self.prj)
         self.index_html_path = get_index_html_path(self.prj)
@@ -84,11 +99,9 @@ class HTMLReportBuilder(object):
         labels = list()
         for sample in self.prj.samples:
             sample_name = str(sample.sample_name)
-            sample_dir = os.path.join(
-                self.prj.metadata.results_subdir, sample_name)
 
             # Confirm sample directory exists, then build page
-            if os.path.exists(sample_dir):
+            if sample_name in self.status_index:
                 page_name = sample_name + ".html"
                 page_path = os.path.join(self.reports_dir, page_name.replace(' ', '_').lower())
                 page_relpath = os.path.relpath(page_path, self.reports_dir)
@@ -176,7 +189,19 @@ class HTMLReportBuilder(object):
         :param str navbar: HTML to be included as the navbar in the main summary page
         :param str footer: HTML to be included as the footer
         """
+        object_path, template_vars = self._object_page(single_object)
+        template_vars.update(navbar=navbar, footer=footer)
+        self._save_page(object_path, "object.html", template_vars)
 
+    def _object_page(self, single_object):
+        """
+        Determine the path and template arguments for an object type's page
+
+        :param pandas.DataFrame single_object: contains reference
+            information for an individual object type for all samples
+        :return (str, dict): path to the page, and the arguments with which
+            to render its template, other than navbar and footer
+        """
         # Generate object filename
         for key in single_object['key'].drop_duplicates().sort_values():
             # even though it's always one element, loop to extract the data
@@ -247,8 +272,8 @@ class HTMLReportBuilder(object):
                             filename.replace(' ', '_').lower() + " references nonexistent object files")
             _LOGGER.debug(filename.replace(' ', '_').lower() +
                           " nonexistent files: " + ','.join(str(x) for x in warnings))
-        template_vars = dict(navbar=navbar, footer=footer, name=current_name, figures=figures, links=links)
-        save_html(object_path, render_jinja_template("object.html", self.j_env, args=template_vars))
+        template_vars = dict(name=current_name, figures=figures, links=links)
+        return object_path, template_vars
 
     def create_sample_html(self, objs, sample_name, sample_stats, navbar, footer):
         """
@@ -263,13 +288,29 @@ class HTMLReportBuilder(object):
         :param str footer: HTML to be included as the footer
         :return str: path to the produced HTML page
         """
+        html_page, sample_page_relpath, template_vars = self._sample_page(
+            ObjectsIndex(objs).sample(sample_name), sample_name, sample_stats)
+        template_vars.update(navbar=navbar, footer=footer)
+        self._save_page(html_page, "sample.html", template_vars)
+        return sample_page_relpath
+
+    def _sample_page(self, single_sample, sample_name, sample_stats):
+        """
+        Determine the path and template arguments for a sample's page
+
+        :param pandas.DataFrame single_sample: the objects reported for the
+            current sample
+        :param str sample_name: the name of the current sample
+        :param dict sample_stats: pipeline run statistics for the current sample
+        :return (str, str, dict): path to the page, that path relative to the
+            project output folder, and the arguments with which to render
+            the page's template, other than navbar and footer
+        """
         html_filename = sample_name + ".html"
         html_page = os.path.join(self.reports_dir, html_filename.replace(' ', '_').lower())
         sample_page_relpath = os.path.relpath(html_page, self.prj.metadata.output_dir)
-        single_sample = _pd.DataFrame() if objs.empty else objs[objs['sample_name'] == sample_name]
         if not os.path.exists(os.path.dirname(html_page)):
             os.makedirs(os.path.dirname(html_page))
-        sample_dir = os.path.join(self.prj.metadata.results_subdir, sample_name)
         button_appearance_by_flag = {
             "completed": {
                 "button_class": "btn btn-success",
@@ -284,28 +325,28 @@ class HTMLReportBuilder(object):
                 "flag": "Failed"
             }
         }
-        if os.path.exists(sample_dir):
+        if sample_name in self.status_index:
             if single_sample.empty:
                 # When there is no objects.tsv file, search for the
                 # presence of log, profile, and command files
-                log_name = _match_file_for_sample(sample_name, 'log.md', self.prj.metadata.results_subdir)
-                profile_name = _match_file_for_sample(sample_name, 'profile.tsv', self.prj.metadata.results_subdir)
-                command_name = _match_file_for_sample(sample_name, 'commands.sh', self.prj.metadata.results_subdir)
+                log_name = self.status_index.match_file(sample_name, LOG_SUFFIX)
+                profile_name = self.status_index.match_file(sample_name, PROFILE_SUFFIX)
+                command_name = self.status_index.match_file(sample_name, COMMANDS_SUFFIX)
             else:
                 log_name = str(single_sample.iloc[0]['annotation']) + "_log.md"
                 profile_name = str(single_sample.iloc[0]['annotation']) + "_profile.tsv"
                 command_name = str(single_sample.iloc[0]['annotation']) + "_commands.sh"
             stats_name = "stats.tsv"
-            flag = _get_flags(sample_dir)
+            flag = _get_flags(self.status_index, sample_name)
             # get links to the files
             stats_file_path = _get_relpath_to_file(
-                stats_name, sample_name, self.prj.metadata.results_subdir, self.reports_dir)
+                stats_name, sample_name, self.status_index, self.reports_dir)
             profile_file_path = _get_relpath_to_file(
-                profile_name, sample_name, self.prj.metadata.results_subdir, self.reports_dir)
+                profile_name, sample_name, self.status_index, self.reports_dir)
             commands_file_path = _get_relpath_to_file(
-                command_name, sample_name, self.prj.metadata.results_subdir, self.reports_dir)
+                command_name, sample_name, self.status_index, self.reports_dir)
             log_file_path = _get_relpath_to_file(
-                log_name, sample_name, self.prj.metadata.results_subdir, self.reports_dir)
+                log_name, sample_name, self.status_index, self.reports_dir)
             if not flag:
                 button_class = "btn btn-danger"
                 flag = "Missing"
@@ -369,14 +410,13 @@ class HTMLReportBuilder(object):
             _LOGGER.warning("{} is not present in {}".format(
                 sample_name, self.prj.metadata.results_subdir))
 
-        template_vars = dict(navbar=navbar, footer=footer, sample_name=sample_name, stats_file_path=stats_file_path,
+        template_vars = dict(sample_name=sample_name, stats_file_path=stats_file_path,
                              profile_file_path=profile_file_path, commands_file_path=commands_file_path,
                              log_file_path=log_file_path, button_class=button_class, sample_stats=sample_stats,
                              flag=flag, links=links, figures=figures)
-        save_html(html_page, render_jinja_template("sample.html", self.j_env, template_vars))
-        return sample_page_relpath
+        return html_page, sample_page_relpath, template_vars
 
-    def create_status_html(self, objs, navbar, footer):
+    def create_status_html(self, objs, navbar, footer, objs_index=None):
         """
         Generates a page listing all the samples, their run status, their
         log file, and the total runtime if completed.
@@ -384,9 +424,13 @@ class HTMLReportBuilder(object):
         :param pandas.DataFrame objs: project level dataframe containing any reported objects for all samples
         :param str navbar: HTML to be included as the navbar in the main summary page
         :param str footer: HTML to be included as the footer
+        :param ObjectsIndex objs_index: index of the rows of objs, optional;
+            if unspecified, one is built here.
         :return str: rendered status HTML file
         """
         _LOGGER.debug("Building status page...")
+        if objs_index is None:
+            objs_index = ObjectsIndex(objs)
         status_warning = False
         sample_warning = []
         log_paths = []
@@ -399,13 +443,11 @@ class HTMLReportBuilder(object):
         mems = []
         for sample in self.prj.samples:
             sample_name = str(sample.sample_name)
-            sample_dir = os.path.join(
-                self.prj.metadata.results_subdir, sample_name)
 
             # Confirm sample directory exists, then build page
-            if os.path.exists(sample_dir):
+            if sample_name in self.status_index:
                 # Grab the status flag for the current sample
-                flag = _get_flags(sample_dir)
+                flag = _get_flags(self.status_index, sample_name)
                 if not flag:
                     button_class = "table-secondary"
                     flag = "Missing"
@@ -432,29 +474,28 @@ class HTMLReportBuilder(object):
                 # get second column data (status/flag)
                 flags.append(flag)
                 # get third column data (log file/link)
-                single_sample = _pd.DataFrame() if objs.empty else objs[objs['sample_name'] == sample_name]
-                log_name = _match_file_for_sample(sample_name, "log.md", self.prj.metadata.results_subdir) \
+                single_sample = objs_index.sample(sample_name)
+                log_name = self.status_index.match_file(sample_name, LOG_SUFFIX) \
                     if single_sample.empty else str(single_sample.iloc[0]['annotation']) + "_log.md"
-                log_file = os.path.join(self.prj.metadata.results_subdir, sample_name, log_name)
+                log_file = self.status_index.get_file(sample_name, log_name)
                 file_link = _get_relpath_to_file(
-                    log_name, sample_name, self.prj.metadata.results_subdir, self.reports_dir)
+                    log_name, sample_name, self.status_index, self.reports_dir)
                 log_link_names.append(log_name)
                 log_paths.append(file_link)
                 # get fourth column data (runtime) and fifth column data (memory)
                 time = NO_DATA_PLACEHOLDER
                 warn_msg = "There was a problem reading a log file ('{log}')." \
                            " {what} was not collected for sample: '{sname}'"
-                if os.path.isfile(log_file):
-                    time = _get_from_log(log_file, r'(Total elapsed time)')
-                    mem = _get_from_log(log_file, r'(Peak memory used)')
+                if log_file is not None:
+                    time, mem = self._get_runtime_and_memory(sample_name, log_file)
                     if time is None:
                         status_warning = True
                         time = NO_DATA_PLACEHOLDER
-                        _LOGGER.warning(warn_msg.format(what="Runtime", log=log_file, sname=sample.sample_name))
+                        _LOGGER.warning(warn_msg.format(what="Runtime", log=log_file.path, sname=sample.sample_name))
                     if mem is None:
                         status_warning = True
                         mem = NO_DATA_PLACEHOLDER
-                        _LOGGER.warning(warn_msg.format(what="Peak memory", log=log_file, sname=sample.sample_name))
+                        _LOGGER.warning(warn_msg.format(what="Peak memory", log=log_file.path, sname=sample.sample_name))
                 times.append(time)
                 mems.append(mem)
             else:
@@ -482,6 +523,100 @@ class HTMLReportBuilder(object):
                              row_classes=row_classes, flags=flags, times=times, mems=mems)
         return render_jinja_template("status.html", self.j_env, template_vars)
 
+    def _get_runtime_and_memory(self, sample_name, log_file):
+        """
+        Get a sample's total runtime and peak memory use from its log file
+
+        :param str sample_name: name of the sample to which the log belongs
+        :param looper.sample_status.IndexedFile log_file: the sample's log
+        :return (str | NoneType, str | NoneType): runtime and peak memory,
+            each null if not found in the log
+        """
+        if self.cache is not None:
+            cached = self.cache.get(sample_name, log_file)
+            if cached is not None:
+                return tuple(cached)
+        values = scan_log(log_file.path, [RUNTIME_LOG_KEY, MEMORY_LOG_KEY])
+        time, mem = values[RUNTIME_LOG_KEY], values[MEMORY_LOG_KEY]
+        if self.cache is not None:
+            self.cache.put(sample_name, log_file, [time, mem])
+        return time, mem
+
+    def _save_page(self, path, template_name, template_vars):
+        """
+        Render a template and save the page, unless it's already up to date
+
+        :param str path: the desired location for the page
+        :param str template_name: name of the template
+        :param dict template_vars: arguments to pass to the template
+        """
+        if self._is_current(path, template_name, template_vars):
+            return
+        save_html(path, render_jinja_template(template_name, self.j_env, template_vars))
+
+    def _save_pages(self, pages, shared_vars):
+        """
+        Render templates and save the pages that aren't already up to date
+
+        With multiple workers, pages are rendered in a pool of processes,
+        each with its own Jinja environment and its own copy of the
+        template arguments shared by all of the pages.
+
+        :param Iterable[(str, str, dict)] pages: path, name of the template,
+            and arguments to pass to the template, for each page
+        :param dict shared_vars: arguments to pass to every page's template,
+            e.g. navbar and footer
+        """
+        pending = []
+        for path, template_name, template_vars in pages:
+            all_vars = dict(shared_vars)
+            all_vars.update(template_vars)
+            if not self._is_current(path, template_name, all_vars):
+                pending.append((path, template_name, template_vars))
+        _LOGGER.debug("Rendering {} of {} page(s)".format(len(pending), len(pages)))
+        if self.workers > 1 and len(pending) > 1:
+            # Create folders up front, lest workers race to create them.
+            for folder in set(os.path.dirname(p) for p, _, _ in pending):
+                if not os.path.exists(folder):
+                    os.makedirs(folder)
+            workers = min(self.workers, len(pending))
+            pool = multiprocessing.Pool(workers, initializer=_init_render_worker,
+                                        initargs=(shared_vars, ))
+            try:
+                for _ in pool.imap_unordered(
+                        _render_page, pending,
+                        chunksize=max(1, len(pending) // (4 * workers))):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for path, template_name, template_vars in pending:
+                all_vars = dict(shared_vars)
+                all_vars.update(template_vars)
+                save_html(path, render_jinja_template(template_name, self.j_env, all_vars))
+
+    def _is_current(self, path, template_name, template_vars):
+        """
+        Determine whether a page was already rendered from the same inputs
+
+        A page that isn't current is assumed to be rendered next, and its
+        inputs are recorded as such.
+
+        :param str path: the desired location for the page
+        :param str template_name: name of the template
+        :param dict template_vars: arguments to pass to the template
+        :return bool: whether the page is up to date
+        """
+        if self.cache is None:
+            return False
+        digest = fingerprint(template_name, template_vars)
+        if self.cache.page_is_current(path, digest):
+            _LOGGER.debug("Page is up to date: {}".format(path))
+            return True
+        self.cache.set_page(path, digest)
+        return False
+
     def create_project_objects(self):
         """ Render available project level summaries as additional figures/links """
         _LOGGER.debug("Building project object...")
@@ -559,6 +694,8 @@ class HTMLReportBuilder(object):
             navbar_reports = navbar
         if not objs.dropna().empty:
             objs.drop_duplicates(keep='last', inplace=True)
+        # Each sample's and each object type's rows, for the pages
+        objs_index = ObjectsIndex(objs)
         # Generate parent index.html page path
         index_html_path = get_index_html_path(self.prj)
 
@@ -568,6 +705,8 @@ class HTMLReportBuilder(object):
             stats_file_name += '_' + self.prj.subproject
         stats_file_name += '_stats_summary.tsv'
         stats_file_path = os.path.relpath(stats_file_name, self.prj.metadata.output_dir)
+        # Sample and object pages to render: path, template, and arguments
+        pages = []
         # Add stats summary table to index page and produce individual
         # sample pages
         if os.path.isfile(stats_file_name):
@@ -578,7 +717,9 @@ class HTMLReportBuilder(object):
             for row in stats:
                 table_cell_data = []
                 sample_name = row["sample_name"]
-                sample_page = self.create_sample_html(objs, sample_name, row, navbar_reports, footer)
+                html_page, sample_page, template_vars = self._sample_page(
+                    objs_index.sample(sample_name), sample_name, row)
+                pages.append((html_page, "sample.html", template_vars))
                 # treat sample_name column differently - provide a link to the sample page
                 table_cell_data.append([sample_page, sample_name])
                 # for each column read the data from the stats
@@ -599,15 +740,17 @@ class HTMLReportBuilder(object):
         # Create objects pages
         if not objs.dropna().empty:
             for key in objs['key'].drop_duplicates().sort_values():
-                single_object = objs[objs['key'] == key]
-                self.create_object_html(single_object, navbar_reports, footer)
+                single_object = objs_index.key(key)
+                object_path, template_vars = self._object_page(single_object)
+                pages.append((object_path, "object.html", template_vars))
+        self._save_pages(pages, dict(navbar=navbar_reports, footer=footer))
 
         # Create parent objects page with links to each object type
         save_html(os.path.join(self.reports_dir, "objects.html"),
                   self.create_object_parent_html(objs, navbar_reports, footer))
         # Create status page with each sample's status listed
         save_html(os.path.join(self.reports_dir, "status.html"),
-                  self.create_status_html(objs, navbar_reports, footer))
+                  self.create_status_html(objs, navbar_reports, footer, objs_index))
         # Add project level objects
         project_objects = self.create_project_objects()
         # Complete and close HTML file
@@ -618,6 +761,55 @@ class HTMLReportBuilder(object):
         return index_html_path
 
 
+class ObjectsIndex(object):
+    """
+    Positions of the rows of a project's objects table, by sample and by key
+
+    The table is grouped once, so that fetching the rows for a sample or for
+    an object type takes time proportional to the number of rows fetched
+    rather than to the size of the whole table.
+
+    :param pandas.DataFrame objs: project level dataframe containing any
+        reported objects for all samples
+    """
+
+    def __init__(self, objs):
+        super(ObjectsIndex, self).__init__()
+        self.objs = objs
+        if objs.empty:
+            self._by_sample, self._by_key = {}, {}
+        else:
+            self._by_sample = objs.groupby('sample_name', sort=False).indices
+            self._by_key = objs.groupby('key', sort=False).indices
+
+    def sample(self, sample_name):
+        """
+        Fetch the objects reported for a sample.
+
+        :param str sample_name: name of the sample of interest
+        :return pandas.DataFrame: rows of the table for the sample, in
+            table order; empty if there are none
+        """
+        return self._fetch(self._by_sample, sample_name)
+
+    def key(self, key):
+        """
+        Fetch the objects of a type, reported for any sample.
+
+        :param str key: the object type (key) of interest
+        :return pandas.DataFrame: rows of the table for the key, in table
+            order; empty if there are none
+        """
+        return self._fetch(self._by_key, key)
+
+    def _fetch(self, positions, label):
+        try:
+            rows = positions[label]
+        except KeyError:
+            return _pd.DataFrame()
+        return self.objs.iloc[rows]
+
+
 def get_reports_dir(prj):
     """
     Get the reports directory path depending on the subproject activation status
@@ -686,57 +878,71 @@ def get_jinja_env(templates_dirname=None):
     return jinja2.Environment(loader=jinja2.FileSystemLoader(templates_dirname))
 
 
-def _get_flags(sample_dir):
+# Jinja environment and shared template arguments of a page rendering process
+_RENDER_WORKER_STATE = {}
+
+
+def _init_render_worker(shared_vars):
     """
-    Get the flag(s) present in the directory
+    Prepare a process to render pages, compiling the page templates once.
 
-    :param str sample_dir: path to the directory to be searched for flags
-    :return list: flags found in the dir
+    :param dict shared_vars: arguments to pass to every page's template
     """
-    assert os.path.exists(sample_dir), "The provided path ('{}') does not exist".format(sample_dir)
-    flag_files = glob.glob(os.path.join(sample_dir, '*.flag'))
-    if len(flag_files) > 1:
-        _LOGGER.warning("Multiple flag files ({files_count}) found in sample dir '{sample_dir}'".
-                        format(files_count=len(flag_files), sample_dir=sample_dir))
-    if len(flag_files) == 0:
-        _LOGGER.warning("No flag files found in sample dir '{sample_dir}'".format(sample_dir=sample_dir))
-    return [re.search(r'\_([a-z]+)\.flag$', os.path.basename(f)).groups()[0] for f in flag_files]
+    j_env = get_jinja_env()
+    for name in ["sample.html", "object.html"]:
+        j_env.get_template(name)
+    _RENDER_WORKER_STATE["j_env"] = j_env
+    _RENDER_WORKER_STATE["shared_vars"] = shared_vars
 
 
-def _match_file_for_sample(sample_name, appendix, location):
+def _render_page(page):
     """
-    Safely looks for files matching the appendix in the specified location for the sample
+    Render a template and save the page, in a page rendering process.
 
-    :param str sample_name: name of the sample that the file name should be found for
-    :param str appendix: the ending  specific for the file
-    :param str location: where to look for the file
-    :return str: the name of the matched file
+    :param (str, str, dict) page: path, name of the template, and arguments
+        (other than those shared by all pages) to pass to the template
     """
-    regex = "*" + appendix
-    search_pattern = os.path.join(location, sample_name, regex)
-    matches = glob.glob(search_pattern)
-    if len(matches) < 1:
-        return None
-    elif len(matches) > 1:
-        _LOGGER.warning("matched mutiple files for '{}'. Returning the first one".format(search_pattern))
-    return os.path.basename(matches[0])
+    path, template_name, template_vars = page
+    all_vars = dict(_RENDER_WORKER_STATE["shared_vars"])
+    all_vars.update(template_vars)
+    save_html(path, render_jinja_template(
+        template_name, _RENDER_WORKER_STATE["j_env"], all_vars))
+
+
+def _get_flags(status_index, sample_name):
+    """
+    Get the flag(s) present in the sample's folder
+
+    :param looper.sample_status.SampleStatusIndex status_index: index of the
+        sample output folders
+    :param str sample_name: name of the sample for which to get flags
+    :return list: flags found in the dir
+    """
+    assert sample_name in status_index, "No folder for sample '{}'".format(sample_name)
+    flags = status_index.flags(sample_name)
+    if len(flags) > 1:
+        _LOGGER.warning("Multiple flag files ({files_count}) found for sample '{sample}'".
+                        format(files_count=len(flags), sample=sample_name))
+    if len(flags) == 0:
+        _LOGGER.warning("No flag files found for sample '{sample}'".format(sample=sample_name))
+    return flags
 
 
-def _get_relpath_to_file(file_name, sample_name, location, relative_to):
+def _get_relpath_to_file(file_name, sample_name, status_index, relative_to):
     """
     Safely gets the relative path for the file for the specified sample
 
     :param str file_name: name of the file
     :param str sample_name: name of the sample that the file path should be found for
-    :param str location: where to look for the file
+    :param looper.sample_status.SampleStatusIndex status_index: index of the
+        sample output folders in which to look for the file
     :param str relative_to: path the result path should be relative to
     :return str: a path to the file
     """
-    abs_file_path = os.path.join(location, sample_name, file_name)
-    rel_file_path = os.path.relpath(abs_file_path, relative_to)
-    if file_name is None or not os.path.exists(abs_file_path):
+    indexed = status_index.get_file(sample_name, file_name)
+    if indexed is None:
         return None
-    return rel_file_path
+    return os.path.relpath(indexed.path, relative_to)
 
 
 def _make_relpath(prj, file_name, dir, context):
@@ -809,53 +1015,6 @@ def _get_navbar_dropdown_data_samples(prj, stats, wd, context):
     return relpaths, sample_names
 
 
-def _read_csv_encodings(path, encodings=["utf-8", "ascii"], **kwargs):
-    """
-    Try to read file with the provided encodings
-
-    :param str path: path to file
-    :param list encodings: list of encodings to try
-    """
-    idx = 0
-    while idx < len(encodings):
-        e = encodings[idx]
-        try:
-            t = _pd.read_csv(path, encoding=e, **kwargs)
-            return t
-        except UnicodeDecodeError:
-            pass
-        idx = idx + 1
-    _LOGGER.warning("Could not read the log file '{p}' with encodings '{enc}'".format(p=path, enc=encodings))
-
-
-def _get_from_log(log_path, regex):
-    """
-    Get the value for the matched key from log file
-
-    :param str log_path: path to the log file
-    :param str regex: matching str. Should be formatted as follows: r'(phrase to match)'
-    :return str: matched and striped string
-    :raises IOError: when the file is not found in the provided path
-    """
-    if not os.path.exists(log_path):
-        raise IOError("Can't read the log file '{}'. Not found".format(log_path))
-    log = _read_csv_encodings(log_path, header=None, names=['data'])
-    if log is None:
-        _LOGGER.warning("'{r}' was not read from log".format(r=regex))
-        return None
-    # match regex, get row(s) that matched the regex
-    log_row = log.iloc[:, 0].str.extractall(regex)
-    # not matches? return None
-    if log_row.empty:
-        return None
-    if log_row.size > 1:
-        _LOGGER.warning("When parsing '{lp}', more than one values matched with: {r}. Returning first.".format(lp=log_path, r=regex))
-    # split the matched line by first colon return stripped data.
-    # This way both mem values (e.g 1.1GB) and time values (e.g 1:10:10) will work.
-    val = log.iloc[log_row.index[0][0]].str.split(":", 1, expand=True)[1][0].strip()
-    return val
-
-
 def _read_tsv_to_json(path):
     """
     Read a tsv file to a JSON formatted string
@@ -0,0 +1,176 @@
+""" Append-only record of the jobs submitted for a project's samples """
+
+from collections import namedtuple
+import json
+import logging
+import os
+import threading
+import time
+
+from .const import SUBMISSION_SUBDIR_KEY
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["LEDGER_FILENAME", "LedgerEntry", "SubmissionLedger"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Name of the ledger file in a project's submission folder
+LEDGER_FILENAME = "submission_ledger.tsv"
+
+LEDGER_COLUMNS = ["time", "job_id", "job_name", "pipeline", "sample",
+                  "script", "submission_command", "resources"]
+
+# A sample's submission: the job ID is null if the scheduler's wasn't known,
+# and resources are the settings of the job's resource package.
+LedgerEntry = namedtuple("LedgerEntry", LEDGER_COLUMNS)
+
+
+class SubmissionLedger(object):
+    """
+    Ledger of each sample's job submissions, one tab-separated line each.
+
+    Lines are only ever appended, so the ledger may be shared by concurrent
+    submissions; it's read once, on first lookup, into an index of each
+    sample's latest submission for each pipeline.
+
+    :param str path: path to the ledger file
+    """
+
+    def __init__(self, path):
+        super(SubmissionLedger, self).__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._latest = None
+
+    @classmethod
+    def for_project(cls, prj):
+        """
+        Open the ledger kept in a project's submission folder.
+
+        :param looper.Project prj: project whose ledger to open
+        :return SubmissionLedger: the project's ledger
+        """
+        return cls(os.path.join(
+            prj.metadata[SUBMISSION_SUBDIR_KEY], LEDGER_FILENAME))
+
+    def record(self, job_id, job_name, pipeline, samples, script,
+               submission_command, resources=None):
+        """
+        Append the submission of a job's samples.
+
+        :param str job_id: scheduler's ID for the job, null if unknown
+        :param str job_name: name with which the job was submitted
+        :param str pipeline: key of the job's pipeline
+        :param Iterable[str] samples: names of the job's samples
+        :param str script: path to the job's script
+        :param str submission_command: command with which the job was
+            submitted, e.g. 'sbatch'
+        :param Mapping resources: the job's resource settings
+        :return list[LedgerEntry]: entries recorded
+        """
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        entries = [LedgerEntry(now, job_id, job_name, pipeline, str(s), script,
+                               submission_command, dict(resources or {}))
+                   for s in samples]
+        text = "".join(_format_entry(e) for e in entries)
+        with self._lock:
+            exists = os.path.isfile(self.path)
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(text if exists else
+                            "\t".join(LEDGER_COLUMNS) + "\n" + text)
+            except IOError as e:
+                _LOGGER.warning("Can't record submission in ledger: %s (%r)",
+                                self.path, e)
+                return []
+            if self._latest is not None:
+                self._index(entries)
+        return entries
+
+    def entries(self):
+        """
+        Read every entry from the ledger, in the order recorded.
+
+        :return Iterable[LedgerEntry]: each entry in the ledger
+        """
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for i, line in enumerate(f):
+                fields = line.rstrip("\n").split("\t")
+                if i == 0 and fields == LEDGER_COLUMNS:
+                    continue
+                # A line may be incomplete if its writer was interrupted.
+                try:
+                    yield _parse_entry(fields)
+                except ValueError:
+                    _LOGGER.debug("Skipping malformed ledger line %d: %s",
+                                  i + 1, self.path)
+
+    def latest(self, sample, pipeline):
+        """
+        Find a sample's latest submission for a pipeline.
+
+        :param str sample: name of the sample
+        :param str pipeline: key of the pipeline
+        :return LedgerEntry | NoneType: the latest submission, null if none
+        """
+        return self._index_by_sample().get((str(sample), pipeline))
+
+    def jobs(self, samples=None):
+        """
+        Collect the latest submissions of samples by scheduler's job ID.
+
+        Submissions of unknown ID are omitted.
+
+        :param Iterable[str] samples: names of the samples whose jobs to
+            collect; if unspecified, every sample's
+        :return Mapping[str, list[LedgerEntry]]: latest submissions of the
+            samples, by job ID
+        """
+        names = None if samples is None else {str(s) for s in samples}
+        jobs = {}
+        for (sample, _), entry in self._index_by_sample().items():
+            if entry.job_id and (names is None or sample in names):
+                jobs.setdefault(entry.job_id, []).append(entry)
+        for entries in jobs.values():
+            entries.sort(key=lambda e: (e.pipeline, e.sample))
+        return jobs
+
+    def _index_by_sample(self):
+        """ Latest entry by sample and pipeline, read once on demand. """
+        with self._lock:
+            if self._latest is None:
+                self._latest = {}
+                self._index(self.entries())
+            return self._latest
+
+    def _index(self, entries):
+        """ Make each entry its sample's latest for its pipeline. """
+        for e in entries:
+            self._latest[(e.sample, e.pipeline)] = e
+
+
+def _format_entry(entry):
+    """ Format a ledger entry as a line of the ledger. """
+    values = entry._replace(
+        job_id=entry.job_id or "",
+        resources=json.dumps(entry.resources, sort_keys=True))
+    return "\t".join(str(v).replace("\t", " ").replace("\n", " ")
+                     for v in values) + "\n"
+
+
+def _parse_entry(fields):
+    """ Parse a line of the ledger, split into its fields. """
+    if len(fields) != len(LEDGER_COLUMNS):
+        raise ValueError("Expected {} fields; got {}".format(
+            len(LEDGER_COLUMNS), len(fields)))
+    entry = LedgerEntry(*fields)
+    return entry._replace(job_id=entry.job_id or None,
+                          resources=json.loads(entry.resources))
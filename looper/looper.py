@@ -4,47 +4,50 @@ Looper: a pipeline submission engine. https://github.com/pepkit/looper
 """
 
 import abc
-import csv
 from collections import defaultdict
-import glob
+import io
+import itertools
 import logging
+import multiprocessing
 import os
 import subprocess
 import sys
+import time
 if sys.version_info < (3, 3):
     from collections import Mapping
 else:
     from collections.abc import Mapping
-import yaml
 
-# Need specific sequence of actions for colorama imports?
-from colorama import init
-init()
-from colorama import Fore, Style
-import pandas as _pd
-
-from . import FLAGS, GENERIC_PROTOCOL_KEY, LOGGING_LEVEL, __version__, \
+# Heavier dependencies (peppy, and pandas with it; jinja2; colorama; yaml;
+# logmuse)
+# are imported by the functions that need them, so that the command-line
+# interface starts quickly and each subcommand loads only what it uses.
+from . import GENERIC_PROTOCOL_KEY, LOGGING_LEVEL, __version__, \
     build_parser, _LEVEL_BY_VERBOSITY
-from .conductor import SubmissionConductor
+from ._lazy import lazy_attributes
 from .const import *
-from .exceptions import JobSubmissionException
-from .html_reports import HTMLReportBuilder
-from .project import Project
-from .utils import determine_config_path, fetch_flag_files, sample_folder
-
-from logmuse import setup_logger
-from peppy import ProjectContext, SAMPLE_EXECUTION_TOGGLE
+from .exceptions import JobSubmissionException, SchedulerQueryException
+from .sample_status import CLEANUP_SUFFIX, OBJECTS_FILENAME, \
+    STATS_FILENAME, SampleStatusIndex
+from .summary_cache import SummaryCache
 
 
 SUBMISSION_FAILURE_MESSAGE = "Cluster resource failure"
 
 
+OBJECTS_COLUMNS = ['key', 'filename', 'anchor_text', 'anchor_image', 'annotation']
+OBJECTS_CHUNK_SIZE = 1000
+
+
 _FAIL_DISPLAY_PROPORTION_THRESHOLD = 0.5
 _MAX_FAIL_SAMPLE_DISPLAY = 20
 _PKGNAME = "looper"
 _LOGGER = logging.getLogger(_PKGNAME)
 
 
+__getattr__ = lazy_attributes(__name__, {"Project": ".project"})
+
+
 class Executor(object):
     """ Base class that ensures the program's Sample counter starts.
 
@@ -56,15 +59,42 @@ class Executor(object):
 
     __metaclass__ = abc.ABCMeta
 
-    def __init__(self, prj):
+    def __init__(self, prj, status_index=None):
         """
         The Project defines the instance; establish an iteration counter.
 
         :param Project prj: Project with which to work/operate on
+        :param looper.sample_status.SampleStatusIndex status_index: index of
+            the project's sample output folders, optional; if unspecified,
+            one is built on first use.
         """
         super(Executor, self).__init__()
         self.prj = prj
-        self.counter = LooperCounter(len(prj.samples))
+        self._counter = None
+        self._status_index = status_index
+
+    @property
+    def counter(self):
+        """
+        Counter of the samples processed, created once on demand.
+
+        :return LooperCounter: counter of the project's samples
+        """
+        if self._counter is None:
+            self._counter = LooperCounter(len(self.prj.samples))
+        return self._counter
+
+    @property
+    def status_index(self):
+        """
+        Index of the project's sample output folders, built once on demand.
+
+        :return looper.sample_status.SampleStatusIndex: index of the
+            project's sample output folders
+        """
+        if self._status_index is None:
+            self._status_index = SampleStatusIndex.from_project(self.prj)
+        return self._status_index
 
     @abc.abstractmethod
     def __call__(self, *args, **kwargs):
@@ -74,7 +104,8 @@ class Executor(object):
 
 class Checker(Executor):
 
-    def __call__(self, flags=None, all_folders=False, max_file_count=30):
+    def __call__(self, flags=None, all_folders=False, max_file_count=30,
+                 scheduler=False):
         """
         Check Project status, based on flag files.
 
@@ -85,20 +116,26 @@ class Checker(Executor):
             was created.
         :param int max_file_count: Maximum number of filepaths to display for a
             given flag.
+        :param bool scheduler: Whether to also query the cluster scheduler,
+            once, for the state of the project's jobs.
+        :return Mapping[str, list[(str, str)]] | NoneType: name of each
+            sample and of the pipeline for each of the scheduler's jobs, by
+            job state, if the scheduler was queried
         """
 
         # Handle single or multiple flags, and alphabetize.
         flags = sorted([flags] if isinstance(flags, str)
-                       else list(flags or FLAGS))
+                       else list(flags or STATUS_FLAGS))
         flag_text = ", ".join(flags)
 
         # Collect the files by flag and sort by flag name.
         _LOGGER.debug("Checking project folders for flags: %s", flag_text)
         if all_folders:
-            files_by_flag = fetch_flag_files(
-                results_folder=self.prj.metadata[RESULTS_SUBDIR_KEY], flags=flags)
+            files_by_flag = SampleStatusIndex(
+                self.prj.metadata[RESULTS_SUBDIR_KEY]).files_by_flag(flags)
         else:
-            files_by_flag = fetch_flag_files(prj=self.prj, flags=flags)
+            files_by_flag = self.status_index.files_by_flag(
+                flags, [s.sample_name for s in self.prj.samples])
 
         # For each flag, output occurrence count.
         for flag in flags:
@@ -124,6 +161,35 @@ class Checker(Executor):
                 _LOGGER.info("%s (%d):\n%s", flag.upper(),
                              len(files), "\n".join(files))
 
+        if scheduler:
+            return self._check_scheduler(max_file_count)
+
+    def _check_scheduler(self, max_file_count):
+        """ Report the state of the project's jobs, as the scheduler has it. """
+        from .ledger import SubmissionLedger
+        from .scheduler import job_states_by_sample, query_job_states
+        submission_command = self.prj.dcc.compute.submission_command
+        try:
+            job_states = query_job_states(submission_command)
+        except SchedulerQueryException as e:
+            _LOGGER.warning(str(e))
+            return None
+        if job_states is None:
+            _LOGGER.warning("Unknown scheduler for submission command: '%s'",
+                            submission_command)
+            return None
+        samples_by_state = job_states_by_sample(
+            self.prj, job_states, self.status_index,
+            ledger=SubmissionLedger.for_project(self.prj))
+        for state in sorted(samples_by_state):
+            jobs = samples_by_state[state]
+            _LOGGER.info("SCHEDULER %s: %d", state.upper(), len(jobs))
+            if len(jobs) <= max_file_count:
+                _LOGGER.info("\n".join(
+                    "{} ({})".format(sample, pipeline)
+                    for sample, pipeline in jobs))
+        return samples_by_state
+
 
 class Cleaner(Executor):
     """ Remove all intermediate files (defined by pypiper clean scripts). """
@@ -139,9 +205,8 @@ class Cleaner(Executor):
 
         for sample in self.prj.samples:
             _LOGGER.info(self.counter.show(sample.sample_name, sample.protocol))
-            sample_output_folder = sample_folder(self.prj, sample)
-            cleanup_files = glob.glob(os.path.join(sample_output_folder,
-                                                   "*_cleanup.sh"))
+            cleanup_files = [f.path for f in self.status_index.files(
+                sample.sample_name, CLEANUP_SUFFIX)]
             if preview_flag:
                 # Preview: Don't actually clean, just show what will be cleaned.
                 _LOGGER.info("Files to clean: %s", ", ".join(cleanup_files))
@@ -179,6 +244,7 @@ class Destroyer(Executor):
         :param bool preview_flag: whether to halt before actually removing files
         """
 
+        from .utils import sample_folder
         _LOGGER.info("Results to destroy:")
 
         for sample in self.prj.samples:
@@ -211,6 +277,69 @@ class Destroyer(Executor):
         return self(args, preview_flag=False)
 
 
+class Canceller(Executor):
+    """ Canceller of the scheduler's jobs for the Project's Samples """
+
+    def __call__(self, args):
+        """
+        Cancel each sample's latest job, as recorded in the submission ledger.
+
+        Each scheduler is asked once for its jobs, and those of the recorded
+        jobs that it still has are canceled with a single command; the
+        others have already finished, so there's nothing to cancel.
+
+        :param argparse.Namespace args: command-line options and arguments
+        :return int: 0 if the jobs still in the scheduler were canceled, or
+            if there were none to cancel; 1 otherwise
+        """
+        from .ledger import SubmissionLedger
+        from .scheduler import cancel_jobs, query_jobs
+        ledger = SubmissionLedger.for_project(self.prj)
+        jobs = ledger.jobs(s.name for s in self.prj.samples)
+        if not jobs:
+            _LOGGER.info("No jobs to cancel.")
+            return 0
+
+        _LOGGER.info("Jobs to cancel:")
+        job_ids_by_command = defaultdict(list)
+        for job_id, entries in sorted(jobs.items()):
+            _LOGGER.info("%s (%s): %s", job_id, entries[0].job_name,
+                         ", ".join(e.sample for e in entries))
+            job_ids_by_command[entries[0].submission_command].append(job_id)
+
+        if args.dry_run:
+            _LOGGER.info("Dry run. No jobs canceled.")
+            return 0
+
+        if not args.force_yes and not query_yes_no(
+                "Are you sure you want to cancel {} job(s) for this "
+                "project?".format(len(jobs))):
+            _LOGGER.info("Cancel action aborted by user.")
+            return 1
+
+        canceled, finished = 0, 0
+        for command, job_ids in job_ids_by_command.items():
+            try:
+                scheduled = query_jobs(command)
+                if scheduled is None:
+                    _LOGGER.warning("Unknown scheduler for submission command: "
+                                    "'%s'", command)
+                    continue
+                # A single unknown ID would fail the whole cancellation.
+                scheduled_ids = {job.job_id for job in scheduled}
+                live_ids = [i for i in job_ids if i in scheduled_ids]
+                if live_ids:
+                    cancel_jobs(command, live_ids)
+                canceled += len(live_ids)
+                finished += len(job_ids) - len(live_ids)
+            except SchedulerQueryException as e:
+                _LOGGER.error(str(e))
+        if finished:
+            _LOGGER.info("Jobs already finished: %d", finished)
+        _LOGGER.info("Jobs canceled: %d of %d", canceled, len(jobs) - finished)
+        return 0 if canceled + finished == len(jobs) else 1
+
+
 def process_protocols(prj, protocols, resource_setting_kwargs=None, **kwargs):
     """
     Create submission conductors and collect by protocol the mapped pipelines.
@@ -226,6 +355,7 @@ def process_protocols(prj, protocols, resource_setting_kwargs=None, **kwargs):
     :raise TypeError: if the project's computing configuration instance isn't
         a mapping
     """
+    from .conductor import SubmissionConductor
     # Job submissions are managed on a per-pipeline basis so that
     # individual commands (samples) may be lumped into a single job.
     submission_conductors = {}
@@ -286,6 +416,16 @@ class Runner(Executor):
         :param bool rerun: whether the given sample is being rerun rather than
             run for the first time
         """
+        from peppy import SAMPLE_EXECUTION_TOGGLE
+        from .conductor import SubmissionPool, array_job_spec
+        from .ledger import SubmissionLedger
+        from .pipeline_interface import SUBTYPE_CACHE
+        from .scheduler import query_jobs
+        from .project import iter_samples
+        from .resource_history import ResourceHistory
+        from .sample_writer import SampleWriter
+        from .utils import project_snapshot
+        from .watch import MISSING_INPUTS_REASON, SampleTableWatcher
 
         if not self.prj.interfaces_by_protocol:
             pipe_locs = getattr(self.prj.metadata, "pipeline_interfaces", [])
@@ -303,37 +443,157 @@ class Runner(Executor):
                               format(", ".format(pipe_locs)))
                 return
 
-        protocols = {s.protocol for s in self.prj.samples
-                     if hasattr(s, "protocol")}
-        failures = defaultdict(list)  # Collect problems by sample.
-        processed_samples = set()  # Enforce one-time processing.
-
-        _LOGGER.info("Finding pipelines for protocol(s): {}".
-                     format(", ".join(self.prj.protocols)))
-
-        submission_conductors, pipe_keys_by_protocol = process_protocols(
-            self.prj, protocols, compute_kwargs, dry_run=args.dry_run,
-            delay=args.time_delay, extra_args=remaining_args,
-            ignore_flags=args.ignore_flags,
-            max_cmds=args.lumpn, max_size=args.lump)
-        mapped_protos = set(pipe_keys_by_protocol.keys())
-
-        # Determine number of samples eligible for processing.
-        num_samples = len(self.prj.samples)
-        if args.limit is None:
-            upper_sample_bound = num_samples
-        elif args.limit < 0:
+        # Streamed samples are built only as they're processed, so until
+        # then, the sample table is what tells which protocols are needed.
+        stream = getattr(args, "stream", False)
+        if args.limit is not None and args.limit < 0:
             raise ValueError(
                 "Invalid number of samples to run: {}".format(args.limit))
+        if stream:
+            table = self.prj.sample_table
+            protocols = set() if table is None or "protocol" not in table \
+                else set(table["protocol"].dropna())
+            num_rows = 0 if table is None else len(table)
+            del table
+            self._counter = LooperCounter(min(num_rows, args.limit or num_rows))
+            if self._status_index is None:
+                self._status_index = SampleStatusIndex(
+                    self.prj.metadata[RESULTS_SUBDIR_KEY],
+                    sample_names=self.prj.sample_names)
         else:
-            upper_sample_bound = min(args.limit, num_samples)
-        _LOGGER.debug("Limiting to %d of %d samples",
-                      upper_sample_bound, num_samples)
+            protocols = {s.protocol for s in self.prj.samples
+                         if hasattr(s, "protocol")}
+        failures = defaultdict(list)  # Collect problems by sample.
+        processed_samples = set()  # Enforce one-time processing.
+
+        _LOGGER.info("Finding pipelines for protocol(s): {}".format(
+            ", ".join(protocols if stream else self.prj.protocols)))
 
+        # Concurrent submission is pointless for a dry run.
+        num_workers = getattr(args, "submit_workers", 1) or 1
+        submission_pool = None
+        submission_pipeline = None
+        if args.dry_run:
+            pass
+        elif getattr(args, "async_submit", False):
+            if sys.version_info < (3, 5):
+                _LOGGER.warning("Asynchronous submission requires Python 3.5 "
+                                "or later; submitting serially")
+            else:
+                from .async_submission import SubmissionPipeline
+                submission_pipeline = SubmissionPipeline(
+                    num_workers, delay=args.time_delay)
+        elif num_workers > 1:
+            submission_pool = SubmissionPool(num_workers, delay=args.time_delay)
+
+        # Each submitted sample's input size is recorded, so that its
+        # resource use may later be related to it. Predictions are made
+        # from every run completed so far.
+        predict_resources = getattr(args, "predict_resources", False)
+        if predict_resources and not args.dry_run:
+            _update_resource_history(self.prj, self.status_index)
+        resource_history = ResourceHistory.for_project(
+            self.prj, create=not args.dry_run)
+        if predict_resources and resource_history is None:
+            _LOGGER.warning("No resource history from which to predict "
+                            "resource use")
+        # Each job submitted is recorded, with its scheduler's ID for it, and
+        # a sample whose latest job is still in the scheduler isn't
+        # submitted again; the scheduler is queried just once for its jobs,
+        # and not at all for a dry run or if asked not to.
+        ledger = SubmissionLedger.for_project(self.prj)
+        check_queued = \
+            not args.dry_run and not getattr(args, "ignore_queued", False)
+        scheduled_jobs = None
+        if check_queued:
+            try:
+                scheduled_jobs = query_jobs(
+                    self.prj.dcc.compute.submission_command)
+            except SchedulerQueryException as e:
+                _LOGGER.warning("Can't check for jobs already queued: %s", e)
+
+        array_size = None
+        if getattr(args, "array", False):
+            if array_job_spec(self.prj.dcc.compute.submission_command) is None:
+                _LOGGER.warning(
+                    "Array jobs aren't supported for submission command "
+                    "'%s'; submitting jobs individually",
+                    self.prj.dcc.compute.submission_command)
+            else:
+                array_size = args.array_size
+
+        # Each sample's file is written once per distinct content.
+        sample_writer = SampleWriter(
+            self.prj.metadata[SUBMISSION_SUBDIR_KEY],
+            workers=getattr(args, "write_workers", 1) or 1)
+        # Every sample shares a single copy of the project's data.
+        prj_data = project_snapshot(self.prj)
+        if getattr(args, "shared_project_yaml", False):
+            _LOGGER.info("Project data file: %s",
+                         sample_writer.write_project(prj_data))
+
+        # Pipelines unchanged since a previous run needn't be imported again.
+        SUBTYPE_CACHE.load(get_file_for_project(self.prj, "subtype_cache.json"),
+                           reset=getattr(args, "reimport_pipelines", False))
+        submission_conductors = {}
+        pipe_keys_by_protocol = {}
+
+        def add_protocols(protos):
+            # A pipeline's conductor is created once, however many protocols
+            # are found to map to it.
+            conductors, pipe_keys = process_protocols(
+                self.prj, protos, compute_kwargs, dry_run=args.dry_run,
+                delay=args.time_delay, extra_args=remaining_args,
+                ignore_flags=args.ignore_flags,
+                max_cmds=args.lumpn, max_size=args.lump,
+                submission_pool=submission_pool,
+                submission_pipeline=submission_pipeline, array_size=array_size,
+                packing=getattr(args, "pack", None),
+                resource_history=resource_history,
+                predict_resources=predict_resources, ledger=ledger,
+                scheduled_jobs=scheduled_jobs,
+                status_index=self.status_index, sample_writer=sample_writer,
+                project_data=prj_data, flush_skipped=stream)
+            for pl_key, conductor in conductors.items():
+                submission_conductors.setdefault(pl_key, conductor)
+            for proto in protos:
+                pipe_keys_by_protocol.setdefault(proto, [])
+            for proto, keys in pipe_keys.items():
+                pipe_keys_by_protocol[proto] = keys
+
+        add_protocols(protocols)
+        # As with the resource history, a dry run leaves the cache as it was.
+        if not args.dry_run:
+            try:
+                SUBTYPE_CACHE.save()
+            except (IOError, OSError) as e:
+                _LOGGER.warning("Couldn't save subtype cache: %s", e)
+
+        # Determine the samples eligible for processing.
+        if stream:
+            _LOGGER.debug("Building samples %d at a time", args.chunk_size)
+            samples = itertools.islice(
+                iter_samples(self.prj, args.chunk_size), args.limit)
+        else:
+            num_samples = len(self.prj.samples)
+            upper_sample_bound = num_samples if args.limit is None \
+                else min(args.limit, num_samples)
+            _LOGGER.debug("Limiting to %d of %d samples",
+                          upper_sample_bound, num_samples)
+            samples = self.prj.samples[:upper_sample_bound]
+
+        num_samples_considered = 0
         num_commands_possible = 0
         failed_submission_scripts = []
+        # With watching, samples that lack an input file wait for it,
+        # along with the pipelines for which they were missing it.
+        watch = getattr(args, "watch", False)
+        waiting_samples = {}
+
+        def process_sample(sample, pl_keys=None):
+            # Add a sample to each of its pipelines' conductors, or just to
+            # the given ones', returning the number of commands possible.
 
-        for sample in self.prj.samples[:upper_sample_bound]:
             # First, step through the samples and determine whether any
             # should be skipped entirely, based on sample attributes alone
             # and independent of anything about any of its pipelines.
@@ -363,15 +623,19 @@ class Runner(Executor):
             except AttributeError:
                 skip_reasons.append("Sample has no protocol")
             else:
-                if protocol not in mapped_protos and \
-                        GENERIC_PROTOCOL_KEY not in mapped_protos:
+                if protocol not in pipe_keys_by_protocol:
+                    # A streamed sample may have a protocol implied, rather
+                    # than one from the sample table.
+                    add_protocols({protocol})
+                if not pipe_keys_by_protocol[protocol] and \
+                        not pipe_keys_by_protocol.get(GENERIC_PROTOCOL_KEY):
                     skip_reasons.append("No pipeline for protocol")
 
             if skip_reasons:
                 _LOGGER.warning(
                     "> Not submitted: {}".format(", ".join(skip_reasons)))
                 failures[sample.name] = skip_reasons
-                continue
+                return 0
 
             # Processing preconditions have been met.
             # Add this sample to the processed collection.
@@ -381,16 +645,15 @@ class Runner(Executor):
             # for reuse in case of many jobs (pipelines) using base Sample.
             # Do a single overwrite here, then any subsequent Sample can be sure
             # that the file is fresh, with respect to this run of looper.
-            sample.to_yaml(subs_folder_path=self.prj.metadata[SUBMISSION_SUBDIR_KEY])
+            sample_writer.write(sample)
 
-            pipe_keys = pipe_keys_by_protocol.get(sample.protocol) \
+            pipe_keys = pl_keys or pipe_keys_by_protocol.get(sample.protocol) \
                 or pipe_keys_by_protocol.get(GENERIC_PROTOCOL_KEY)
             _LOGGER.debug("Considering {} pipeline(s): {}".
                           format(len(pipe_keys), ", ".join(pipe_keys)))
 
             pl_fails = []
             for pl_key in pipe_keys:
-                num_commands_possible += 1
                 # TODO: of interest to track failures by pipeline?
                 conductor = submission_conductors[pl_key]
                 # TODO: check return value from add() to determine whether
@@ -401,15 +664,85 @@ class Runner(Executor):
                     failed_submission_scripts.append(e.script)
                 else:
                     pl_fails.extend(curr_pl_fails)
+                    if watch and MISSING_INPUTS_REASON in curr_pl_fails:
+                        waiting_samples.setdefault(
+                            sample.name, (sample, []))[1].append(pl_key)
             if pl_fails:
                 failures[sample.name].extend(pl_fails)
+            return len(pipe_keys)
+
+        for sample in samples:
+            num_samples_considered += 1
+            # Streamed samples' files are flushed as each chunk's processed.
+            if stream and num_samples_considered % args.chunk_size == 0:
+                sample_writer.wait()
+            num_commands_possible += process_sample(sample)
+
+        if watch:
+            _LOGGER.info("Watching for new and changed samples every %d s; "
+                         "interrupt to stop", args.watch_interval)
+            watcher = SampleTableWatcher(self.prj)
+            try:
+                while True:
+                    for conductor in submission_conductors.values():
+                        try:
+                            conductor.flush(args.flush_timeout)
+                        except JobSubmissionException as e:
+                            failed_submission_scripts.append(e.script)
+                    time.sleep(args.watch_interval)
+                    changed = watcher.changed_samples()
+                    if changed and check_queued:
+                        # Jobs submitted since the last look are in the
+                        # scheduler now, so aren't submitted again.
+                        try:
+                            scheduled_jobs = query_jobs(
+                                self.prj.dcc.compute.submission_command)
+                        except SchedulerQueryException as e:
+                            _LOGGER.warning("Can't check for jobs already "
+                                            "queued: %s", e)
+                        else:
+                            for conductor in submission_conductors.values():
+                                conductor.update_scheduled_jobs(scheduled_jobs)
+                    # A changed sample is considered anew for each pipeline;
+                    # one still waiting, just for those lacking its inputs.
+                    changed_names = {s.name for s in changed}
+                    todo = [(s, None) for s in changed] + \
+                        [waiting_samples.pop(n) for n in
+                         sorted(waiting_samples) if n not in changed_names]
+                    for n in changed_names:
+                        waiting_samples.pop(n, None)
+                    if not todo:
+                        continue
+                    self._counter = LooperCounter(len(todo))
+                    for sample, pl_keys in todo:
+                        # A changed sample's been counted already.
+                        is_new = pl_keys is None and sample.name not in \
+                            failures and sample.sample_name not in \
+                            processed_samples
+                        if pl_keys is None:
+                            num_samples_considered += is_new
+                            failures.pop(sample.name, None)
+                        else:
+                            failures[sample.name] = [
+                                r for r in failures[sample.name]
+                                if r != MISSING_INPUTS_REASON]
+                        processed_samples.discard(sample.sample_name)
+                        # Flags may have been written since the last look.
+                        self.status_index.refresh(sample.name)
+                        n = process_sample(sample, pl_keys)
+                        if is_new:
+                            num_commands_possible += n
+                        if not failures.get(sample.name, True):
+                            del failures[sample.name]
+            except KeyboardInterrupt:
+                _LOGGER.info("Stopped watching")
 
-        job_sub_total = 0
-        cmd_sub_total = 0
         for conductor in submission_conductors.values():
-            conductor.submit(force=True)
-            job_sub_total += conductor.num_job_submissions
-            cmd_sub_total += conductor.num_cmd_submissions
+            # An array job holds every task until this final submission.
+            try:
+                conductor.submit(force=True)
+            except JobSubmissionException as e:
+                failed_submission_scripts.append(e.script)
             skipped_sample_scripts = conductor.write_skipped_sample_scripts()
             if skipped_sample_scripts:
                 _LOGGER.info(
@@ -417,8 +750,24 @@ class Runner(Executor):
                     format(len(skipped_sample_scripts),
                            "\n".join(skipped_sample_scripts)))
 
+        # Tallies are final only once all pooled submissions have finished.
+        if submission_pool is not None:
+            submission_pool.join()
+        if submission_pipeline is not None:
+            submission_pipeline.join()
+        if resource_history is not None:
+            resource_history.close()
+        sample_writer.close()
+        job_sub_total = 0
+        cmd_sub_total = 0
+        for conductor in submission_conductors.values():
+            job_sub_total += conductor.num_job_submissions
+            cmd_sub_total += conductor.num_cmd_submissions
+            failed_submission_scripts.extend(
+                e.script for e in conductor.submission_errors)
+
         # Report what went down.
-        max_samples = min(len(self.prj.samples), args.limit or float("inf"))
+        max_samples = num_samples_considered
         _LOGGER.info("\nLooper finished")
         _LOGGER.info("Samples valid for job generation: %d of %d",
                      len(processed_samples), max_samples)
@@ -427,6 +776,9 @@ class Runner(Executor):
         _LOGGER.info("Commands submitted: %d of %d",
                      cmd_sub_total, num_commands_possible)
         _LOGGER.info("Jobs submitted: %d", job_sub_total)
+        _LOGGER.info("Sample files written: %d (%d unchanged; %.2f s)",
+                     sample_writer.num_written, sample_writer.num_unchanged,
+                     sample_writer.write_time)
         if args.dry_run:
             _LOGGER.info("Dry run. No jobs were actually submitted.")
 
@@ -466,21 +818,52 @@ class Runner(Executor):
 
 class Summarizer(Executor):
     """ Project/Sample output summarizer """
-    def __init__(self, prj):
+    def __init__(self, prj, parse_workers=1, full=False, report_workers=1):
         # call the inherited initialization
         super(Summarizer, self).__init__(prj)
+        self.report_workers = report_workers
+        # What was parsed and rendered last time may be reused for samples
+        # whose outputs haven't changed, unless a full rebuild is requested.
+        self.cache = SummaryCache(
+            get_file_for_project(self.prj, 'summary_cache.json'), reset=full)
         # pull together all the fits and stats from each sample into project-combined spreadsheets.
-        self.stats, self.columns = _create_stats_summary(self.prj, self.counter)
-        self.objs = _create_obj_summary(self.prj, self.counter)
+        self.stats, self.columns = _create_stats_summary(
+            self.prj, self.counter, self.status_index, cache=self.cache)
+        self.objs = _create_obj_summary(
+            self.prj, self.counter, self.status_index, workers=parse_workers,
+            cache=self.cache)
 
     def __call__(self):
         """ Do the summarization. """
+        from .html_reports import HTMLReportBuilder
         _run_custom_summarizers(self.prj)
         # initialize the report builder
-        report_builder = HTMLReportBuilder(self.prj)
+        report_builder = HTMLReportBuilder(
+            self.prj, self.status_index, self.cache,
+            workers=self.report_workers)
         # run the report builder. a set of HTML pages is produced
         report_path = report_builder(self.objs, self.stats, uniqify(self.columns))
         _LOGGER.info("HTML Report (n=" + str(len(self.stats)) + "): " + report_path)
+        self.cache.save()
+        _update_resource_history(self.prj, self.status_index)
+
+
+def _update_resource_history(prj, status_index):
+    """
+    Record resource use of a project's completed runs, if it has a history.
+
+    :param looper.Project prj: project whose resource history to update
+    :param looper.sample_status.SampleStatusIndex status_index: index of
+        the project's sample output folders
+    """
+    from .resource_history import ResourceHistory
+    history = ResourceHistory.for_project(prj, create=False)
+    if history is None:
+        return
+    try:
+        history.update(status_index)
+    finally:
+        history.close()
 
 
 def _run_custom_summarizers(project):
@@ -511,84 +894,229 @@ def _run_custom_summarizers(project):
                         _LOGGER.warning("Summarizer was unable to run: " + str(summarizer))
 
 
-def _create_stats_summary(project, counter):
+def _create_stats_summary(project, counter, status_index=None, cache=None):
     """
     Create stats spreadsheet and columns to be considered in the report, save the spreadsheet to file
 
+    The stats files of all samples are read into a single long table of
+    (sample, key, value, pipeline) records, which is deduplicated and pivoted
+    as a whole, then written with a single call. Stats values are kept as
+    they're written in each sample's stats file.
+
     :param looper.Project project: the project to be summarized
     :param looper.LooperCounter counter: a counter object
+    :param looper.sample_status.SampleStatusIndex status_index: index of
+        the project's sample output folders, optional
+    :param looper.summary_cache.SummaryCache cache: records previously read
+        from stats files, reused for files that haven't changed; optional
+    :return (list[collections.OrderedDict], list[str]): annotation sheet data
+        and stats for each sample that has a stats file, and names of the
+        summary's columns
     """
-    # Create stats_summary file
-    columns = []
-    stats = []
-    project_samples = project.samples
+    import csv
+    import pandas as _pd
+    if status_index is None:
+        status_index = SampleStatusIndex.from_project(project)
+    # Rank each column by where it first appears: sample's position, then
+    # sheet before stats, then position within the sheet or stats records.
+    column_ranks = {}
+    sheet_rows = []
+    positions = []
+    lines = []
     missing_files = 0
     _LOGGER.info("Creating stats summary...")
-    for sample in project_samples:
+    for i, sample in enumerate(project.samples):
         _LOGGER.info(counter.show(sample.sample_name, sample.protocol))
-        sample_output_folder = sample_folder(project, sample)
         # Grab the basic info from the annotation sheet for this sample.
         # This will correspond to a row in the output.
         sample_stats = sample.get_sheet_dict()
-        columns.extend(sample_stats.keys())
+        for j, k in enumerate(sample_stats.keys()):
+            column_ranks.setdefault(k, (i, 0, j))
         # Version 0.3 standardized all stats into a single file
-        stats_file = os.path.join(sample_output_folder, "stats.tsv")
-        if not os.path.isfile(stats_file):
+        stats_file = status_index.get_file(sample.sample_name, STATS_FILENAME)
+        if stats_file is None:
             missing_files += 1
             continue
-        t = _pd.read_csv(stats_file, sep="\t", header=None, names=['key', 'value', 'pl'])
-        t.drop_duplicates(subset=['key', 'pl'], keep='last', inplace=True)
-        t.loc[:, 'plkey'] = t['pl'] + ":" + t['key']
-        dupes = t.duplicated(subset=['key'], keep=False)
-        t.loc[dupes, 'key'] = t.loc[dupes, 'plkey']
-        sample_stats.update(t.set_index('key')['value'].to_dict())
-        stats.append(sample_stats)
-        columns.extend(t.key.tolist())
+        sheet_rows.append(sample_stats)
+        positions.append(i)
+        records = _read_records(sample.sample_name, stats_file, cache)
+        lines.extend(_label_records(records, i))
+    long_stats = _pd.read_csv(
+        io.StringIO(u"".join(lines)), sep="\t", header=None,
+        names=["sample", "key", "value", "pl"], dtype=str, na_filter=False,
+        quoting=csv.QUOTE_NONE) if lines else \
+        _pd.DataFrame(columns=["sample", "key", "value", "pl"], dtype=str)
+    long_stats["sample"] = long_stats["sample"].astype(int)
+    # Within a sample, a pipeline's last value for a key wins, and a key
+    # reported by multiple pipelines is qualified by pipeline name.
+    long_stats.drop_duplicates(
+        subset=["sample", "key", "pl"], keep="last", inplace=True)
+    dupes = long_stats.duplicated(subset=["sample", "key"], keep=False)
+    long_stats.loc[dupes, "key"] = \
+        long_stats.loc[dupes, "pl"] + ":" + long_stats.loc[dupes, "key"]
+    firsts = long_stats.drop_duplicates(subset=["key"])
+    for j, (i, k) in enumerate(zip(firsts["sample"], firsts["key"])):
+        if k not in column_ranks or (i, 1, j) < column_ranks[k]:
+            column_ranks[k] = (i, 1, j)
+    columns = sorted(column_ranks.keys(), key=column_ranks.get)
+    # Stats take precedence over annotation sheet values of the same name.
+    stats_by_position = dict(zip(positions, sheet_rows))
+    for i, k, v in zip(long_stats["sample"], long_stats["key"],
+                       long_stats["value"]):
+        stats_by_position[i][k] = v
+    table = _pd.DataFrame(sheet_rows, index=positions, dtype=object)
+    if not long_stats.empty:
+        table = long_stats.drop_duplicates(
+            subset=["sample", "key"], keep="last").pivot(
+            index="sample", columns="key", values="value").combine_first(table)
     tsv_outfile_path = get_file_for_project(project, 'stats_summary.tsv')
     if missing_files > 0:
         _LOGGER.warning("Stats files missing for {} samples".format(missing_files))
-    tsv_outfile = open(tsv_outfile_path, 'w')
-    tsv_writer = csv.DictWriter(tsv_outfile, fieldnames=uniqify(columns), delimiter='\t', extrasaction='ignore')
-    tsv_writer.writeheader()
-    for row in stats:
-        tsv_writer.writerow(row)
-    tsv_outfile.close()
-    _LOGGER.info("Summary (n=" + str(len(stats)) + "): " + tsv_outfile_path)
+    table.reindex(columns=columns).to_csv(
+        tsv_outfile_path, sep="\t", index=False, line_terminator="\r\n")
+    _LOGGER.info("Summary (n=" + str(len(sheet_rows)) + "): " + tsv_outfile_path)
     counter.reset()
-    return stats, uniqify(columns)
+    return sheet_rows, columns
 
 
-def _create_obj_summary(project, counter):
+def _read_records(sample_name, indexed_file, cache=None):
+    """
+    Read the fields of each record in a sample's tab-separated output file.
+
+    :param str sample_name: name of the sample to which the file belongs
+    :param looper.sample_status.IndexedFile indexed_file: the file to read
+    :param looper.summary_cache.SummaryCache cache: records previously read
+        from files, reused if the file hasn't changed; optional
+    :return list[list[str]]: fields of each nonblank line of the file
+    """
+    records = None if cache is None else cache.get(sample_name, indexed_file)
+    if records is None:
+        records = _read_tsv_records(indexed_file.path)
+        if cache is not None:
+            cache.put(sample_name, indexed_file, records)
+    return records
+
+
+def _read_tsv_records(path):
+    """
+    Read the fields of each record in a tab-separated file.
+
+    :param str path: path to the file to read
+    :return list[list[str]]: fields of each nonblank line of the file
+    """
+    with io.open(path, 'r', encoding="utf-8") as f:
+        return [l.rstrip(u"\n").split(u"\t") for l in f if l.strip()]
+
+
+def _label_records(records, label):
+    """
+    Format records as lines of text, each labeled with an additional field.
+
+    :param Iterable[list[str]] records: fields of each record
+    :param object label: value with which to label each record, e.g. the
+        sample's name or position within the project
+    :return list[str]: tab-separated lines, each prefixed with the label
+    """
+    prefix = u"{}\t".format(label)
+    return [prefix + u"\t".join(r) + u"\n" for r in records]
+
+
+def _create_obj_summary(project, counter, status_index=None, workers=1,
+                        chunk_size=OBJECTS_CHUNK_SIZE, cache=None):
     """
     Read sample specific objects files and save to a data frame
 
+    Objects files are parsed in chunks of samples, each chunk as a single
+    table, and the chunks' tables are concatenated once at the end. With
+    multiple workers, chunks are parsed in a pool of processes; either way,
+    the text held in memory at once is bounded by the chunk size.
+
     :param looper.Project project: the project to be summarized
     :param looper.LooperCounter counter: a counter object
+    :param looper.sample_status.SampleStatusIndex status_index: index of
+        the project's sample output folders, optional
+    :param int workers: number of processes with which to parse objects files
+    :param int chunk_size: number of samples' objects files to parse together
+    :param looper.summary_cache.SummaryCache cache: records previously read
+        from objects files, reused for files that haven't changed; optional
     :return pandas.DataFrame: objects spreadsheet
     """
+    import pandas as _pd
+    if status_index is None:
+        status_index = SampleStatusIndex.from_project(project)
     _LOGGER.info("Creating objects summary...")
-    objs = _pd.DataFrame()
     # Create objects summary file
+    objs_files = []
+    unread = {}
     missing_files = 0
     for sample in project.samples:
         # Process any reported objects
         _LOGGER.info(counter.show(sample.sample_name, sample.protocol))
-        sample_output_folder = sample_folder(project, sample)
-        objs_file = os.path.join(sample_output_folder, "objects.tsv")
-        if not os.path.isfile(objs_file):
+        objs_file = status_index.get_file(sample.sample_name, OBJECTS_FILENAME)
+        if objs_file is None:
             missing_files += 1
             continue
-        t = _pd.read_csv(objs_file, sep="\t", header=None,
-                         names=['key', 'filename', 'anchor_text', 'anchor_image', 'annotation'])
-        t['sample_name'] = sample.name
-        objs = objs.append(t, ignore_index=True)
+        records = None if cache is None else \
+            cache.get(sample.sample_name, objs_file)
+        if records is None:
+            unread[objs_file.path] = (sample.sample_name, objs_file)
+        objs_files.append((sample.name, objs_file.path, records))
     if missing_files > 0:
         _LOGGER.warning("Object files missing for {} samples".format(missing_files))
+    chunks = [objs_files[i:(i + chunk_size)]
+              for i in range(0, len(objs_files), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        pool = multiprocessing.Pool(min(workers, len(chunks)))
+        try:
+            results = list(pool.imap(_read_objects_files, chunks))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_read_objects_files(c) for c in chunks]
+    _LOGGER.debug("Read %d objects file(s); reused %d from cache",
+                  len(unread), len(objs_files) - len(unread))
+    tables = []
+    for t, read in results:
+        if t is not None:
+            tables.append(t)
+        if cache is not None:
+            for path, records in read.items():
+                sample_name, objs_file = unread[path]
+                cache.put(sample_name, objs_file, records)
+    objs = _pd.concat(tables, ignore_index=True) if tables else _pd.DataFrame()
     # create the path to save the objects file in
     objs.to_csv(get_file_for_project(project, 'objs_summary.tsv'), sep="\t")
     return objs
 
 
+def _read_objects_files(named_files):
+    """
+    Parse a collection of samples' objects files as a single table.
+
+    :param Iterable[(str, str, list[list[str]])] named_files: sample name,
+        path to that sample's objects file, and the file's records if they've
+        already been read (null otherwise)
+    :return (pandas.DataFrame | NoneType, Mapping[str, list[list[str]]]):
+        records from all of the files, labeled by sample name (null if the
+        files have no records), and the records read here, by file path
+    """
+    import csv
+    import pandas as _pd
+    lines = []
+    read = {}
+    for sample_name, path, records in named_files:
+        if records is None:
+            records = read[path] = _read_tsv_records(path)
+        lines.extend(_label_records(records, sample_name))
+    if not lines:
+        return None, read
+    t = _pd.read_csv(io.StringIO(u"".join(lines)), sep="\t", header=None,
+                     names=["sample_name"] + OBJECTS_COLUMNS,
+                     dtype={"sample_name": str}, quoting=csv.QUOTE_NONE)
+    return t[OBJECTS_COLUMNS + ["sample_name"]], read
+
+
 def get_file_for_project(prj, appendix):
     """
     Create a path to the file for the current project. Takes the possibility of subproject being activated at the time
@@ -622,6 +1150,7 @@ def aggregate_exec_skip_reasons(skip_reasons_sample_pairs):
 
 def create_failure_message(reason, samples):
     """ Explain lack of submission for a single reason, 1 or more samples. """
+    from colorama import Fore, Style
     color = Fore.LIGHTRED_EX
     reason_text = color + reason + Style.RESET_ALL
     samples_text = ", ".join(samples)
@@ -713,6 +1242,7 @@ class LooperCounter(object):
         :param str protocol: name of the protocol
         :return str: message suitable for logging a status update
         """
+        from colorama import Fore
         self.count += 1
         return _submission_status_text(
             curr=self.count, total=self.total, sample_name=name,
@@ -726,6 +1256,7 @@ class LooperCounter(object):
 
 
 def _submission_status_text(curr, total, sample_name, sample_protocol, color):
+    from colorama import Style
     return color + \
            "## [{n} of {N}] {sample} ({protocol})".format(
                n=curr, N=total, sample=sample_name, protocol=sample_protocol) + \
@@ -766,6 +1297,15 @@ def main():
     parser = build_parser()
     args, remaining_args = parser.parse_known_args()
 
+    import yaml
+    from colorama import init
+    init()
+    # Standard streams are wrapped first, as logmuse expects them.
+    from logmuse import setup_logger
+    from peppy import ProjectContext
+    from .project_cache import build_project
+    from .utils import determine_config_path
+
     # Set the logging level.
     if args.dbg:
         # Debug mode takes precedence and will listen for all messages.
@@ -800,9 +1340,13 @@ def main():
         _LOGGER.debug("compute_env_file: " + str(getattr(args, 'env', None)))
     _LOGGER.debug("Building Project")
     try:
-        prj = Project(
-            determine_config_path(args.config_file), subproject=args.subproject,
-            file_checks=args.file_checks, compute_env_file=getattr(args, 'env', None))
+        # Streamed samples are built as they're processed, not with the project.
+        stream_kwargs = {"defer_sample_construction": True} \
+            if getattr(args, "stream", False) else {}
+        prj = build_project(
+            determine_config_path(args.config_file), use_cache=args.use_cache,
+            subproject=args.subproject, file_checks=args.file_checks,
+            compute_env_file=getattr(args, 'env', None), **stream_kwargs)
     except yaml.parser.ParserError as e:
         print("Project config parse failed -- {}".format(e))
         sys.exit(1)
@@ -832,16 +1376,20 @@ def main():
             return Destroyer(prj)(args)
 
         if args.command == "summarize":
-            Summarizer(prj)()
+            Summarizer(prj, parse_workers=args.parse_workers,
+                       full=args.full, report_workers=args.report_workers)()
 
         if args.command == "check":
             # TODO: hook in fixed samples once protocol differentiation is
             # TODO (continued) figured out (related to #175).
-            Checker(prj)(flags=args.flags)
+            Checker(prj)(flags=args.flags, scheduler=args.scheduler)
 
         if args.command == "clean":
             return Cleaner(prj)(args)
 
+        if args.command == "cancel":
+            return Canceller(prj)(args)
+
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,136 @@
+""" Assignment of samples to lumped jobs by bin-packing heuristics """
+
+import heapq
+import math
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["PACKING_METHODS", "WEIGHTED_METHODS", "first_fit_decreasing",
+           "longest_processing_time", "pack"]
+
+
+def first_fit_decreasing(sizes, max_size=float("inf"), max_count=None):
+    """
+    Pack items into bins, each as full as fits, largest items first.
+
+    Each item goes to the first bin with room for it, in both total size and
+    number of items, or to a new bin if there's none. An item that alone
+    exceeds the size limit gets a bin of its own.
+
+    :param Sequence[float] sizes: size of each item
+    :param float max_size: upper bound on a bin's total size
+    :param int max_count: upper bound on the number of items in a bin
+    :return list[list[int]]: indices of each bin's items
+    """
+    max_count = max_count or len(sizes)
+    bins, totals = [], []
+    for i in _decreasing(sizes):
+        for b, members in enumerate(bins):
+            if len(members) < max_count and totals[b] + sizes[i] <= max_size:
+                members.append(i)
+                totals[b] += sizes[i]
+                break
+        else:
+            bins.append([i])
+            totals.append(sizes[i])
+    return _ordered(bins)
+
+
+def longest_processing_time(sizes, max_size=float("inf"), max_count=None,
+                            weights=None):
+    """
+    Spread items over as few bins as the limits allow, balancing their loads.
+
+    Items start out spread over the fewest bins that could hold them within
+    both limits. Each item, heaviest first, goes to the least loaded bin with
+    room for it, in both total size and number of items, or to a new bin if
+    there's none. An item that alone exceeds the size limit gets a bin of its
+    own.
+
+    :param Sequence[float] sizes: size of each item
+    :param float max_size: upper bound on a bin's total size
+    :param int max_count: upper bound on the number of items in a bin
+    :param Sequence[float] weights: load of each item, e.g. its expected
+        runtime; by default, its size
+    :return list[list[int]]: indices of each bin's items
+    """
+    if not sizes:
+        return []
+    max_count = max_count or len(sizes)
+    weights = sizes if weights is None else weights
+    num_bins = max(int(math.ceil(float(len(sizes)) / max_count)),
+                   int(math.ceil(sum(sizes) / max_size)), 1)
+    num_bins = min(num_bins, len(sizes))
+    bins = [[] for _ in range(num_bins)]
+    totals = [0.0] * num_bins
+    # Least loaded bin first, then the earliest.
+    loads = [(0.0, b) for b in range(num_bins)]
+    for i in _decreasing(weights):
+        passed = []
+        while loads:
+            load, b = heapq.heappop(loads)
+            if len(bins[b]) < max_count and \
+                    (not bins[b] or totals[b] + sizes[i] <= max_size):
+                break
+            passed.append((load, b))
+        else:
+            load, b = 0.0, len(bins)
+            bins.append([])
+            totals.append(0.0)
+        bins[b].append(i)
+        totals[b] += sizes[i]
+        heapq.heappush(loads, (load + weights[i], b))
+        for entry in passed:
+            heapq.heappush(loads, entry)
+    return _ordered(bins)
+
+
+# Packing heuristic by name, as given on the command line
+PACKING_METHODS = {"ffd": first_fit_decreasing, "lpt": longest_processing_time}
+
+# Heuristics that balance loads, which may be weighted other than by size
+WEIGHTED_METHODS = {"lpt"}
+
+
+def pack(pool, method, max_size=float("inf"), max_count=None, weights=None):
+    """
+    Repartition a pool of samples into jobs by a bin-packing heuristic.
+
+    :param Sequence[(peppy.Sample, str)] pool: samples, each with its
+        argument string
+    :param str method: name of the heuristic, a key of PACKING_METHODS
+    :param float max_size: upper bound on total input size for a job
+    :param int max_count: upper bound on the number of samples in a job
+    :param Sequence[float] weights: load of each sample, e.g. its expected
+        runtime, for a heuristic that balances loads; by default, its size
+    :return list[(list[(peppy.Sample, str)], float)]: each job's pool, in
+        the original order, and its total input size
+    :raise ValueError: if the heuristic is unknown
+    """
+    try:
+        heuristic = PACKING_METHODS[method]
+    except KeyError:
+        raise ValueError("Unknown packing method: '{}'; choose from: {}".
+                         format(method, ", ".join(sorted(PACKING_METHODS))))
+    sizes = [float(s.input_file_size) for s, _ in pool]
+    kwargs = {"max_size": max_size, "max_count": max_count}
+    if weights is not None and method in WEIGHTED_METHODS:
+        kwargs["weights"] = weights
+    jobs = []
+    for members in heuristic(sizes, **kwargs):
+        jobs.append(([pool[i] for i in members],
+                     sum(sizes[i] for i in members)))
+    return jobs
+
+
+def _decreasing(values):
+    """ Indices of values from largest to smallest, earliest first on ties. """
+    return sorted(range(len(values)), key=lambda i: (-values[i], i))
+
+
+def _ordered(bins):
+    """ Put each bin's items, then the bins, in the items' original order. """
+    return sorted((sorted(b) for b in bins if b), key=lambda b: b[0])
@@ -1,5 +1,8 @@
 """ Model the connection between a pipeline and a project or executor. """
 
+import bisect
+from collections import namedtuple
+import importlib
 import inspect
 import logging
 import os
@@ -15,6 +18,8 @@ from yaml import SafeLoader
 
 from .exceptions import InvalidResourceSpecificationException, \
     MissingPipelineConfigurationException, PipelineInterfaceConfigError
+from .subtype_cache import SubtypeCache
+from .subtype_discovery import find_sample_subtypes
 from .utils import get_logger
 from attmap import PathExAttMap
 from peppy import utils, Sample
@@ -29,6 +34,25 @@ PL_KEY = "pipelines"
 PROTOMAP_KEY = "protocol_mapping"
 SUBTYPE_MAPPING_SECTION = "sample_subtypes"
 
+# How a pipeline's Sample subtype is found: by executing the pipeline module,
+# or by parsing it and importing only the module that defines the subtype.
+SUBTYPE_DISCOVERY_KEY = "subtype_discovery"
+IMPORT_DISCOVERY = "import"
+STATIC_DISCOVERY = "static"
+
+# Instance attribute (not a mapped key) holding data compiled per pipeline
+_COMPILED_ATTR = "_compiled"
+
+
+# Sample subtypes resolved from pipeline modules, shared by all interfaces
+SUBTYPE_CACHE = SubtypeCache()
+
+
+# A pipeline option, the sample attribute providing its argument (null for a
+# flag-like option), and whether a sample must have that attribute.
+ArgumentSpec = namedtuple(
+    "ArgumentSpec", field_names=["option", "attribute", "required", "flag"])
+
 
 @utils.copy
 class PipelineInterface(PathExAttMap):
@@ -77,14 +101,33 @@ class PipelineInterface(PathExAttMap):
         return "{} from {}, with {} pipeline(s): {}".format(
                 self.__class__.__name__, source, num_pipelines, pipelines)
 
+    def __setitem__(self, key, value, finalize=True):
+        """ Store a value, discarding anything compiled from old data. """
+        self.__dict__.pop(_COMPILED_ATTR, None)
+        super(PipelineInterface, self).__setitem__(key, value, finalize)
+
+    def __delitem__(self, key):
+        """ Remove a value, discarding anything compiled from it. """
+        self.__dict__.pop(_COMPILED_ATTR, None)
+        super(PipelineInterface, self).__delitem__(key)
+
+    @property
+    def _lower_type_bound(self):
+        """ Nested sections count their changes, to expire compiled data. """
+        return _ConfigSection
+
     def choose_resource_package(self, pipeline_name, file_size):
         """
         Select resource bundle for given input file size to given pipeline.
 
+        The pipeline's resource packages are compiled into a table sorted by
+        minimum file size the first time a package is chosen for it; that
+        table's reused for as long as the pipeline's data are unchanged.
+
         :param str pipeline_name: Name of pipeline.
         :param float file_size: Size of input data (in gigabytes).
         :return MutableMapping: resource bundle appropriate for given pipeline,
-            for given input file size
+            for given input file size; this is a new copy, free to be modified
         :raises ValueError: if indicated file size is negative, or if the
             file size value specified for any resource package is negative
         :raises _InvalidResourceSpecificationException: if no default
@@ -98,6 +141,37 @@ class PipelineInterface(PathExAttMap):
             raise ValueError("Attempted selection of resource package for "
                              "negative file size: {}".format(file_size))
 
+        table = self._get_compiled(
+            pipeline_name, self._compile_resource_table)
+        if table is None:
+            return {}
+
+        # Thresholds ascend, so the last one not exceeding the file size
+        # marks the minimally-sufficient package.
+        thresholds, packages = table
+        i = bisect.bisect_right(thresholds, file_size) - 1
+        rp_name, rp_data = packages[i]
+        _LOGGER.debug(
+            "Selected '{}' package with min file size {} Gb for file "
+            "of size {} Gb.".format(rp_name, thresholds[i], file_size))
+        return PathExAttMap(_plain_copy(rp_data))
+
+    def _compile_resource_table(self, pipeline_name):
+        """
+        Sort a pipeline's resource packages by minimum file size.
+
+        :param str pipeline_name: Name of pipeline.
+        :return (tuple[float], tuple[(str, dict)]) | NoneType: ascending
+            minimum file sizes, and for each the name of its package and the
+            package's data, merged with the pipeline's compute settings, as
+            builtin collections; null if the pipeline has no resources
+            specification
+        :raises ValueError: if the file size value specified for any resource
+            package is negative
+        :raises _InvalidResourceSpecificationException: if no default
+            resource package specification is provided
+        """
+
         def notify(msg):
             msg += " for pipeline {}".format(pipeline_name)
             if self.pipe_iface_file is not None:
@@ -121,7 +195,7 @@ class PipelineInterface(PathExAttMap):
                 resources = pl[res_key]
             except KeyError:
                 notify("No resources")
-                return {}
+                return None
         else:
             if res_key in pl:
                 _LOGGER.warning(
@@ -130,16 +204,16 @@ class PipelineInterface(PathExAttMap):
                     "version will be used".format(rk=res_key, c=compute_key))
 
         # Require default resource package specification.
-        try:
-            default_resource_package = \
-                    resources[DEFAULT_COMPUTE_RESOURCES_NAME]
-        except KeyError:
+        if DEFAULT_COMPUTE_RESOURCES_NAME not in resources:
             raise InvalidResourceSpecificationException(
                 "Pipeline resources specification lacks '{}' section".
                     format(DEFAULT_COMPUTE_RESOURCES_NAME))
 
         # Parse min file size to trigger use of a resource package.
         def file_size_ante(name, data):
+            # Default package minimum is 0.
+            if name == DEFAULT_COMPUTE_RESOURCES_NAME:
+                return 0
             # Retrieve this package's minimum file size.
             # Retain backwards compatibility while enforcing key presence.
             try:
@@ -154,32 +228,32 @@ class PipelineInterface(PathExAttMap):
                         "'{}': {}".format(name, fsize))
             return fsize
 
-        # Enforce default package minimum of 0.
-        if "file_size" in default_resource_package:
-            del default_resource_package["file_size"]
-        resources[DEFAULT_COMPUTE_RESOURCES_NAME]["min_file_size"] = 0
-
         try:
-            # Sort packages by descending file size minimum to return first
-            # package for which given file size satisfies the minimum.
-            resource_packages = sorted(
-                resources.items(),
-                key=lambda name_and_data: file_size_ante(*name_and_data),
-                reverse=True)
+            # Sort ascending by file size minimum, and among packages with
+            # equal minimum put those specified first last, so that they're
+            # the ones chosen.
+            ranked = sorted(
+                (file_size_ante(name, data), -i, name, data)
+                for i, (name, data) in enumerate(resources.items()))
         except ValueError:
             _LOGGER.error("Unable to use file size to prioritize "
                           "resource packages: {}".format(resources))
             raise
 
-        # "Descend" packages by min file size, choosing minimally-sufficient.
-        for rp_name, rp_data in resource_packages:
-            size_ante = file_size_ante(rp_name, rp_data)
-            if file_size >= size_ante:
-                _LOGGER.debug(
-                    "Selected '{}' package with min file size {} Gb for file "
-                    "of size {} Gb.".format(rp_name, size_ante, file_size))
-                rp_data.update(universal_compute)
-                return rp_data
+        thresholds, packages = [], []
+        for size_ante, _, rp_name, rp_data in ranked:
+            # Packages are frozen as builtin collections, which are cheap to
+            # copy for each caller.
+            rp_data = _plain_copy(rp_data)
+            if rp_name == DEFAULT_COMPUTE_RESOURCES_NAME:
+                # Default package is an early adopter of the new size name.
+                if "file_size" in rp_data:
+                    del rp_data["file_size"]
+                rp_data["min_file_size"] = 0
+            rp_data.update(_plain_copy(universal_compute))
+            thresholds.append(size_ante)
+            packages.append((rp_name, rp_data))
+        return tuple(thresholds), tuple(packages)
 
     def finalize_pipeline_key_and_paths(self, pipeline_key):
         """
@@ -249,91 +323,121 @@ class PipelineInterface(PathExAttMap):
             is null
         :return str: command-line argument string for pipeline
         """
+        return self.get_arg_strings(
+            pipeline_name, [sample], submission_folder_path,
+            **null_replacements)[0]
 
-        def update_argtext(argtext, option, argument):
-            if argument is None or "" == argument:
-                _LOGGER.debug("Skipping null/empty argument for option "
-                              "'{}': {}".format(option, type(argument)))
-                return argtext
-            _LOGGER.debug("Adding argument for pipeline option '{}': {}".
-                          format(option, argument))
-            return "{} {} {}".format(argtext, option, argument)
-
-        default_filepath = os.path.join(
-                submission_folder_path, sample.generate_filename())
-        _LOGGER.debug("Default sample filepath: '%s'", default_filepath)
-        proxies = {"yaml_file": default_filepath}
-        proxies.update(null_replacements)
-
-        _LOGGER.debug("Building arguments string")
-        config = self.select_pipeline(pipeline_name)
-        argstring = ""
-
-        if "arguments" not in config:
-            _LOGGER.info("No arguments found for '%s' in '%s'",
-                              pipeline_name, self.pipe_iface_file)
-            return argstring
-
-        args = config["arguments"]
-        for pipe_opt, sample_attr in args.iteritems():
-            if sample_attr is None:
-                _LOGGER.debug("Option '%s' is not mapped to a sample "
-                              "attribute, so it will be added to the pipeline "
-                              "argument string as a flag-like option.",
-                              str(pipe_opt))
-                argstring += " {}".format(pipe_opt)
-                continue
+    def get_arg_strings(self, pipeline_name, samples,
+                        submission_folder_path="", **null_replacements):
+        """
+        For a given pipeline and each of a collection of samples, return the
+        argument string.
 
-            try:
-               arg = getattr(sample, sample_attr)
-            except AttributeError:
-                _LOGGER.error(
-                        "Error (missing attribute): '%s' requires sample "
-                        "attribute '%s' for option '%s'",
-                        pipeline_name, sample_attr, pipe_opt)
-                raise
-
-            # It's undesirable to put a null value in the argument string.
-            if arg is None:
-                _LOGGER.debug("Null value for sample attribute: '%s'",
-                              sample_attr)
-                try:
-                    arg = proxies[sample_attr]
-                except KeyError:
-                    reason = "No default for null sample attribute: '{}'".\
-                            format(sample_attr)
-                    raise ValueError(reason)
-                _LOGGER.debug("Found default for '{}': '{}'".
-                              format(sample_attr, arg))
-
-            argstring = update_argtext(
-                    argstring, option=pipe_opt, argument=arg)
-
-        # Add optional arguments
-        if "optional_arguments" in config:
-            _LOGGER.debug("Processing options")
-            args = config["optional_arguments"]
-            for pipe_opt, sample_attr in args.iteritems():
-                _LOGGER.debug("Option '%s' maps to sample attribute '%s'",
-                              pipe_opt, sample_attr)
-                if sample_attr is None or sample_attr == "":
-                    _LOGGER.debug("Null/empty sample attribute name for "
-                                  "pipeline option '{}'".format(pipe_opt))
+        :param str pipeline_name: Name of pipeline.
+        :param Iterable[Sample] samples: samples for which jobs are being built
+        :param str submission_folder_path: path to folder in which files
+            related to submission of these samples will be placed.
+        :param dict null_replacements: mapping from name of Sample attribute
+            name to value to use in arg string if Sample attribute's value
+            is null
+        :return list[str]: command-line argument string for pipeline, for
+            each sample, in order
+        :raise AttributeError: if a sample lacks an attribute that's
+            required for the pipeline's arguments
+        :raise ValueError: if a sample's value for a required attribute is
+            null, and there's no replacement for it
+        """
+        plan = self.get_argument_plan(pipeline_name)
+        argstrings = []
+        for sample in samples:
+            parts = []
+            for option, attribute, required, flag in plan:
+                if flag:
+                    parts.append(option)
                     continue
                 try:
-                    arg = getattr(sample, sample_attr)
+                    arg = getattr(sample, attribute)
                 except AttributeError:
+                    if required:
+                        _LOGGER.error(
+                            "Error (missing attribute): '%s' requires sample "
+                            "attribute '%s' for option '%s'",
+                            pipeline_name, attribute, option)
+                        raise
                     _LOGGER.warning(
                         "> Note (missing optional attribute): '%s' requests "
                         "sample attribute '%s' for option '%s'",
-                        pipeline_name, sample_attr, pipe_opt)
+                        pipeline_name, attribute, option)
+                    continue
+                # It's undesirable to put a null value in the argument string.
+                if arg is None and required:
+                    arg = _null_replacement(
+                        sample, attribute, submission_folder_path,
+                        null_replacements)
+                if arg is None or "" == arg:
                     continue
-                argstring = update_argtext(
-                        argstring, option=pipe_opt, argument=arg)
+                parts.append("{} {}".format(option, arg))
+            argstrings.append("".join(" " + p for p in parts))
+        return argstrings
 
-        _LOGGER.debug("Script args: '%s'", argstring)
+    def get_argument_plan(self, pipeline_name):
+        """
+        Get the sequence of options from which a pipeline's arguments are built.
+
+        :param str pipeline_name: Name of pipeline.
+        :return tuple[ArgumentSpec]: specification of each option, in the
+            order in which its argument is passed to the pipeline; required
+            arguments precede optional ones
+        """
+        return self._get_compiled(pipeline_name, self._compile_argument_plan)
 
-        return argstring
+    def _compile_argument_plan(self, pipeline_name):
+        """
+        Determine the options from which a pipeline's arguments are built.
+
+        :param str pipeline_name: Name of pipeline.
+        :return tuple[ArgumentSpec]: specification of each option, in the
+            order in which its argument is passed to the pipeline
+        """
+        config = self.select_pipeline(pipeline_name)
+        if "arguments" not in config:
+            _LOGGER.info("No arguments found for '%s' in '%s'",
+                         pipeline_name, self.pipe_iface_file)
+            return ()
+        plan = [ArgumentSpec("{}".format(opt), attr, True, attr is None)
+                for opt, attr in config["arguments"].items()]
+        # Optional arguments without a sample attribute name are ignored.
+        plan.extend(ArgumentSpec("{}".format(opt), attr, False, False)
+                    for opt, attr in config.get("optional_arguments", {}).items()
+                    if attr is not None and attr != "")
+        _LOGGER.debug("Argument plan for '%s': %s", pipeline_name, plan)
+        return tuple(plan)
+
+    def _get_compiled(self, pipeline_name, compile_data):
+        """
+        Get data compiled for a pipeline, compiling them if needed.
+
+        Data are compiled anew once the interface is changed, including
+        within a nested section.
+
+        :param str pipeline_name: Name of pipeline.
+        :param function(str) -> object compile_data: how to compile the
+            data for a pipeline, given its name
+        :return object: data compiled for the pipeline
+        """
+        compiled = self.__dict__.setdefault(_COMPILED_ATTR, {})
+        key = (compile_data.__name__, pipeline_name)
+        try:
+            num_changes, data = compiled[key]
+        except KeyError:
+            pass
+        else:
+            if num_changes == _ConfigSection.num_changes:
+                return data
+        num_changes = _ConfigSection.num_changes
+        data = compile_data(pipeline_name)
+        compiled[key] = (num_changes, data)
+        return data
 
     def fetch_pipelines(self, protocol):
         """
@@ -361,12 +465,26 @@ class PipelineInterface(PathExAttMap):
             that use the pipeline indicated
         :raises KeyError: if given a pipeline key that's not mapped in the
             pipelines section of this PipelineInterface
+        :raises PipelineInterfaceConfigError: if the pipeline's means of
+            subtype discovery is unknown
         """
 
         subtype = None
 
         this_pipeline_data = self.pipelines[strict_pipe_key]
 
+        discovery = this_pipeline_data.get(
+            SUBTYPE_DISCOVERY_KEY) or IMPORT_DISCOVERY
+        if discovery == IMPORT_DISCOVERY:
+            find_subtype = _import_sample_subtype
+        elif discovery == STATIC_DISCOVERY:
+            find_subtype = _find_sample_subtype
+        else:
+            raise PipelineInterfaceConfigError(
+                "Invalid {} for pipeline '{}': '{}'; use '{}' or '{}'".format(
+                    SUBTYPE_DISCOVERY_KEY, strict_pipe_key, discovery,
+                    IMPORT_DISCOVERY, STATIC_DISCOVERY))
+
         try:
             subtypes = this_pipeline_data[SUBTYPE_MAPPING_SECTION]
         except KeyError:
@@ -409,7 +527,7 @@ class PipelineInterface(PathExAttMap):
         # The import helper function can return null if the import attempt
         # fails, so provide the base Sample type as a fallback.
         subtype = subtype or \
-                  _import_sample_subtype(full_pipe_path, subtype_name) or \
+                  find_subtype(full_pipe_path, subtype_name) or \
                   Sample
         _LOGGER.debug("Using Sample subtype: %s", subtype.__name__)
         return subtype
@@ -532,6 +650,82 @@ class PipelineInterface(PathExAttMap):
         return "looper_args" in config and config["looper_args"]
 
 
+def _null_replacement(sample, attribute, submission_folder_path,
+                      null_replacements):
+    """
+    Determine the argument to use for a sample attribute with null value.
+
+    :param Sample sample: sample with null value for the attribute
+    :param str attribute: name of the attribute
+    :param str submission_folder_path: path to folder in which files
+        related to submission of the sample will be placed.
+    :param Mapping null_replacements: value to use for null attribute values,
+        by attribute name; the sample's YAML file is the default for
+        'yaml_file'
+    :return object: value to use as the attribute's argument
+    :raise ValueError: if there's no replacement for the attribute's value
+    """
+    try:
+        return null_replacements[attribute]
+    except KeyError:
+        if attribute == "yaml_file":
+            return os.path.join(
+                submission_folder_path, sample.generate_filename())
+        raise ValueError("No default for null sample attribute: '{}'".
+                         format(attribute))
+
+
+def _plain_copy(data):
+    """
+    Copy configuration data as builtin collections.
+
+    :param object data: configuration data, e.g. a resource package
+    :return object: copy of the data, with each mapping as a dict and each
+        list or tuple as a list
+    """
+    if isinstance(data, Mapping):
+        return {k: _plain_copy(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_plain_copy(v) for v in data]
+    return data
+
+
+class _ConfigSection(PathExAttMap):
+    """
+    Nested section of a pipeline interface, e.g. a pipeline's resources.
+
+    Each change to any section is counted, so that data compiled from an
+    interface may be recognized as stale with a single comparison.
+    """
+
+    # Changes made to any section so far
+    num_changes = 0
+
+    def __setitem__(self, key, value, finalize=True):
+        _ConfigSection.num_changes += 1
+        super(_ConfigSection, self).__setitem__(key, value, finalize)
+
+    def __delitem__(self, key):
+        _ConfigSection.num_changes += 1
+        super(_ConfigSection, self).__delitem__(key)
+
+    def pop(self, key, *args):
+        _ConfigSection.num_changes += 1
+        return super(_ConfigSection, self).pop(key, *args)
+
+    def __eq__(self, other):
+        # A section's equal to a plain map with the same entries.
+        return isinstance(other, PathExAttMap) and \
+            list(self.items()) == list(other.items())
+
+    def __ne__(self, other):
+        return not self == other
+
+    @property
+    def _lower_type_bound(self):
+        return _ConfigSection
+
+
 def expand_pl_paths(piface):
     """
     Expand path to each pipeline in a declared mapping
@@ -573,6 +767,9 @@ def _import_sample_subtype(pipeline_filepath, subtype_name=None):
     """
     Import a particular Sample subclass from a Python module.
 
+    A module is imported at most once per state of its file and subtype
+    requested; see SUBTYPE_CACHE.
+
     :param str pipeline_filepath: path to file to regard as Python module
     :param str subtype_name: name of the target class (which must derive from
         the base Sample class in order for it to be used), optional; if
@@ -581,11 +778,139 @@ def _import_sample_subtype(pipeline_filepath, subtype_name=None):
     :return type: the imported class, defaulting to base Sample in case of
         failure with the import or other logic
     """
+    return SUBTYPE_CACHE.fetch(
+        pipeline_filepath, subtype_name, _load_sample_subtype)
+
+
+def _find_sample_subtype(pipeline_filepath, subtype_name=None):
+    """
+    Find a particular Sample subclass without executing a pipeline module.
+
+    Like _import_sample_subtype, but the pipeline module is parsed rather
+    than executed to find its subtypes, and only the module that defines the
+    one to use is imported; see SUBTYPE_CACHE.
+
+    :param str pipeline_filepath: path to file to regard as Python module
+    :param str subtype_name: name of the target class, optional; if
+        unspecified, if the module defines a single subtype, then that will
+        be used; otherwise, the base Sample type will be used.
+    :return type: the imported class, defaulting to base Sample in case of
+        failure with the import or other logic
+    """
+    return SUBTYPE_CACHE.fetch(pipeline_filepath, subtype_name,
+                               _parse_sample_subtype, kind=STATIC_DISCOVERY)
+
+
+def _parse_sample_subtype(pipeline_filepath, subtype_name=None):
+    """
+    Parse a Python module to find a Sample subclass, and import only that.
+
+    A subtype defined by the pipeline module itself requires its import,
+    as does one that can't be imported from the module that defines it.
+
+    :param str pipeline_filepath: path to file to regard as Python module
+    :param str subtype_name: name of the target class, optional
+    :return (type, bool): the class to use, defaulting to base Sample in
+        case of failure with the parse or other logic, and whether the
+        module could be parsed
+    """
+    base_type = Sample
+
+    _, ext = os.path.splitext(pipeline_filepath)
+    if ext != ".py":
+        return base_type, False
+
+    try:
+        subtypes = find_sample_subtypes(pipeline_filepath)
+    except (IOError, SyntaxError, ValueError, TypeError) as e:
+        _LOGGER.debug("Can't parse subtype from '%s', using base %s: %r",
+                      pipeline_filepath, base_type.__name__, e)
+        return base_type, False
+    _LOGGER.debug("%d proper %s subtype(s) bound in '%s': %s", len(subtypes),
+                  base_type.__name__, pipeline_filepath,
+                  ", ".join(d.name for d in subtypes.values()))
+
+    if not subtype_name:
+        if len(subtypes) != 1:
+            _LOGGER.debug("%s subtype cannot be selected from %d found in "
+                          "'%s'; using base type", base_type.__name__,
+                          len(subtypes), pipeline_filepath)
+            return base_type, True
+        definition = list(subtypes.values())[0]
+    else:
+        names = [d.name for d in subtypes.values()]
+        matches = [d for d in subtypes.values() if d.name == subtype_name]
+        if not matches:
+            raise ValueError(
+                "'{}' matches none of the {} {} subtype(s) defined "
+                "in '{}': {}".format(subtype_name, len(names),
+                                     base_type.__name__, pipeline_filepath,
+                                     ", ".join(names)))
+        definition = matches[0]
+
+    if definition.module is not None:
+        try:
+            module = _import_defining_module(definition, pipeline_filepath)
+            subtype = getattr(module, definition.name)
+        except (BaseException, Exception) as e:
+            _LOGGER.debug("Can't import %s from module '%s': %r",
+                          definition.name, definition.module, e)
+        else:
+            if inspect.isclass(subtype) and issubclass(subtype, base_type):
+                _LOGGER.debug("Imported %s from module '%s'",
+                              definition.name, definition.module)
+                return subtype, True
+    # Defined by the pipeline module itself, or not importable on its own
+    return _load_sample_subtype(pipeline_filepath, definition.name)
+
+
+def _import_defining_module(definition, pipeline_filepath):
+    """
+    Import the module in which a subtype was found, as the pipeline would.
+
+    The pipeline's folder leads the module search path for the import, as it
+    does when the pipeline runs as a script, and as it did for discovery.
+
+    :param looper.subtype_discovery.SubtypeDefinition definition: where the
+        subtype is defined
+    :param str pipeline_filepath: path to the pipeline module's file
+    :return module: the module that defines the subtype
+    :raise ImportError: if the module imported by the definition's name
+        isn't the file in which the subtype was found
+    """
+    folder = os.path.dirname(os.path.realpath(pipeline_filepath))
+    sys.path.insert(0, folder)
+    try:
+        module = importlib.import_module(definition.module)
+    finally:
+        sys.path.remove(folder)
+    module_file = getattr(module, "__file__", None)
+    if module_file is None or \
+            os.path.splitext(os.path.realpath(module_file))[0] != \
+            os.path.splitext(os.path.realpath(definition.path))[0]:
+        raise ImportError("Module '{}' is '{}', not '{}'".format(
+            definition.module, module_file, definition.path))
+    return module
+
+
+def _load_sample_subtype(pipeline_filepath, subtype_name=None):
+    """
+    Import a Python module and find a particular Sample subclass in it.
+
+    :param str pipeline_filepath: path to file to regard as Python module
+    :param str subtype_name: name of the target class (which must derive from
+        the base Sample class in order for it to be used), optional; if
+        unspecified, if the module defines a single subtype, then that will
+        be used; otherwise, the base Sample type will be used.
+    :return (type, bool): the class to use, defaulting to base Sample in
+        case of failure with the import or other logic, and whether the
+        module could be imported
+    """
     base_type = Sample
 
     _, ext = os.path.splitext(pipeline_filepath)
     if ext != ".py":
-        return base_type
+        return base_type, False
 
     try:
         _LOGGER.debug("Attempting to import module defined by {}".
@@ -611,12 +936,12 @@ def _import_sample_subtype(pipeline_filepath, subtype_name=None):
                      "does it lack a conditional on '__main__'? "
                      "Using base type: %s",
                      pipeline_filepath, base_type.__name__)
-        return base_type
+        return base_type, False
 
     except (BaseException, Exception) as e:
         _LOGGER.debug("Can't import subtype from '%s', using base %s: %r",
                      pipeline_filepath, base_type.__name__,  e)
-        return base_type
+        return base_type, False
 
     else:
         _LOGGER.debug("Successfully imported pipeline module '%s', "
@@ -645,7 +970,7 @@ def _import_sample_subtype(pipeline_filepath, subtype_name=None):
             _LOGGER.debug("Single %s subtype found in '%s': '%s'",
                           base_type.__name__, pipeline_filepath,
                           subtype.__name__)
-            return subtype
+            return subtype, True
         else:
             # We can't arbitrarily select from among 0 or multiple subtypes.
             # Note that this text is used in the tests, as validation of which
@@ -655,14 +980,14 @@ def _import_sample_subtype(pipeline_filepath, subtype_name=None):
             _LOGGER.debug("%s subtype cannot be selected from %d found in "
                           "'%s'; using base type", base_type.__name__,
                           len(proper_subtypes), pipeline_filepath)
-            return base_type
+            return base_type, True
     else:
         # Specific subtype request --> look for match.
         for st in proper_subtypes:
             if st.__name__ == subtype_name:
                 _LOGGER.debug("Successfully imported %s from '%s'",
                               subtype_name, pipeline_filepath)
-                return st
+                return st, True
         raise ValueError(
                 "'{}' matches none of the {} {} subtype(s) defined "
                 "in '{}': {}".format(subtype_name, len(proper_subtypes),
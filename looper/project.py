@@ -6,7 +6,7 @@ import itertools
 import os
 
 import peppy
-from peppy.utils import is_command_callable
+from peppy.utils import fetch_samples, is_command_callable
 from .const import *
 from .pipeline_interface import PipelineInterface
 from .utils import get_logger, partition
@@ -35,6 +35,52 @@ class Project(peppy.Project):
         self.interfaces_by_protocol = \
             process_pipeline_interfaces(self.metadata.pipeline_interfaces)
 
+    def iter_sample_chunks(self, chunk_size):
+        """
+        Build this Project's samples lazily, a chunk at a time.
+
+        If the samples haven't been built, each chunk is built from the next
+        rows of the sample table as it's requested, and none is retained by
+        the Project, so that the memory for samples is bounded by the chunk
+        size rather than by the number of samples.
+
+        :param int chunk_size: number of samples per chunk
+        :return Iterable[list[peppy.Sample]]: chunks of this Project's
+            samples, in order of the sample table
+        :raise ValueError: if the chunk size isn't positive
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive: {}".
+                             format(chunk_size))
+        table_key = "_" + peppy.const.NAME_TABLE_ATTR
+        table = self.get(table_key)
+        if self.get("_samples") or table is None:
+            samples = self.samples
+            for start in range(0, len(samples), chunk_size):
+                yield samples[start:(start + chunk_size)]
+            return
+        self._check_subann_name_overlap()
+        for start in range(0, len(table), chunk_size):
+            yield self.build_samples(table.iloc[start:(start + chunk_size)])
+
+    def build_samples(self, rows):
+        """
+        Build the samples of just some rows of this Project's sample table.
+
+        The samples built aren't retained by the Project.
+
+        :param pandas.DataFrame rows: rows of the sample table
+        :return list[peppy.Sample]: a sample for each row, in order
+        """
+        table_key = "_" + peppy.const.NAME_TABLE_ATTR
+        table = self.get(table_key)
+        # Samples are built from the table, so build from just the rows.
+        self[table_key] = rows
+        try:
+            return self._prep_samples()
+        finally:
+            self[table_key] = table
+
     @property
     def project_folders(self):
         """ Keys for paths to folders to ensure exist. """
@@ -226,6 +272,56 @@ def process_pipeline_interfaces(pipeline_interface_locations):
     return interface_by_protocol
 
 
+def iter_samples(prj, chunk_size):
+    """
+    Iterate over a project's samples, building them a chunk at a time.
+
+    :param looper.Project | peppy.ProjectContext prj: project, or context
+        that selects some of a project's samples
+    :param int chunk_size: number of samples to build at a time
+    :return Iterable[peppy.Sample]: the (selected) samples, in order of the
+        project's sample table
+    """
+    context = prj if isinstance(prj, peppy.ProjectContext) else None
+    if context is not None:
+        prj = context.prj
+    for chunk in prj.iter_sample_chunks(chunk_size):
+        if context is not None:
+            chunk = _select_samples(chunk, context)
+        for sample in chunk:
+            yield sample
+
+
+def build_samples(prj, rows):
+    """
+    Build the samples of some rows of a project's sample table.
+
+    :param looper.Project | peppy.ProjectContext prj: project, or context
+        that selects some of a project's samples
+    :param pandas.DataFrame rows: rows of the project's sample table
+    :return list[peppy.Sample]: the rows' (selected) samples, in order
+    """
+    if isinstance(prj, peppy.ProjectContext):
+        return _select_samples(prj.prj.build_samples(rows), prj)
+    return prj.build_samples(rows)
+
+
+def _select_samples(samples, context):
+    """ Select the samples a project context would, from among some. """
+    try:
+        return fetch_samples(
+            _SampleChunk(samples), selector_attribute=context.attribute,
+            selector_include=context.include,
+            selector_exclude=context.exclude)
+    except AttributeError:
+        # Only if no sample in the chunk has the selector attribute
+        return [] if context.include else samples
+
+
+# Bearer of samples, as a project is for selection of its samples
+_SampleChunk = namedtuple("_SampleChunk", ["samples"])
+
+
 # Collect PipelineInterface, Sample type, pipeline path, and script with flags.
 SubmissionBundle = namedtuple(
     "SubmissionBundle",
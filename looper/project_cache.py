@@ -0,0 +1,257 @@
+""" Persistent cache of the Project built from a configuration file """
+
+from collections import OrderedDict
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+
+from attmap._att_map_like import AttMapLike
+from peppy.const import METADATA_KEY, NAME_TABLE_ATTR, \
+    SAMPLE_SUBANNOTATIONS_KEY
+
+from ._version import __version__
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["ProjectCache", "build_project"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Bump when the layout or the meaning of cached contents changes.
+CACHE_FORMAT_VERSION = 2
+
+# Environment variables that may select the compute configuration file
+COMPUTE_ENV_VARS = ["DIVCFG", "PEPENV"]
+
+# Reference to an environment variable, as expanded in a project's paths
+ENV_VAR_REFERENCE = re.compile(br"\$\{?([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def build_project(config_file, use_cache=True, cache_folder=None, **kwargs):
+    """
+    Create a Project, reusing a cached one if its inputs are unchanged.
+
+    :param str config_file: path to the project configuration file
+    :param bool use_cache: whether to look for and store a cached Project
+    :param str cache_folder: folder in which to cache projects; by default,
+        looper's folder in the user cache folder
+    :param kwargs: keyword arguments with which to construct the Project
+    :return looper.Project: Project for the configuration file
+    """
+    from .project import Project
+    if not use_cache:
+        return Project(config_file, **kwargs)
+    cache = ProjectCache(config_file, folder=cache_folder, **kwargs)
+    prj = cache.load()
+    if prj is not None:
+        # Construction ensures the project's folders exist, so reuse must too.
+        if not kwargs.get("dry"):
+            prj.make_project_dirs()
+        return prj
+    prj = Project(config_file, **kwargs)
+    try:
+        cache.save(prj)
+    except (IOError, OSError, pickle.PicklingError) as e:
+        _LOGGER.warning("Could not cache project: %r", e)
+    return prj
+
+
+class ProjectCache(object):
+    """
+    Project built from a configuration file, persisted for reuse.
+
+    A cached Project is reused only if built from the same configuration
+    file with the same arguments by the same looper version, and only while
+    each file it was built from (the configuration file itself, the sample
+    and subsample tables, the pipeline interfaces, and the compute
+    configuration) has the same content as when the Project was built, and
+    each environment variable those files refer to (as $VAR or ${VAR}) has
+    the same value.
+
+    :param str config_file: path to the project configuration file
+    :param str folder: folder in which to cache projects; by default,
+        looper's folder in the user cache folder
+    :param kwargs: keyword arguments with which the Project's constructed
+    """
+
+    def __init__(self, config_file, folder=None, **kwargs):
+        super(ProjectCache, self).__init__()
+        config_file = os.path.realpath(config_file)
+        key = json.dumps(
+            [config_file, sorted(kwargs.items()),
+             [os.getenv(v) for v in COMPUTE_ENV_VARS],
+             list(sys.version_info[:2])], default=str)
+        self.path = os.path.join(
+            folder or default_cache_folder(),
+            hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pickle")
+
+    def load(self):
+        """
+        Read the cached Project, if there's one built from unchanged files.
+
+        :return looper.Project | NoneType: the cached Project, or null if
+            there's none usable
+        """
+        if not _PICKLING_SUPPORTED:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                unpickler = pickle.Unpickler(f)
+                header = unpickler.load()
+                if header.get("version") != CACHE_FORMAT_VERSION or \
+                        header.get("looper_version") != __version__:
+                    _LOGGER.debug("Ignoring project cache from another "
+                                  "version: %s", self.path)
+                    return None
+                changed = [p for p, digest in header["inputs"]
+                           if _digest(p) != digest]
+                if changed:
+                    _LOGGER.debug("Project inputs changed since cached: %s",
+                                  ", ".join(changed))
+                    return None
+                changed = [v for v, value in header["environment"].items()
+                           if os.getenv(v) != value]
+                if changed:
+                    _LOGGER.debug("Environment variables changed since "
+                                  "project cached: %s", ", ".join(changed))
+                    return None
+                prj = unpickler.load()
+        except IOError:
+            _LOGGER.debug("No project cache: %s", self.path)
+            return None
+        except Exception as e:
+            _LOGGER.warning("Ignoring unreadable project cache: %s (%r)",
+                            self.path, e)
+            return None
+        _LOGGER.debug("Using cached project: %s", self.path)
+        return prj
+
+    def save(self, prj):
+        """
+        Write a Project to the cache, replacing any previous version.
+
+        :param looper.Project prj: Project to cache, as it was constructed
+        """
+        if not _PICKLING_SUPPORTED:
+            return
+        inputs = _project_inputs(prj)
+        header = {"version": CACHE_FORMAT_VERSION,
+                  "looper_version": __version__,
+                  "inputs": [(p, _digest(p)) for p in inputs],
+                  "environment": {v: os.getenv(v)
+                                  for v in _referenced_env_vars(inputs)}}
+        buf = io.BytesIO()
+        pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+        pickler.dispatch_table = _Reducers()
+        pickler.dump(header)
+        pickler.dump(prj)
+        folder = os.path.dirname(self.path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(buf.getvalue())
+        os.rename(tmp, self.path)
+        _LOGGER.debug("Saved project cache: %s", self.path)
+
+
+def default_cache_folder():
+    """
+    Determine the folder in which to cache projects by default.
+
+    :return str: path to looper's projects folder in the user cache folder
+    """
+    root = os.getenv("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "looper", "projects")
+
+
+def _project_inputs(prj):
+    """ Paths to the files from which a Project was built. """
+    metadata = prj[METADATA_KEY]
+    paths = [prj.config_file, metadata.get(NAME_TABLE_ATTR),
+             metadata.get(SAMPLE_SUBANNOTATIONS_KEY)]
+    paths.extend(metadata.get("pipeline_interfaces") or [])
+    for interfaces in prj.interfaces_by_protocol.values():
+        paths.extend(i.pipe_iface_file for i in interfaces)
+    paths.append(getattr(prj.dcc, "config_file", None))
+    inputs = []
+    for p in paths:
+        if isinstance(p, str) and p not in inputs:
+            inputs.append(p)
+    return inputs
+
+
+def _referenced_env_vars(paths):
+    """ Names of the environment variables to which files refer. """
+    names = set()
+    for p in paths:
+        try:
+            with open(p, 'rb') as f:
+                text = f.read()
+        except IOError:
+            continue
+        names.update(n.decode("ascii") for n in ENV_VAR_REFERENCE.findall(text))
+    return names
+
+
+def _digest(path):
+    """ Digest a file's content, or a folder's listing; null if absent. """
+    if os.path.isdir(path):
+        return hashlib.sha1(
+            "\n".join(sorted(os.listdir(path))).encode("utf-8")).hexdigest()
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except IOError:
+        return None
+
+
+# A pickler's own table of reduction functions by type is honored only as of
+# Python 3.3.
+_PICKLING_SUPPORTED = sys.version_info >= (3, 3)
+
+
+class _Reducers(object):
+    """
+    Reduction functions by type, for pickling of mapping-like objects.
+
+    An attmap-based object is pickled by default as an OrderedDict, whose
+    reconstruction calls the type with no arguments, which a Project or
+    Sample doesn't allow. Instead, each such object is created without
+    initialization, and its attributes and entries are restored as stored.
+    """
+
+    def get(self, t, default=None):
+        try:
+            return self[t]
+        except KeyError:
+            return default
+
+    def __getitem__(self, t):
+        if isinstance(t, type) and issubclass(t, AttMapLike):
+            return _reduce_mapping
+        raise KeyError(t)
+
+
+def _reduce_mapping(obj):
+    """ Reduce an attmap-based object to its type, attributes and entries. """
+    base = OrderedDict if isinstance(obj, OrderedDict) else dict
+    entries = [(k, base.__getitem__(obj, k)) for k in base.__iter__(obj)]
+    return _new_instance, (type(obj), ), dict(obj.__dict__), None, \
+        iter(entries)
+
+
+def _new_instance(cls):
+    """ Create an object of the given type without initialization. """
+    return cls.__new__(cls)
@@ -0,0 +1,303 @@
+""" Record of pipelines' resource use, by which to predict what jobs need """
+
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from .sample_status import LOG_SUFFIX, MEMORY_LOG_KEY, RUNTIME_LOG_KEY, \
+    scan_log
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["ResourceHistory", "parse_memory", "parse_runtime"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Appendix of the name of a project's resource history file
+HISTORY_FILE_APPENDIX = "resource_history.sqlite"
+
+# Fewest observations of a pipeline from which to predict its resource use
+MIN_OBSERVATIONS = 3
+
+# Factor by which to pad predicted memory use and runtime
+HEADROOM = 1.25
+
+# Least memory (MB) and time (seconds) to request from a prediction
+MIN_MEMORY = 256
+MIN_TIME = 60
+
+_RUNTIME_REGEX = re.compile(
+    r"^(?:(\d+) days?, )?(\d+):(\d{1,2}):(\d{1,2}(?:\.\d*)?)$")
+_MEMORY_REGEX = re.compile(r"^([0-9.]+(?:[eE][-+]?\d+)?)\s*([KMGT]?i?B)?$",
+                           re.IGNORECASE)
+_GB_BY_UNIT = {"": 1.0, "B": 1.0 / 1024 ** 3, "KB": 1.0 / 1024 ** 2,
+               "MB": 1.0 / 1024, "GB": 1.0, "TB": 1024.0}
+
+
+def parse_runtime(text):
+    """
+    Parse a runtime as pypiper logs it, e.g. '1:10:10' or '2 days, 0:01:02'.
+
+    :param str text: runtime text from a pipeline's log
+    :return float | NoneType: runtime in seconds, null if unparseable
+    """
+    match = _RUNTIME_REGEX.match((text or "").strip())
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return 86400 * int(days or 0) + 3600 * int(hours) + \
+        60 * int(minutes) + float(seconds)
+
+
+def parse_memory(text):
+    """
+    Parse a memory use as pypiper logs it, e.g. '1.2 GB'; GB if no unit.
+
+    :param str text: memory text from a pipeline's log
+    :return float | NoneType: memory in GB, null if unparseable
+    """
+    match = _MEMORY_REGEX.match((text or "").strip())
+    if not match:
+        return None
+    amount, unit = match.groups()
+    factor = _GB_BY_UNIT.get((unit or "").upper().replace("I", ""))
+    return None if factor is None else float(amount) * factor
+
+
+class ResourceHistory(object):
+    """
+    Each sample's input size and resource use for each pipeline, in SQLite.
+
+    A sample's input size, and the cores requested for it, are recorded as
+    its job is submitted; its runtime and peak memory use are filled in
+    from its pipeline log once its run is complete, which update does.
+    Runtime and memory are each fit, for a pipeline and core count, as a
+    straight line in input size, from which a job's needs are predicted.
+
+    :param str path: path to the history's database file
+    """
+
+    def __init__(self, path):
+        super(ResourceHistory, self).__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            "pipeline TEXT NOT NULL, sample TEXT NOT NULL, "
+            "input_size REAL, cores INTEGER, runtime REAL, memory REAL, "
+            "log_mtime REAL, PRIMARY KEY (pipeline, sample))")
+        self._conn.commit()
+        # Fits are made from the observations as of opening, and may be
+        # used from threads other than the one that opened the database.
+        self._observations = {}
+        for pipeline, size, cores, runtime, memory in self._conn.execute(
+                "SELECT pipeline, input_size, cores, runtime, memory "
+                "FROM observations WHERE runtime IS NOT NULL AND "
+                "memory IS NOT NULL AND input_size IS NOT NULL"):
+            self._observations.setdefault((pipeline, cores), []).append(
+                (size, runtime, memory))
+        self._fits = {}
+        self._fit_lock = threading.Lock()
+
+    @classmethod
+    def for_project(cls, prj, create=True):
+        """
+        Open the resource history kept in a project's output folder.
+
+        :param looper.Project prj: project whose history to open
+        :param bool create: whether to create the history if there's none
+        :return ResourceHistory | NoneType: the project's history, or null
+            if there's none and it's not to be created, or if it can't be
+            opened
+        """
+        from .looper import get_file_for_project
+        path = get_file_for_project(prj, HISTORY_FILE_APPENDIX)
+        if not create and not os.path.isfile(path):
+            return None
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            _LOGGER.warning("Can't open resource history: %s (%r)", path, e)
+            return None
+
+    def record_submission(self, pipeline, samples, cores=None):
+        """
+        Record samples' submission, replacing what's known of previous runs.
+
+        :param str pipeline: name of the pipeline
+        :param Iterable[(str, float)] samples: name and input size of each
+            sample submitted
+        :param int cores: number of cores requested for the samples
+        """
+        try:
+            cores = None if cores is None else int(cores)
+        except ValueError:
+            cores = None
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO observations (pipeline, sample, "
+                "input_size, cores) VALUES (?, ?, ?, ?)",
+                [(pipeline, str(name), float(size), cores)
+                 for name, size in samples])
+        except sqlite3.Error as e:
+            _LOGGER.warning("Can't record submission in resource history: "
+                            "%s (%r)", self.path, e)
+
+    def update(self, status_index):
+        """
+        Fill in resource use of submitted samples whose runs have completed.
+
+        A sample's log is read only if it's changed since last read.
+
+        :param looper.sample_status.SampleStatusIndex status_index: index of
+            the sample output folders in which to find logs and flags
+        :return int: number of observations filled in or revised
+        """
+        try:
+            rows = self._conn.execute(
+                "SELECT pipeline, sample, log_mtime FROM observations").\
+                fetchall()
+        except sqlite3.Error as e:
+            _LOGGER.warning("Can't read resource history: %s (%r)",
+                            self.path, e)
+            return 0
+        updates = []
+        for pipeline, sample, log_mtime in rows:
+            if status_index.get_file(
+                    sample, "{}_completed.flag".format(pipeline)) is None:
+                continue
+            log_file = status_index.get_file(sample, pipeline + LOG_SUFFIX)
+            if log_file is None or log_file.mtime == log_mtime:
+                continue
+            try:
+                values = scan_log(log_file.path,
+                                  [RUNTIME_LOG_KEY, MEMORY_LOG_KEY])
+            except IOError:
+                continue
+            runtime = parse_runtime(values[RUNTIME_LOG_KEY])
+            memory = parse_memory(values[MEMORY_LOG_KEY])
+            if runtime is None or memory is None:
+                _LOGGER.debug("No resource use in log: %s", log_file.path)
+            updates.append((runtime, memory, log_file.mtime, pipeline, sample))
+        try:
+            self._conn.executemany(
+                "UPDATE observations SET runtime = ?, memory = ?, "
+                "log_mtime = ? WHERE pipeline = ? AND sample = ?", updates)
+        except sqlite3.Error as e:
+            _LOGGER.warning("Can't update resource history: %s (%r)",
+                            self.path, e)
+            return 0
+        if updates:
+            _LOGGER.debug("Resource use recorded for %d run(s): %s",
+                          len(updates), self.path)
+        return len(updates)
+
+    def predict(self, pipeline, size, count=1, cores=None):
+        """
+        Predict the memory and time a job needs, from past resource use.
+
+        Memory is predicted for the job's total input size, as an upper
+        bound for the largest of its samples; time is predicted for each of
+        its samples, which run one after another, as if each had an equal
+        share of the total input size. Each is padded by HEADROOM.
+
+        :param str pipeline: name of the pipeline
+        :param float size: total input size (in GB) of the job's samples
+        :param int count: number of samples in the job
+        :param int cores: number of cores requested for the job; only
+            observations with the same request are used
+        :return dict[str, str] | NoneType: resource settings 'mem' (in MB)
+            and 'time' (as hours:minutes:seconds), or null if there
+            are too few observations from which to predict
+        """
+        fits = self._fits_for(pipeline, cores)
+        if fits is None:
+            return None
+        runtime_fit, memory_fit = fits
+        count = max(count, 1)
+        seconds = count * _evaluate(runtime_fit, float(size) / count)
+        mem = 1024 * _evaluate(memory_fit, float(size))
+        return {"mem": str(int(max(math.ceil(HEADROOM * mem), MIN_MEMORY))),
+                "time": _format_time(max(HEADROOM * seconds, MIN_TIME))}
+
+    def predict_runtime(self, pipeline, size, cores=None):
+        """
+        Predict how long a single sample takes to run, from past runtimes.
+
+        :param str pipeline: name of the pipeline
+        :param float size: input size (in GB) of the sample
+        :param int cores: number of cores requested for the sample's job;
+            only observations with the same request are used
+        :return float | NoneType: predicted runtime (in seconds), without
+            headroom, or null if there are too few observations from which
+            to predict
+        """
+        fits = self._fits_for(pipeline, cores)
+        return None if fits is None else _evaluate(fits[0], float(size))
+
+    def _fits_for(self, pipeline, cores):
+        """ Runtime and memory fits for a pipeline and core count, if any. """
+        try:
+            cores = None if cores is None else int(cores)
+        except ValueError:
+            return None
+        key = (pipeline, cores)
+        with self._fit_lock:
+            if key not in self._fits:
+                self._fits[key] = _fit(self._observations.get(key, []))
+        return self._fits[key]
+
+    def close(self):
+        """ Commit what's been recorded, and close the database. """
+        if self._conn is None:
+            return
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            _LOGGER.warning("Can't save resource history: %s (%r)",
+                            self.path, e)
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+def _fit(observations):
+    """ Fit runtime and memory each as a line in size, if there's enough. """
+    if len(observations) < MIN_OBSERVATIONS:
+        return None
+    sizes = [o[0] for o in observations]
+    return tuple(_least_squares(sizes, [o[i] for o in observations])
+                 for i in (1, 2))
+
+
+def _least_squares(xs, ys):
+    """ Intercept and slope of the least-squares line through points. """
+    n = float(len(xs))
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return mean_y - slope * mean_x, slope
+
+
+def _evaluate(line, x):
+    """ Value of a fitted line, but never below zero. """
+    intercept, slope = line
+    return max(intercept + slope * x, 0.0)
+
+
+def _format_time(seconds):
+    """ Format a duration as hours:minutes:seconds, as SLURM and SGE take. """
+    seconds = int(math.ceil(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return "{:02d}:{:02d}:{:02d}".format(hours, minutes, seconds)
@@ -0,0 +1,349 @@
+""" Single-pass index of the contents of sample output folders """
+
+from collections import defaultdict, namedtuple, OrderedDict
+import logging
+import os
+import re
+
+from .const import *
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["SampleStatusIndex", "IndexedFile", "scan_log"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Categories of sample folder file that the index tracks, by filename suffix.
+FLAG_SUFFIX = ".flag"
+LOG_SUFFIX = "_log.md"
+PROFILE_SUFFIX = "_profile.tsv"
+COMMANDS_SUFFIX = "_commands.sh"
+CLEANUP_SUFFIX = "_cleanup.sh"
+STATS_FILENAME = "stats.tsv"
+OBJECTS_FILENAME = "objects.tsv"
+TRACKED_SUFFIXES = [FLAG_SUFFIX, LOG_SUFFIX, PROFILE_SUFFIX,
+                    COMMANDS_SUFFIX, CLEANUP_SUFFIX]
+TRACKED_FILENAMES = [STATS_FILENAME, OBJECTS_FILENAME]
+
+_FLAG_NAME_REGEX = re.compile(r'\_([a-z]+)\.flag$')
+
+# Phrases labeling the runtime and peak memory use in a pipeline's log
+RUNTIME_LOG_KEY = "Total elapsed time"
+MEMORY_LOG_KEY = "Peak memory used"
+LOG_ENCODINGS = ["utf-8", "ascii"]
+LOG_BLOCK_SIZE = 64 * 1024
+
+
+# Path, modification time, and size (in bytes) of an indexed file.
+IndexedFile = namedtuple("IndexedFile", field_names=["path", "mtime", "size"])
+
+
+class SampleStatusIndex(object):
+    """
+    Snapshot of the status-relevant files in each sample's output folder.
+
+    The results folder is scanned once, and each sample folder within it is
+    listed once, so that queries about flags and pipeline outputs for many
+    samples don't each go back to the filesystem. Only files of the tracked
+    kinds--flags, logs, profiles, commands, cleanup scripts, stats, and
+    objects--are indexed.
+
+    :param str results_folder: path to the folder with a subfolder per sample
+    :param Iterable[str] sample_names: names of the samples (subfolders) to
+        index, optional; if unspecified, every subfolder is indexed.
+    """
+
+    def __init__(self, results_folder, sample_names=None):
+        super(SampleStatusIndex, self).__init__()
+        self.results_folder = results_folder
+        self._sample_names = None if sample_names is None else \
+            set(str(n) for n in sample_names)
+        self._files_by_sample = {}
+        self._scan()
+
+    @classmethod
+    def from_project(cls, prj):
+        """
+        Index the output folders of a project's samples.
+
+        :param looper.Project prj: project whose sample folders to index
+        :return SampleStatusIndex: index of the project's sample folders
+        """
+        return cls(prj.metadata[RESULTS_SUBDIR_KEY],
+                   sample_names=[s.sample_name for s in prj.samples])
+
+    def __contains__(self, sample_name):
+        return str(sample_name) in self._files_by_sample
+
+    def __len__(self):
+        return len(self._files_by_sample)
+
+    @property
+    def sample_names(self):
+        """
+        Names of the samples with an output folder, in sorted order.
+
+        :return list[str]: names of the samples with an output folder
+        """
+        return sorted(self._files_by_sample.keys())
+
+    def files(self, sample_name, suffix):
+        """
+        Fetch a sample's indexed files with the given filename ending.
+
+        :param str sample_name: name of the sample of interest
+        :param str suffix: filename ending, e.g. '_log.md' or 'stats.tsv'
+        :return list[IndexedFile]: matching files, sorted by filename;
+            empty if the sample lacks an output folder
+        """
+        return [f for name, f in
+                self._files_by_sample.get(str(sample_name), {}).items()
+                if name.endswith(suffix)]
+
+    def get_file(self, sample_name, filename):
+        """
+        Fetch a particular indexed file for a sample.
+
+        :param str sample_name: name of the sample of interest
+        :param str filename: name of the file within the sample's folder
+        :return IndexedFile | NoneType: the indexed file, or null if absent
+        """
+        if filename is None:
+            return None
+        return self._files_by_sample.get(str(sample_name), {}).get(filename)
+
+    def match_file(self, sample_name, suffix):
+        """
+        Find the name of the first of a sample's files with a given ending.
+
+        :param str sample_name: name of the sample of interest
+        :param str suffix: filename ending, e.g. '_log.md'
+        :return str | NoneType: name of the matched file, null if none match
+        """
+        matches = self.files(sample_name, suffix)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            _LOGGER.warning("Matched multiple files for '%s' in folder for "
+                            "sample '%s'; returning the first one",
+                            suffix, sample_name)
+        return os.path.basename(matches[0].path)
+
+    def flag_files(self, sample_name, pl_names=None):
+        """
+        Find any flag files for a sample.
+
+        :param str sample_name: name of the sample of interest
+        :param str | Iterable[str] pl_names: name(s) of the pipeline(s) for
+            which flag(s) should be found, optional; if unspecified, flags
+            for any pipeline are found.
+        :return list[str]: paths to the sample's flag files
+        """
+        if isinstance(pl_names, str):
+            pl_names = [pl_names]
+        return [f.path for f in self.files(sample_name, FLAG_SUFFIX)
+                if not pl_names or any(
+                    os.path.basename(f.path).startswith(pl) for pl in pl_names)]
+
+    def flags(self, sample_name):
+        """
+        Determine the status flag name(s) present for a sample.
+
+        :param str sample_name: name of the sample of interest
+        :return list[str]: names of the flags found, e.g. 'completed'
+        """
+        names = []
+        for f in self.files(sample_name, FLAG_SUFFIX):
+            match = _FLAG_NAME_REGEX.search(os.path.basename(f.path))
+            if match:
+                names.append(match.groups()[0])
+        return names
+
+    def files_by_flag(self, flags=STATUS_FLAGS, sample_names=None):
+        """
+        Collect flag file paths by flag name.
+
+        :param Iterable[str] | str flags: name(s) of flag(s) of interest
+        :param Iterable[str] sample_names: names of the samples for which to
+            collect flag files, optional; if unspecified, every indexed
+            sample is used.
+        :return Mapping[str, list[str]]: binding between flag name and
+            collection of paths to flag files for that flag
+        """
+        flags = [flags] if isinstance(flags, str) else list(flags)
+        suffices = [(f, "{}{}".format(f, FLAG_SUFFIX)) for f in flags]
+        if sample_names is None:
+            sample_names = self.sample_names
+        files_by_flag = defaultdict(list)
+        for name in sample_names:
+            for f in self.files(name, FLAG_SUFFIX):
+                for flag, suffix in suffices:
+                    if f.path.endswith(suffix):
+                        files_by_flag[flag].append(f.path)
+        return files_by_flag
+
+    def refresh(self, sample_name):
+        """
+        Re-index the output folder of a single sample.
+
+        :param str sample_name: name of the sample to re-index
+        """
+        sample_name = str(sample_name)
+        folder = os.path.join(self.results_folder, sample_name)
+        if os.path.isdir(folder):
+            self._files_by_sample[sample_name] = _index_folder(folder)
+        else:
+            self._files_by_sample.pop(sample_name, None)
+
+    def _scan(self):
+        """ List the results folder, then each sample folder within it. """
+        if not os.path.isdir(self.results_folder):
+            _LOGGER.debug("Results folder doesn't exist: %s",
+                          self.results_folder)
+            return
+        for name, path, is_dir in _list_folder(self.results_folder):
+            if not is_dir or (self._sample_names is not None and
+                              name not in self._sample_names):
+                continue
+            self._files_by_sample[name] = _index_folder(path)
+        _LOGGER.debug("Indexed %d sample folder(s) in %s",
+                      len(self._files_by_sample), self.results_folder)
+
+
+def _index_folder(folder):
+    """
+    Index the tracked files immediately within a folder.
+
+    :param str folder: path to the folder to index
+    :return collections.OrderedDict[str, IndexedFile]: binding between
+        filename and indexed file, sorted by filename
+    """
+    tracked = []
+    for name, path, is_dir in _list_folder(folder):
+        if is_dir:
+            continue
+        if name in TRACKED_FILENAMES or \
+                any(name.endswith(sfx) for sfx in TRACKED_SUFFIXES):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # The file may have been removed since it was listed.
+                continue
+            tracked.append((name, IndexedFile(path, st.st_mtime, st.st_size)))
+    return OrderedDict(sorted(tracked))
+
+
+def _list_folder(folder):
+    """
+    List the entries immediately within a folder.
+
+    :param str folder: path to the folder to list
+    :return Iterable[(str, str, bool)]: name, path, and whether the entry is
+        a directory, for each entry in the folder
+    """
+    try:
+        scandir = os.scandir
+    except AttributeError:
+        # Python 2 lacks scandir; the directory test costs a stat per entry.
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            yield name, path, os.path.isdir(path)
+    else:
+        for entry in scandir(folder):
+            yield entry.name, entry.path, entry.is_dir()
+
+
+def scan_log(log_path, keys, encodings=LOG_ENCODINGS, block_size=LOG_BLOCK_SIZE):
+    """
+    Get the values for the given keys from a log file, reading from its end
+
+    A line containing a key is taken to hold its value after the line's first
+    colon, e.g. '* Total elapsed time: 1:10:10'. The log is read once,
+    in blocks backwards from its end, until a value's found for every key,
+    so each value is from the key's line nearest the end of the log. Only
+    matched lines are decoded, trying each encoding in turn.
+
+    :param str log_path: path to the log file
+    :param Iterable[str] keys: phrases that label the values of interest
+    :param Iterable[str] encodings: encodings with which to try to decode
+        each matched line
+    :param int block_size: number of bytes to read at a time
+    :return dict[str, str | NoneType]: value for each key, null if not found
+    :raises IOError: when the file is not found in the provided path
+    """
+    if not os.path.exists(log_path):
+        raise IOError("Can't read the log file '{}'. Not found".format(log_path))
+    wanted = dict((k, k.encode("ascii")) for k in keys)
+    found = {}
+    with open(log_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        # Beginning of the earliest line read so far, incomplete until the
+        # block before it is read
+        partial = b""
+        while pos > 0 and len(found) < len(wanted):
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            text = f.read(size) + partial
+            if pos > 0:
+                cut = text.find(b"\n")
+                if cut == -1:
+                    partial = text
+                    continue
+                partial, text = text[:cut], text[(cut + 1):]
+            for key, key_bytes in wanted.items():
+                if key not in found:
+                    value = _find_last_value(text, key_bytes, encodings, log_path)
+                    if value is not None:
+                        found[key] = value
+    return dict((k, found.get(k)) for k in keys)
+
+
+def _find_last_value(text, key, encodings, log_path):
+    """
+    Find the value in the last of the lines of text that contains a key
+
+    :param bytes text: complete lines of a log
+    :param bytes key: phrase that labels the value of interest
+    :param Iterable[str] encodings: encodings with which to try to decode
+        a matched line
+    :param str log_path: path to the log from which the text was read
+    :return str | NoneType: the value, or null if no line has one
+    """
+    idx = text.rfind(key)
+    while idx != -1:
+        start = text.rfind(b"\n", 0, idx) + 1
+        end = text.find(b"\n", idx)
+        line = text[start:] if end == -1 else text[start:end]
+        decoded = _decode(line, encodings)
+        if decoded is None:
+            _LOGGER.warning("Could not decode a line of the log file '{p}' "
+                            "with encodings '{enc}'".format(p=log_path, enc=encodings))
+        elif ":" in decoded:
+            # split the matched line by first colon return stripped data.
+            # This way both mem values (e.g 1.1GB) and time values (e.g 1:10:10) will work.
+            return decoded.split(":", 1)[1].strip()
+        idx = text.rfind(key, 0, start)
+    return None
+
+
+def _decode(data, encodings):
+    """
+    Decode bytes with the first of the given encodings that works
+
+    :param bytes data: the bytes to decode
+    :param Iterable[str] encodings: encodings to try, in order
+    :return str | NoneType: the decoded text, or null if no encoding works
+    """
+    for e in encodings:
+        try:
+            return data.decode(e)
+        except UnicodeDecodeError:
+            pass
+    return None
@@ -0,0 +1,273 @@
+""" Bulk writing of samples' YAML representations to the submission folder """
+
+import hashlib
+import logging
+from multiprocessing.pool import ThreadPool
+import os
+import sys
+if sys.version_info < (3, 3):
+    from collections import Mapping
+else:
+    from collections.abc import Mapping
+import tempfile
+import threading
+import time
+
+from pandas import isnull, Series
+import yaml
+
+from attmap import AttMap
+from peppy.const import NAME_TABLE_ATTR, SAMPLE_SUBANNOTATIONS_KEY
+from peppy.sample import Paths, PRJ_REF, Sample
+from peppy.utils import grab_project_data
+
+from .const import PROJECT_FILENAME
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["PEPPY_YAML_VERSION", "PROJECT_FILE_KEY", "PROJECT_FILENAME",
+           "SampleWriter", "sample_yaml_text"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Key by which a sample's file references the file of its project's data,
+# PROJECT_FILENAME, in place of embedding the data
+PROJECT_FILE_KEY = "project_yaml"
+
+# Version of peppy whose Sample.to_yaml the serialization here mirrors. That
+# method can't be called in its place: it sets the sample's 'yaml_file' to
+# the path it writes, rather than to the file's final path, and it always
+# embeds the project's data. The requirement on peppy is pinned to match.
+PEPPY_YAML_VERSION = "0.20"
+
+# Attributes that a sample's YAML representation omits, as in peppy.
+_OMITTED_ATTRIBUTES = (SAMPLE_SUBANNOTATIONS_KEY, "samples", NAME_TABLE_ATTR,
+                       "sheet_attributes")
+
+
+class SampleWriter(object):
+    """
+    Writes samples' YAML files, each at most once per distinct content.
+
+    A sample's file is named for the sample and its type, so each (sample,
+    subtype) pair has one file. Content is serialized on the calling thread,
+    since a sample may change once it's handed off; the file is written only
+    if that content differs from what's already on disk, by a worker if
+    there are several, through a temporary file that's renamed into place.
+
+    :param str folder: path to the folder in which to write sample files
+    :param int workers: number of files that may be written at once
+    """
+
+    def __init__(self, folder, workers=1):
+        super(SampleWriter, self).__init__()
+        if workers < 1:
+            raise ValueError(
+                "Sample writer count must be positive: {}".format(workers))
+        self.folder = folder
+        self.workers = workers
+        self.project_file = None
+        self.num_written = 0
+        self.num_unchanged = 0
+        self.write_time = 0.0
+        self._pool = ThreadPool(workers) if workers > 1 else None
+        # Digest of the content last sent to each file, and pending writes.
+        self._digests = {}
+        self._pending = {}
+        self._tally_lock = threading.Lock()
+        # Files are written through private temporary files, so a new file
+        # gets the mode that open() would give it; the umask can only be
+        # read by setting it, so that's done once, before any writer starts.
+        umask = os.umask(0)
+        os.umask(umask)
+        self._new_file_mode = 0o666 & ~umask
+
+    def write(self, sample):
+        """
+        Write a sample's YAML representation, unless it's unchanged.
+
+        As with peppy's Sample.to_yaml, the sample's 'yaml_file' attribute is
+        set to the path of its file.
+
+        :param peppy.Sample sample: sample to write
+        :return str: path to the sample's file
+        """
+        path = os.path.join(self.folder, sample.generate_filename())
+        self._queue(path, sample_yaml_text(sample, path, self.project_file))
+        return path
+
+    def write_project(self, prj_data):
+        """
+        Write a project's data to a file that later samples' files reference.
+
+        Each sample file written after this one names it, under the key
+        PROJECT_FILE_KEY, in place of embedding the project data.
+
+        :param Mapping prj_data: Sample-independent project data
+        :return str: path to the project data file
+        """
+        path = os.path.join(self.folder, PROJECT_FILENAME)
+        self._queue(path, yaml.safe_dump(
+            _serializable(prj_data, name=PRJ_REF), default_flow_style=False))
+        self.project_file = path
+        return path
+
+    def _queue(self, path, text):
+        """ Have a file written, unless it was last sent the same text. """
+        digest = _digest(text.encode("utf-8"))
+        if self._digests.get(path) == digest:
+            _LOGGER.debug("Unchanged since written: '%s'", path)
+            with self._tally_lock:
+                self.num_unchanged += 1
+            return
+        self._digests[path] = digest
+        # A file's writes are kept in order, so that the last one wins.
+        self.wait([path])
+        if self._pool is None:
+            self._store(path, text, digest)
+        else:
+            self._pending[path] = self._pool.apply_async(
+                self._store, (path, text, digest))
+
+    def has_written(self, path):
+        """
+        Determine whether a file has been written, or queued to be written.
+
+        :param str path: path to a sample file
+        :return bool: whether this writer has handled the file
+        """
+        return path in self._digests
+
+    def wait(self, paths=None):
+        """
+        Block until pending writes are done.
+
+        :param Iterable[str] paths: paths of the files for which to wait;
+            if unspecified, wait for every pending write
+        :raise OSError: if a file couldn't be written
+        """
+        if paths is None:
+            paths = list(self._pending.keys())
+        for p in paths:
+            result = self._pending.pop(p, None)
+            if result is not None:
+                result.get()
+
+    def close(self):
+        """ Finish every pending write, then stop the workers. """
+        try:
+            self.wait()
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+    def _store(self, path, text, digest):
+        """ Write a file, unless its current content has the given digest. """
+        start = time.time()
+        data = text.encode("utf-8")
+        mode = self._new_file_mode
+        try:
+            with open(path, 'rb') as f:
+                unchanged = _digest(f.read()) == digest
+                mode = os.fstat(f.fileno()).st_mode & 0o7777
+        except IOError:
+            unchanged = False
+        if not unchanged:
+            _LOGGER.debug("Writing sample file: '%s'", path)
+            fd, tmp = tempfile.mkstemp(
+                suffix=".tmp", prefix=os.path.basename(path) + ".",
+                dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                # A temporary file is readable only by its owner, while the
+                # file it replaces may be shared.
+                os.chmod(tmp, mode)
+                os.rename(tmp, path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+        with self._tally_lock:
+            if unchanged:
+                self.num_unchanged += 1
+            else:
+                self.num_written += 1
+            self.write_time += time.time() - start
+
+
+def sample_yaml_text(sample, path, project_file=None):
+    """
+    Create a sample's YAML representation, as peppy's Sample.to_yaml would.
+
+    This mirrors Sample.to_yaml as of peppy PEPPY_YAML_VERSION.
+
+    :param peppy.Sample sample: sample to represent
+    :param str path: path to the sample's file; this is set as the sample's
+        'yaml_file' attribute, so it's part of the representation
+    :param str project_file: path to a file of the project's data, to
+        reference rather than embedding the sample's project data
+    :return str: YAML text for the sample
+    """
+    sample.yaml_file = path
+    if project_file is None:
+        serial = _serializable(sample)
+    else:
+        serial = _serializable(
+            sample, to_skip=_OMITTED_ATTRIBUTES + (PRJ_REF, ))
+        serial[PROJECT_FILE_KEY] = project_file
+    try:
+        return yaml.safe_dump(serial, default_flow_style=False)
+    except yaml.representer.RepresenterError:
+        _LOGGER.error("SERIALIZED SAMPLE DATA: {}".format(serial))
+        raise
+
+
+def _serializable(obj, name=None, to_skip=_OMITTED_ATTRIBUTES):
+    """
+    Build a YAML-friendly representation of an object, recursively.
+
+    This is the object conversion within peppy's Sample.to_yaml, as of peppy
+    PEPPY_YAML_VERSION, with the attributes to skip made a parameter.
+
+    :param object obj: what to represent
+    :param str name: name of the object to represent
+    :param Iterable[str] to_skip: names of attributes to ignore, at the top
+        level only
+    :return object: basic collections and values representing the object
+    """
+    if name == PRJ_REF:
+        prj_data = grab_project_data(obj)
+        return {k: _serializable(v, name=k) for k, v in list(prj_data.items())}
+    if isinstance(obj, list):
+        return [_serializable(i) for i in obj]
+    if isinstance(obj, AttMap):
+        return {k: _serializable(v, name=k) for k, v in list(obj.__dict__.items())
+                if k not in to_skip}
+    elif isinstance(obj, Mapping):
+        return {k: _serializable(v, name=k) for k, v in list(obj.items())
+                if k not in to_skip}
+    elif isinstance(obj, (Paths, Sample)):
+        return {k: _serializable(v, name=k) for k, v in list(obj.__dict__.items())
+                if k not in to_skip}
+    elif isinstance(obj, Series):
+        _LOGGER.warning("Serializing series as mapping, not array-like")
+        return obj.to_dict()
+    elif hasattr(obj, 'dtype'):  # numpy data types
+        return obj.item()
+    elif isnull(obj):
+        # Missing values as evaluated by pandas.isnull().
+        return "NaN"
+    else:
+        return obj
+
+
+def _digest(data):
+    """ Digest bytes of a sample file's content. """
+    return hashlib.sha1(data).hexdigest()
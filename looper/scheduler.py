@@ -0,0 +1,281 @@
+""" Queries of a cluster scheduler for the state of a project's jobs """
+
+from collections import namedtuple
+import getpass
+import logging
+import os
+import re
+import shlex
+import subprocess
+from xml.etree import ElementTree
+
+from .exceptions import SchedulerQueryException
+from .sample_status import FLAG_SUFFIX
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["LOST_STATE", "ScheduledJob", "cancel_jobs", "job_name",
+           "job_states_by_sample", "parse_job_id", "query_job_states",
+           "query_jobs", "reports_job_id", "scheduler_program"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# State of a job that's flagged as running but that the scheduler no longer
+# has, e.g. one that was killed before its pipeline could flag its failure
+LOST_STATE = "lost"
+
+# How a job's state, as each scheduler reports it, is named here
+_SLURM_STATES = {"PENDING": "queued", "CONFIGURING": "queued",
+                 "REQUEUED": "queued", "RUNNING": "running",
+                 "COMPLETING": "running"}
+
+# A job in the scheduler: the ID is that of the whole array for an array
+# job's task, and the state is as named here.
+ScheduledJob = namedtuple("ScheduledJob", ["job_id", "name", "state"])
+
+# When a name is shared by several jobs (e.g., an array job's tasks), the
+# state reported for it is the most advanced of theirs.
+_STATE_RANK = {"running": 2, "queued": 1}
+
+
+def job_name(pipeline_key, name):
+    """
+    Name a job by its pipeline and its sample, lump or array.
+
+    :param str pipeline_key: key of the job's pipeline
+    :param str name: name of the job's sample, or of its lump or array
+    :return str: name with which the job is submitted
+    """
+    return "{}_{}".format(pipeline_key, name)
+
+
+def scheduler_program(submission_command):
+    """
+    Determine the name of the program with which jobs are submitted.
+
+    :param str submission_command: the compute package's submission command
+    :return str | NoneType: name of the command's program, e.g. 'sbatch';
+        null if there's none
+    """
+    # Splitting null would read standard input.
+    if not submission_command:
+        return None
+    try:
+        program = shlex.split(submission_command)[0]
+    except (AttributeError, IndexError, ValueError):
+        return None
+    return os.path.basename(program)
+
+
+def reports_job_id(submission_command):
+    """
+    Determine whether a job's ID can be found in its submission's output.
+
+    :param str submission_command: the compute package's submission command
+    :return bool: whether the scheduler's job IDs can be parsed
+    """
+    return scheduler_program(submission_command) in _JOB_ID_REGEXES
+
+
+def parse_job_id(submission_command, output):
+    """
+    Find a job's ID in the output of the command that submitted it.
+
+    :param str submission_command: the compute package's submission command
+    :param str output: standard output of the job's submission
+    :return str | NoneType: the scheduler's ID for the job, null if the
+        scheduler isn't known or the output has no ID
+    """
+    regex = _JOB_ID_REGEXES.get(scheduler_program(submission_command))
+    match = regex and output and regex.search(output)
+    return match.group(1) if match else None
+
+
+def cancel_jobs(submission_command, job_ids):
+    """
+    Cancel jobs with a single command to the scheduler.
+
+    :param str submission_command: the compute package's submission command,
+        which determines the scheduler
+    :param Iterable[str] job_ids: scheduler's IDs of the jobs to cancel
+    :return bool: whether the scheduler is known, so jobs were canceled
+    :raise SchedulerQueryException: if the scheduler's command fails
+    """
+    try:
+        program = _CANCEL_COMMANDS[scheduler_program(submission_command)]
+    except KeyError:
+        return False
+    command = [program] + list(job_ids)
+    _LOGGER.debug("Canceling jobs: %s", " ".join(command))
+    try:
+        subprocess.check_call(command)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SchedulerQueryException(command, e)
+    return True
+
+
+def query_jobs(submission_command, user=None):
+    """
+    Ask the scheduler, with a single query, for each of a user's jobs.
+
+    :param str submission_command: the compute package's submission command,
+        which determines the scheduler to query
+    :param str user: name of the user whose jobs to query; by default, the
+        current user
+    :return list[ScheduledJob] | NoneType: ID, name and state of each job:
+        e.g., 'queued' or 'running', or the scheduler's own name for another
+        state; null if the scheduler isn't known
+    :raise SchedulerQueryException: if the scheduler's query fails, or its
+        output can't be parsed
+    """
+    try:
+        command, parse = _QUERIES[scheduler_program(submission_command)]
+    except KeyError:
+        return None
+    command = [arg.format(user=user or getpass.getuser()) for arg in command]
+    _LOGGER.debug("Querying scheduler: %s", " ".join(command))
+    try:
+        output = subprocess.check_output(command)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SchedulerQueryException(command, e)
+    try:
+        return [ScheduledJob(*job) for job in
+                parse(output.decode("utf-8", "replace"))]
+    except ElementTree.ParseError as e:
+        raise SchedulerQueryException(command, e)
+
+
+def query_job_states(submission_command, user=None):
+    """
+    Ask the scheduler, with a single query, for the state of each job.
+
+    :param str submission_command: the compute package's submission command,
+        which determines the scheduler to query
+    :param str user: name of the user whose jobs to query; by default, the
+        current user
+    :return Mapping[str, str] | NoneType: state of each job, by name: e.g.,
+        'queued' or 'running', or the scheduler's own name for another
+        state; null if the scheduler isn't known
+    :raise SchedulerQueryException: if the scheduler's query fails, or its
+        output can't be parsed
+    """
+    jobs = query_jobs(submission_command, user=user)
+    if jobs is None:
+        return None
+    states = {}
+    for _, name, state in jobs:
+        if _STATE_RANK.get(state, 0) >= _STATE_RANK.get(states.get(name), 0):
+            states[name] = state
+    return states
+
+
+def job_states_by_sample(prj, job_states, status_index, ledger=None):
+    """
+    Join the scheduler's jobs with a project's samples, by name.
+
+    A job is matched to a sample and pipeline by the name of the sample's
+    latest job for the pipeline in the submission ledger, or else by the
+    name with which it would have been submitted alone. A sample flagged as
+    running for a pipeline with no job of the pipeline's in the scheduler
+    has lost its job.
+
+    :param looper.Project prj: project whose samples' jobs to find
+    :param Mapping[str, str] job_states: state of each job, by name
+    :param looper.sample_status.SampleStatusIndex status_index: index of the
+        project's sample output folders
+    :param looper.ledger.SubmissionLedger ledger: record of the jobs
+        submitted for the project's samples, optional
+    :return Mapping[str, list[(str, str)]]: name of each sample and of the
+        pipeline for each job, by its state
+    """
+    pipelines = {}
+    for ifaces in prj.interfaces_by_protocol.values():
+        for iface in ifaces:
+            for pl_key, _ in iface.iterpipes():
+                pipelines.setdefault(pl_key, iface.get_pipeline_name(pl_key))
+    pipelines = sorted(pipelines.items())
+
+    def sample_job(sample, pl_key):
+        entry = ledger and ledger.latest(sample.name, pl_key)
+        return entry.job_name if entry else job_name(pl_key, sample.name)
+
+    sample_jobs = {(s.name, pl_key): sample_job(s, pl_key)
+                   for s in prj.samples for pl_key, _ in pipelines}
+    known_jobs = set(sample_jobs.values())
+    # A pipeline with a job of unknown samples (e.g. a lump's not in the
+    # ledger) may be running any of its samples, so none is known to be lost.
+    busy = {pl_name for pl_key, pl_name in pipelines for n in job_states
+            if n not in known_jobs and n.startswith(job_name(pl_key, ""))}
+    samples_by_state = {}
+    for s in prj.samples:
+        flags = {os.path.basename(f.path)
+                 for f in status_index.files(s.name, FLAG_SUFFIX)}
+        for pl_key, pl_name in pipelines:
+            state = job_states.get(sample_jobs[(s.name, pl_key)])
+            if state is None:
+                if pl_name in busy or "{}_running{}".format(
+                        pl_name, FLAG_SUFFIX) not in flags:
+                    continue
+                state = LOST_STATE
+            samples_by_state.setdefault(state, []).append((s.name, pl_name))
+    return samples_by_state
+
+
+def _parse_squeue(output):
+    """ ID, name and state of each job that squeue lists. """
+    for line in output.splitlines():
+        fields = line.strip().split(" ", 2)
+        if len(fields) == 3:
+            job_id, state, name = fields
+            yield job_id, name, _SLURM_STATES.get(state, state.lower())
+
+
+def _parse_qstat(output):
+    """ ID, name and state of each job that SGE's qstat lists as XML. """
+    for job in ElementTree.fromstring(output).iter("job_list"):
+        name, code = job.findtext("JB_name"), job.findtext("state") or ""
+        if name:
+            yield job.findtext("JB_job_number"), name, _sge_state(code)
+
+
+def _sge_state(code):
+    """ Name an SGE job's state code, e.g. 'qw' or 'r'. """
+    if "E" in code:
+        return "error"
+    if "h" in code:
+        return "held"
+    if "d" in code:
+        return "deleted"
+    if "s" in code.lower() or "T" in code:
+        return "suspended"
+    if "r" in code or "t" in code:
+        return "running"
+    if "q" in code or "w" in code:
+        return "queued"
+    return code
+
+
+# Command that lists a user's jobs, and the parser of its output, by name of
+# the program with which the scheduler's jobs are submitted
+_QUERIES = {
+    "sbatch": (["squeue", "--noheader", "--user={user}", "--format=%A %T %j"],
+               _parse_squeue),
+    "qsub": (["qstat", "-xml", "-u", "{user}"], _parse_qstat)
+}
+
+# Pattern of a submission's output that holds its job's ID, by name of the
+# program with which the scheduler's jobs are submitted
+_JOB_ID_REGEXES = {
+    "sbatch": re.compile(r"^(?:Submitted batch job )?(\d+)(?:;\S*)?\s*$",
+                         re.MULTILINE),
+    "qsub": re.compile(r"^Your job(?:-array)? (\d+)", re.MULTILINE)
+}
+
+# Command that cancels jobs given their IDs, by name of the program with
+# which the scheduler's jobs are submitted
+_CANCEL_COMMANDS = {"sbatch": "scancel", "qsub": "qdel"}
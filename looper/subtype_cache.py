@@ -0,0 +1,184 @@
+""" Cache of the Sample subtypes resolved from pipeline modules """
+
+import importlib
+import inspect
+import json
+import logging
+import os
+import sys
+
+from peppy import Sample
+
+from ._version import __version__
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["SubtypeCache"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Bump when the layout or the meaning of persisted locations changes.
+CACHE_FORMAT_VERSION = 1
+
+
+class SubtypeCache(object):
+    """
+    Sample subtypes resolved from pipeline modules, by state of module file.
+
+    A resolution is reused for as long as the pipeline file has the same
+    path and modification time, and subtype name and means of discovery
+    requested. If the cache has a file, the location of each resolved class
+    is persisted there, so that a later process may skip importing the
+    pipeline: the base Sample type needs no import at all, and a subtype
+    defined in a module of its own is imported from that module alone,
+    provided that module's file is unchanged too. A subtype defined by the
+    pipeline module itself, or one that can't be found where it was,
+    requires the pipeline's import again.
+
+    :param str path: path to the file in which to persist class locations;
+        if unspecified, resolutions are cached only in memory
+    :param bool reset: whether to disregard any existing persisted locations
+    """
+
+    def __init__(self, path=None, reset=False):
+        super(SubtypeCache, self).__init__()
+        self.path = None
+        self.num_imports = 0
+        self._types = {}
+        self._locations = {}
+        if path is not None:
+            self.load(path, reset=reset)
+
+    def fetch(self, pipeline_filepath, subtype_name, resolve, kind="import"):
+        """
+        Fetch the Sample subtype to use for a pipeline, resolving if needed.
+
+        :param str pipeline_filepath: path to the pipeline module file
+        :param str subtype_name: name of the requested subtype, optional
+        :param callable resolve: function of pipeline path and subtype name
+            that returns a pair of the subtype to use and whether that
+            resolution may be reused by a later process
+        :param str kind: name for the means of resolution, by which cached
+            resolutions are distinguished
+        :return type: Sample subtype to use for the pipeline
+        """
+        try:
+            path = os.path.realpath(pipeline_filepath)
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return resolve(pipeline_filepath, subtype_name)[0]
+        key = (path, mtime, subtype_name, kind)
+        try:
+            return self._types[key]
+        except KeyError:
+            pass
+        subtype = self._from_location(path, mtime, subtype_name, kind)
+        if subtype is None:
+            self.num_imports += 1
+            subtype, reusable = resolve(pipeline_filepath, subtype_name)
+            if reusable:
+                self._set_location(path, mtime, subtype_name, kind, subtype)
+        else:
+            _LOGGER.debug("Found %s for '%s' where it was last resolved",
+                          subtype.__name__, pipeline_filepath)
+        self._types[key] = subtype
+        return subtype
+
+    def clear(self):
+        """ Forget the subtypes resolved in this process. """
+        self._types = {}
+
+    def load(self, path, reset=False):
+        """
+        Use a file for persisted locations, reading any it already has.
+
+        :param str path: path to the file in which to persist class locations
+        :param bool reset: whether to disregard any persisted locations
+        """
+        self.path = path
+        self._locations = {}
+        if reset:
+            _LOGGER.debug("Disregarding any existing subtype cache: %s", path)
+            return
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except IOError:
+            _LOGGER.debug("No subtype cache: %s", path)
+            return
+        except ValueError:
+            _LOGGER.warning("Ignoring unreadable subtype cache: %s", path)
+            return
+        if data.get("version") != CACHE_FORMAT_VERSION or \
+                data.get("looper_version") != __version__:
+            _LOGGER.debug("Ignoring subtype cache from another version: %s",
+                          path)
+            return
+        self._locations = data["locations"]
+
+    def save(self):
+        """ Write persisted locations to the cache's file, if it has one. """
+        if self.path is None:
+            return
+        data = {"version": CACHE_FORMAT_VERSION, "looper_version": __version__,
+                "locations": self._locations}
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.rename(tmp, self.path)
+        _LOGGER.debug("Saved subtype cache: %s", self.path)
+
+    def _from_location(self, path, mtime, subtype_name, kind):
+        """ Fetch a subtype from where it was last found, if still there. """
+        entry = self._locations.get(path, {}).get(kind, {}).get(
+            subtype_name or "")
+        if entry is None or entry["mtime"] != mtime:
+            return None
+        if entry["class"] is None:
+            return Sample
+        try:
+            if os.path.getmtime(entry["file"]) != entry["file_mtime"]:
+                return None
+            module = importlib.import_module(entry["module"])
+            if _source_path(module) != entry["file"]:
+                return None
+            subtype = getattr(module, entry["class"])
+        except (Exception, SystemExit) as e:
+            _LOGGER.debug("Can't import %s from module '%s': %r",
+                          entry["class"], entry["module"], e)
+            return None
+        if not (inspect.isclass(subtype) and issubclass(subtype, Sample)):
+            return None
+        return subtype
+
+    def _set_location(self, path, mtime, subtype_name, kind, subtype):
+        """ Record where a pipeline's subtype is, if it's reusable. """
+        if subtype is Sample:
+            entry = {"mtime": mtime, "class": None}
+        else:
+            module = sys.modules.get(subtype.__module__)
+            try:
+                source = _source_path(module)
+            except TypeError:
+                source = None
+            if source is None or source == path:
+                # Defined by the pipeline module, so that must be imported.
+                self._locations.get(path, {}).get(kind, {}).pop(
+                    subtype_name or "", None)
+                return
+            entry = {"mtime": mtime, "class": subtype.__name__,
+                     "module": subtype.__module__, "file": source,
+                     "file_mtime": os.path.getmtime(source)}
+        self._locations.setdefault(path, {}).setdefault(kind, {})[
+            subtype_name or ""] = entry
+
+
+def _source_path(module):
+    """ Determine the real path to the source file of a module. """
+    source = inspect.getsourcefile(module)
+    return None if source is None else os.path.realpath(source)
@@ -0,0 +1,244 @@
+""" Static discovery of the Sample subtypes a pipeline module would define """
+
+import ast
+from collections import namedtuple, OrderedDict
+import logging
+import os
+import sys
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["SubtypeDefinition", "find_sample_subtypes"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Name of the base type, as bound in a module or as an attribute of one
+_BASE_NAME = "Sample"
+
+
+# Where a class is defined: dotted name of its module (null for the module
+# from which discovery started), path to that module's file, and class name.
+SubtypeDefinition = namedtuple(
+    "SubtypeDefinition", field_names=["module", "path", "name"])
+
+
+def find_sample_subtypes(pipeline_filepath, search_path=None):
+    """
+    Find the module-level names a pipeline module binds to Sample subtypes.
+
+    The module is parsed rather than executed, as is each module from which
+    it imports names, so no module's code is run. A class counts as a Sample
+    subtype if one of its bases is named Sample or is itself a subtype; what
+    a module would bind only by executing code (e.g., dynamically created
+    classes or names imported from extension modules) isn't found.
+
+    :param str pipeline_filepath: path to the pipeline module's file
+    :param Iterable[str] search_path: folders in which to look for imported
+        modules, after the pipeline's own folder; by default, sys.path
+    :return Mapping[str, SubtypeDefinition]: where the class to which each
+        module-level name is bound is defined, for each name bound to a
+        proper Sample subtype, in order of binding
+    :raise IOError: if the pipeline file can't be read
+    :raise SyntaxError: if the pipeline file isn't valid Python
+    """
+    pipeline_filepath = os.path.realpath(pipeline_filepath)
+    if search_path is None:
+        search_path = sys.path
+    scanner = _Scanner(
+        [os.path.dirname(pipeline_filepath)] + list(search_path))
+    bindings = scanner.bindings(pipeline_filepath, None, strict=True)
+    subtypes = OrderedDict()
+    for name in bindings:
+        definition = scanner.resolve(pipeline_filepath, None, name)
+        if definition is not None:
+            subtypes[name] = definition
+    return subtypes
+
+
+# A module-level name's binding: a class defined by the module, or a name
+# imported from another module, relative to the package if level's positive.
+_ClassBinding = namedtuple("_ClassBinding", ["node"])
+_ImportBinding = namedtuple("_ImportBinding", ["module", "level", "name"])
+
+
+class _Scanner(object):
+    """ Parses modules and resolves their names, each at most once. """
+
+    def __init__(self, search_path):
+        super(_Scanner, self).__init__()
+        self.search_path = [p or os.getcwd() for p in search_path]
+        self._bindings = {}
+        self._resolved = {}
+
+    def bindings(self, path, module_name, strict=False):
+        """
+        Determine the module-level names a module binds to classes or imports.
+
+        :param str path: path to the module's file
+        :param str module_name: dotted name of the module, null if it's not
+            importable by name
+        :param bool strict: whether to raise an error for a module that
+            can't be parsed, rather than regarding it as binding nothing
+        :return Mapping[str, _ClassBinding | _ImportBinding]: binding by name
+        """
+        try:
+            return self._bindings[path]
+        except KeyError:
+            pass
+        # Guard against import cycles, through star imports.
+        self._bindings[path] = OrderedDict()
+        try:
+            with open(path, 'rb') as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (IOError, SyntaxError, ValueError, TypeError) as e:
+            if strict:
+                del self._bindings[path]
+                raise
+            _LOGGER.debug("Can't parse '%s': %r", path, e)
+            return self._bindings[path]
+        bindings = OrderedDict()
+        for node in _module_level(tree.body):
+            if isinstance(node, ast.ClassDef):
+                bindings[node.name] = _ClassBinding(node)
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    if alias.name != "*":
+                        bindings[alias.asname or alias.name] = \
+                            _ImportBinding(node.module, node.level, alias.name)
+                        continue
+                    target = self._locate(path, module_name, node.module,
+                                          node.level)
+                    if target is None:
+                        continue
+                    for name in self.bindings(*target):
+                        if not name.startswith("_"):
+                            bindings[name] = _ImportBinding(
+                                node.module, node.level, name)
+            elif isinstance(node, (ast.Import, ast.FunctionDef)):
+                # A later binding of a name to something else hides a class.
+                for name in _bound_names(node):
+                    bindings.pop(name, None)
+        self._bindings[path] = bindings
+        return bindings
+
+    def resolve(self, path, module_name, name):
+        """
+        Find where the class bound to a module-level name is defined.
+
+        :param str path: path to the module's file
+        :param str module_name: dotted name of the module, null if it's not
+            importable by name
+        :param str name: module-level name to resolve
+        :return SubtypeDefinition: where the class is defined, null if the
+            name isn't bound to a proper Sample subtype
+        """
+        key = (path, name)
+        if key in self._resolved:
+            return self._resolved[key]
+        # Guard against cycles of bases or imports.
+        self._resolved[key] = None
+        binding = self.bindings(path, module_name).get(name)
+        definition = None
+        if isinstance(binding, _ClassBinding):
+            if any(self._derives(path, module_name, b)
+                   for b in binding.node.bases):
+                definition = SubtypeDefinition(
+                    module_name, path, binding.node.name)
+        elif isinstance(binding, _ImportBinding) and \
+                binding.name != _BASE_NAME:
+            target = self._locate(path, module_name, binding.module,
+                                  binding.level, binding.name)
+            if target is not None:
+                definition = self.resolve(target[0], target[1], binding.name)
+        self._resolved[key] = definition
+        return definition
+
+    def _derives(self, path, module_name, base):
+        """ Determine whether a base expression names a Sample type. """
+        if isinstance(base, ast.Attribute):
+            return base.attr == _BASE_NAME
+        if not isinstance(base, ast.Name):
+            return False
+        binding = self.bindings(path, module_name).get(base.id)
+        if binding is None:
+            return base.id == _BASE_NAME
+        if isinstance(binding, _ImportBinding) and binding.name == _BASE_NAME:
+            return True
+        return self.resolve(path, module_name, base.id) is not None
+
+    def _locate(self, path, module_name, target, level, name=None):
+        """
+        Find the file of a module from which another imports.
+
+        :param str path: path to the importing module's file
+        :param str module_name: dotted name of the importing module
+        :param str target: name of the module imported from, as written
+        :param int level: number of leading dots in the import
+        :param str name: name imported, which may itself be a submodule
+        :return (str, str): path to the module's file, and its dotted name;
+            null if it's not found
+        """
+        target_parts = target.split(".") if target else []
+        if level:
+            if not module_name:
+                return None
+            package = module_name.split(".")
+            if os.path.basename(path) != "__init__.py":
+                package = package[:-1]
+            package = package[:len(package) - (level - 1)]
+            if not package:
+                return None
+            folder = os.path.dirname(path)
+            for _ in range(level - 1):
+                folder = os.path.dirname(folder)
+            folders = [os.path.join(folder, *target_parts)]
+            parts = package + target_parts
+        else:
+            folders = [os.path.join(p, *target_parts)
+                       for p in self.search_path]
+            parts = target_parts
+        for folder in folders:
+            candidates = [os.path.join(folder, "__init__.py")]
+            if target_parts:
+                candidates.insert(0, folder + ".py")
+            for candidate in candidates:
+                if not os.path.isfile(candidate):
+                    continue
+                # A name imported from a package may be one of its modules.
+                if name is not None and candidate.endswith("__init__.py") \
+                        and (os.path.isfile(os.path.join(folder, name + ".py"))
+                             or os.path.isdir(os.path.join(folder, name))):
+                    return None
+                return os.path.realpath(candidate), ".".join(parts)
+        return None
+
+
+def _module_level(statements):
+    """ Iterate over a module's statements, including conditional ones. """
+    for node in statements:
+        yield node
+        if isinstance(node, ast.If):
+            for child in _module_level(node.body + node.orelse):
+                yield child
+        elif isinstance(node, (ast.With, )):
+            for child in _module_level(node.body):
+                yield child
+        elif type(node).__name__ in ("Try", "TryExcept", "TryFinally"):
+            blocks = [node.body, getattr(node, "orelse", []),
+                      getattr(node, "finalbody", [])] + \
+                [h.body for h in getattr(node, "handlers", [])]
+            for block in blocks:
+                for child in _module_level(block):
+                    yield child
+
+
+def _bound_names(node):
+    """ Names bound by an import of whole modules or a function definition. """
+    if isinstance(node, ast.Import):
+        return [(a.asname or a.name).split(".")[0] for a in node.names]
+    return [node.name]
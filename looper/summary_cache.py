@@ -0,0 +1,167 @@
+""" Persistent cache of what's summarized from sample output files """
+
+import hashlib
+import json
+import logging
+import os
+
+from ._version import __version__
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["SummaryCache", "fingerprint"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Bump when the layout or the meaning of cached values changes.
+CACHE_FORMAT_VERSION = 2
+
+
+class SummaryCache(object):
+    """
+    Values parsed from samples' output files, and digests of rendered pages.
+
+    A value parsed from a sample's file is reused only while that file has
+    the same modification time and size as when it was parsed, and a page
+    need only be rendered again if the inputs to its template have changed
+    since it was last rendered. The cache is tied to the looper version that
+    wrote it, since both parsing and templates may change between versions.
+    Only what's been looked up or stored since the cache was loaded is
+    saved, so entries for removed samples and pages don't accumulate.
+
+    :param str path: path to the file in which the cache is persisted
+    :param bool reset: whether to disregard any existing cache contents
+    """
+
+    def __init__(self, path, reset=False):
+        super(SummaryCache, self).__init__()
+        self.path = path
+        self._files = {}
+        self._pages = {}
+        # Sample files and pages looked up or stored in this pass
+        self._seen_files = set()
+        self._seen_pages = set()
+        if reset:
+            _LOGGER.debug("Disregarding any existing summary cache: %s", path)
+        else:
+            self._load()
+
+    def get(self, sample_name, indexed_file):
+        """
+        Fetch the value parsed from a sample's file, if the file's unchanged.
+
+        :param str sample_name: name of the sample to which the file belongs
+        :param looper.sample_status.IndexedFile indexed_file: the file from
+            which the value was parsed
+        :return object | NoneType: the cached value, or null if there's none
+            or the file has changed since the value was cached
+        """
+        key = (str(sample_name), os.path.basename(indexed_file.path))
+        self._seen_files.add(key)
+        entry = self._files.get(key[0], {}).get(key[1])
+        if entry is None or entry["mtime"] != indexed_file.mtime or \
+                entry["size"] != indexed_file.size:
+            return None
+        return entry["value"]
+
+    def put(self, sample_name, indexed_file, value):
+        """
+        Store the value parsed from a sample's file.
+
+        :param str sample_name: name of the sample to which the file belongs
+        :param looper.sample_status.IndexedFile indexed_file: the file from
+            which the value was parsed
+        :param object value: JSON-serializable, non-null value to store
+        """
+        key = (str(sample_name), os.path.basename(indexed_file.path))
+        self._seen_files.add(key)
+        self._files.setdefault(key[0], {})[key[1]] = {
+            "mtime": indexed_file.mtime, "size": indexed_file.size,
+            "value": value}
+
+    def page_is_current(self, path, digest):
+        """
+        Determine whether a page exists as rendered from the given inputs.
+
+        :param str path: path to the page
+        :param str digest: fingerprint of the inputs to the page's template
+        :return bool: whether the page exists and was last rendered from
+            inputs with the given fingerprint
+        """
+        self._seen_pages.add(path)
+        return self._pages.get(path) == digest and os.path.isfile(path)
+
+    def set_page(self, path, digest):
+        """
+        Record the fingerprint of the inputs from which a page is rendered.
+
+        :param str path: path to the page
+        :param str digest: fingerprint of the inputs to the page's template
+        """
+        self._seen_pages.add(path)
+        self._pages[path] = digest
+
+    def save(self):
+        """
+        Write the cache to its file, replacing any previous version.
+
+        Entries not looked up or stored since the cache was loaded are
+        dropped: their samples or pages are no longer part of the summary.
+        """
+        files = {}
+        for sample_name, filename in self._seen_files:
+            entry = self._files.get(sample_name, {}).get(filename)
+            if entry is not None:
+                files.setdefault(sample_name, {})[filename] = entry
+        pages = {p: d for p, d in self._pages.items() if p in self._seen_pages}
+        num_dropped = sum(len(f) for f in self._files.values()) - \
+            sum(len(f) for f in files.values()) + len(self._pages) - len(pages)
+        if num_dropped:
+            _LOGGER.debug("Dropping %d unused summary cache entries",
+                          num_dropped)
+        self._files, self._pages = files, pages
+        data = {"version": CACHE_FORMAT_VERSION, "looper_version": __version__,
+                "files": self._files, "pages": self._pages}
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.rename(tmp, self.path)
+        _LOGGER.debug("Saved summary cache: %s", self.path)
+
+    def _load(self):
+        """ Read the cache's file, if there's a usable one. """
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except IOError:
+            _LOGGER.debug("No summary cache: %s", self.path)
+            return
+        except ValueError:
+            _LOGGER.warning("Ignoring unreadable summary cache: %s", self.path)
+            return
+        if data.get("version") != CACHE_FORMAT_VERSION or \
+                data.get("looper_version") != __version__:
+            _LOGGER.debug("Ignoring summary cache from another version: %s",
+                          self.path)
+            return
+        self._files = data["files"]
+        self._pages = data["pages"]
+
+
+def fingerprint(template_name, template_vars):
+    """
+    Digest the inputs from which a page is rendered.
+
+    :param str template_name: name of the page's template
+    :param Mapping template_vars: arguments with which the template's
+        rendered; ordered mappings among the values are digested in order
+    :return str: hexadecimal digest of the template inputs
+    """
+    text = json.dumps([template_name, __version__, sorted(template_vars.items())],
+                      default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
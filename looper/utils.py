@@ -1,11 +1,12 @@
 """ Helpers without an obvious logical home. """
 
-from collections import defaultdict, Iterable
+from collections import defaultdict, Iterable, Mapping
 import copy
 import glob
 import logging
 import os
 
+from attmap import PathExAttMap
 from peppy import \
     FLAGS, SAMPLE_INDEPENDENT_PROJECT_SECTIONS, SAMPLE_NAME_COLNAME
 from .const import *
@@ -231,6 +232,56 @@ def grab_project_data(prj):
     return data
 
 
+class ProjectSnapshot(PathExAttMap):
+    """
+    Read-only Sample-independent Project data, to share among Samples.
+
+    Nested mappings are read-only too, so one snapshot can be referenced by
+    every Sample in a run rather than copied into each of them.
+
+    :param Mapping | Iterable[(str, object)] entries: the Project data
+    """
+
+    def __init__(self, entries=None):
+        super(ProjectSnapshot, self).__init__()
+        if isinstance(entries, Mapping):
+            entries = entries.items()
+        for k, v in entries or []:
+            super(ProjectSnapshot, self).__setitem__(k, v)
+
+    def __setitem__(self, key, value, finalize=True):
+        raise TypeError("{} is read-only; can't set '{}'".
+                        format(self.__class__.__name__, key))
+
+    def __delitem__(self, key):
+        raise TypeError("{} is read-only; can't delete '{}'".
+                        format(self.__class__.__name__, key))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()), )
+
+    @property
+    def _lower_type_bound(self):
+        return ProjectSnapshot
+
+
+def project_snapshot(prj):
+    """
+    Grab Sample-independent data from a Project, once for all its Samples.
+
+    :param Project prj: Project from which to grab data
+    :return ProjectSnapshot: Sample-independent data sections from given
+        Project, read-only
+    """
+    return ProjectSnapshot(grab_project_data(prj))
+
+
 def partition(items, test):
     """
     Partition items into a pair of disjoint multisets,
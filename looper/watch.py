@@ -0,0 +1,111 @@
+""" Watching a project's sample table for new and changed samples """
+
+import logging
+import os
+
+import peppy
+from peppy.const import NAME_TABLE_ATTR, SAMPLE_NAME_COLNAME
+from .project import build_samples
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+__all__ = ["MISSING_INPUTS_REASON", "SampleTableWatcher"]
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Reason that a sample isn't submitted when any of its input files is missing
+MISSING_INPUTS_REASON = "Missing file(s)"
+
+
+class SampleTableWatcher(object):
+    """
+    Watch a project's sample table for samples added or changed.
+
+    The table's file is polled: it's read again only once its modification
+    time or size has changed, and then only the samples whose rows are new
+    or changed are built.
+
+    :param looper.Project | peppy.ProjectContext prj: project whose table to
+        watch, or context that selects some of a project's samples
+    """
+
+    def __init__(self, prj):
+        super(SampleTableWatcher, self).__init__()
+        self.prj = prj
+        self._project = prj.prj if isinstance(prj, peppy.ProjectContext) \
+            else prj
+        self.path = self._project.metadata.get(NAME_TABLE_ATTR)
+        self._stat = _stat(self.path)
+        table = self._project.sample_table
+        self._rows = {} if table is None else _row_signatures(table)
+
+    def changed_samples(self):
+        """
+        Find the samples whose rows are new or changed since the last look.
+
+        The project's sample table is replaced with the one read.
+
+        :return list[peppy.Sample]: samples of the new and changed rows, in
+            order of the sample table; empty if the table's file is unchanged
+        """
+        stat = _stat(self.path)
+        if stat is None or stat == self._stat:
+            return []
+        try:
+            table = self._project.parse_sample_sheet(self.path)
+        except (IOError, OSError, ValueError) as e:
+            # The table may have been read as it was written, so it's read
+            # again next time.
+            _LOGGER.warning("Can't read sample table: %s (%s)", self.path, e)
+            return []
+        self._stat = stat
+        rows = _row_signatures(table)
+        names = _row_names(table)
+        changed = [i for i, name in enumerate(names)
+                   if rows[name] != self._rows.get(name)]
+        self._rows = rows
+        table_key = "_" + NAME_TABLE_ATTR
+        self._project[table_key] = table
+        # Any samples built from the old table are out of date.
+        self._project["_samples"] = None
+        _LOGGER.info("Sample table changed: %d of %d row(s) new or changed",
+                     len(changed), len(names))
+        if not changed:
+            return []
+        return build_samples(self.prj, table.iloc[changed])
+
+
+def _row_names(table):
+    """ Name of the sample of each of the table's rows, in order. """
+    if SAMPLE_NAME_COLNAME not in table:
+        return [str(i) for i in range(len(table))]
+    return [str(n) for n in table[SAMPLE_NAME_COLNAME]]
+
+
+def _row_signatures(table):
+    """
+    Collect the values of each sample's rows, by the sample's name.
+
+    :param pandas.DataFrame table: sample table
+    :return Mapping[str, list[tuple]]: the non-null values of each of the
+        sample's rows, by column, in order of the table
+    """
+    signatures = {}
+    for name, (_, row) in zip(_row_names(table), table.iterrows()):
+        signatures.setdefault(name, []).append(
+            tuple(sorted((str(k), str(v)) for k, v in row.dropna().items())))
+    return signatures
+
+
+def _stat(path):
+    """ Modification time and size of a file, null if it doesn't exist. """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return st.st_mtime, st.st_size
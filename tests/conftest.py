@@ -202,6 +202,9 @@ def pytest_addoption(parser):
     parser.addoption("--logging-level",
                      default="WARN",
                      help="Project root logger level to use for tests")
+    parser.addoption("--full-benchmarks",
+                     action="store_true", default=False,
+                     help="Run benchmarks at full (slow) scale")
 
 
 
@@ -302,6 +302,9 @@ class PipelineInterfaceResourcePackageTests:
                 pipe_name, file_size)
             expected_package = copy.deepcopy(
                     pipe_data["resources"][expected_package_name])
+            if expected_package_name == DEFAULT_COMPUTE_RESOURCES_NAME:
+                expected_package.pop("file_size", None)
+                expected_package["min_file_size"] = 0
             assert expected_package == observed_package
 
     def test_negative_file_size_prohibited(
@@ -350,7 +353,9 @@ class PipelineInterfaceResourcePackageTests:
             default_resource_package = \
                     pipe_data["resources"][DEFAULT_COMPUTE_RESOURCES_NAME]
             clear_file_size(default_resource_package)
-            assert default_resource_package == \
+            expected_resource_package = copy.deepcopy(default_resource_package)
+            expected_resource_package["min_file_size"] = 0
+            assert expected_resource_package == \
                    pi.choose_resource_package(pipe_name, 0.001)
 
     @pytest.mark.parametrize(
@@ -415,6 +420,214 @@ class PipelineInterfaceResourcePackageTests:
                 pi.choose_resource_package(pipe_name, random.randrange(0, 10))
 
 
+class ResourcePackageTableTests:
+    """ Tests for reuse of resource packages compiled for a pipeline. """
+
+    @staticmethod
+    def _interface(bundled_piface, resources, compute=None):
+        for pipe_data in bundled_piface[PL_KEY].values():
+            pipe_data["resources"] = copy.deepcopy(resources)
+            if compute:
+                pipe_data["compute"] = copy.deepcopy(compute)
+        return PipelineInterface(bundled_piface)
+
+    @staticmethod
+    def test_interface_data_are_not_modified(
+            bundled_piface, default_resources, huge_resources):
+        """ Choosing a package leaves the interface's own data as they were. """
+        pi = ResourcePackageTableTests._interface(
+            bundled_piface, {"default": default_resources,
+                             "huge": huge_resources},
+            compute={"partition": "shortq"})
+        original = copy.deepcopy(pi[PL_KEY])
+        for pipe_name in pi.pipeline_names:
+            for size in [0, 1000]:
+                package = pi.choose_resource_package(pipe_name, size)
+                assert "shortq" == package["partition"]
+                package["mem"] = "1"
+        assert original == pi[PL_KEY]
+
+    @staticmethod
+    def test_each_choice_is_a_new_copy(bundled_piface, default_resources):
+        """ Modifying a chosen package doesn't affect later choices. """
+        pi = ResourcePackageTableTests._interface(
+            bundled_piface, {"default": default_resources})
+        pipe_name = pi.pipeline_names[0]
+        first = pi.choose_resource_package(pipe_name, 1)
+        expected = copy.deepcopy(first)
+        first["cores"] = "64"
+        assert expected == pi.choose_resource_package(pipe_name, 1)
+
+    @staticmethod
+    def test_matches_descending_scan(bundled_piface, default_resources):
+        """ Choice is the first-specified of the largest sufficient minima. """
+        sizes = [3, 1, 3, 0.5, 10, 1]
+        resources = {"default": default_resources}
+        for i, size in enumerate(sizes):
+            resources["pkg{}".format(i)] = {"min_file_size": size, "id": i}
+        pi = ResourcePackageTableTests._interface(bundled_piface, resources)
+        ranked = sorted(pi.select_pipeline(pi.pipeline_names[0])["resources"].items(),
+                        key=lambda kv: kv[1]["min_file_size"] if
+                        kv[0] != "default" else 0, reverse=True)
+        for file_size in [0, 0.5, 0.7, 1, 2.9, 3, 9.99, 10, 100]:
+            expected = next(name for name, data in ranked
+                            if name == "default" or
+                            file_size >= data["min_file_size"])
+            observed = pi.choose_resource_package(pi.pipeline_names[0], file_size)
+            assert resources[expected].get("id") == observed.get("id")
+
+    @staticmethod
+    def test_replaced_data_are_used(bundled_piface, default_resources):
+        """ Resource tables are compiled anew once the data are replaced. """
+        pi = ResourcePackageTableTests._interface(
+            bundled_piface, {"default": default_resources})
+        pipe_name = pi.pipeline_names[0]
+        assert "huge" != pi.choose_resource_package(pipe_name, 100).get("id")
+        pipelines = copy.deepcopy(pi[PL_KEY])
+        pipelines[pipe_name]["resources"]["huge"] = \
+            {"min_file_size": 50, "id": "huge"}
+        pi.add_entries({PL_KEY: pipelines})
+        assert "huge" == pi.choose_resource_package(pipe_name, 100)["id"]
+        del pi[PL_KEY]
+        pi[PL_KEY] = {pipe_name: {}}
+        assert {} == pi.choose_resource_package(pipe_name, 100)
+
+    @staticmethod
+    def test_nested_changes_are_used(bundled_piface, default_resources):
+        """ Resource tables are compiled anew once a package is modified. """
+        pi = ResourcePackageTableTests._interface(
+            bundled_piface, {"default": default_resources})
+        pipe_name = pi.pipeline_names[0]
+        assert "huge" != pi.choose_resource_package(pipe_name, 100).get("id")
+        pi.pipelines[pipe_name].resources["huge"] = \
+            {"min_file_size": 50, "id": "huge"}
+        assert "huge" == pi.choose_resource_package(pipe_name, 100)["id"]
+        pi[PL_KEY][pipe_name]["resources"]["huge"]["id"] = "bigger"
+        assert "bigger" == pi.choose_resource_package(pipe_name, 100)["id"]
+
+
+ARGUMENTS = {"--genome": "genome", "--single": None, "--yaml": "yaml_file",
+             "--input": "data_source"}
+OPTIONAL_ARGUMENTS = {"--frip": "frip_ref", "--skip": "", "--lab": "lab"}
+
+
+@pytest.fixture(scope="function")
+def pi_with_arguments(bundled_piface):
+    """ Provide an interface whose pipelines take arguments from samples. """
+    for pipe_data in bundled_piface[PL_KEY].values():
+        pipe_data["arguments"] = copy.deepcopy(ARGUMENTS)
+        pipe_data["optional_arguments"] = copy.deepcopy(OPTIONAL_ARGUMENTS)
+    return PipelineInterface(bundled_piface)
+
+
+def _arg_sample(name, **data):
+    data.setdefault("genome", "hg38")
+    data.setdefault("data_source", "data/{}.bam".format(name))
+    data.setdefault("yaml_file", None)
+    data[SAMPLE_NAME_COLNAME] = name
+    return Sample(data)
+
+
+class ArgumentStringTests:
+    """ Tests for building a pipeline's arguments for samples. """
+
+    @staticmethod
+    def test_arguments(pi_with_arguments):
+        """ Options are in order, with flags bare and null values omitted. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        sample = _arg_sample("s1", frip_ref=None, lab="mylab")
+        assert " --genome hg38 --single --yaml sub/s1.yaml " \
+               "--input data/s1.bam --lab mylab" == \
+               pi_with_arguments.get_arg_string(pipe_name, sample, "sub")
+
+    @staticmethod
+    def test_null_replacements(pi_with_arguments):
+        """ A null required value takes its given replacement. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        sample = _arg_sample("s1", genome=None)
+        assert " --genome mm10 --single --yaml other.yaml " \
+               "--input data/s1.bam" == pi_with_arguments.get_arg_string(
+                   pipe_name, sample, genome="mm10", yaml_file="other.yaml")
+        with pytest.raises(ValueError):
+            pi_with_arguments.get_arg_string(pipe_name, sample)
+
+    @staticmethod
+    def test_missing_required_attribute(pi_with_arguments):
+        """ A sample must have each attribute for required arguments. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        sample = _arg_sample("s1")
+        del sample["genome"]
+        with pytest.raises(AttributeError):
+            pi_with_arguments.get_arg_string(pipe_name, sample)
+
+    @staticmethod
+    def test_no_arguments(bundled_piface):
+        """ Without required arguments, the argument string is empty. """
+        for pipe_data in bundled_piface[PL_KEY].values():
+            pipe_data["optional_arguments"] = copy.deepcopy(OPTIONAL_ARGUMENTS)
+        pi = PipelineInterface(bundled_piface)
+        assert "" == pi.get_arg_string(
+            pi.pipeline_names[0], _arg_sample("s1", lab="mylab"))
+
+    @staticmethod
+    def test_batch_matches_single(pi_with_arguments):
+        """ Arguments for many samples at once are those for each alone. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        samples = [_arg_sample("s{}".format(i), lab=("lab{}".format(i) if i % 2
+                                                     else None))
+                   for i in range(5)]
+        assert [pi_with_arguments.get_arg_string(pipe_name, s, "sub")
+                for s in samples] == \
+            pi_with_arguments.get_arg_strings(pipe_name, samples, "sub")
+
+    @staticmethod
+    def test_plan_is_reused_until_data_change(pi_with_arguments):
+        """ A pipeline's arguments plan is compiled once per version of data. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        plan = pi_with_arguments.get_argument_plan(pipe_name)
+        assert [("--genome", True, False), ("--single", True, True)] == \
+            [(spec.option, spec.required, spec.flag) for spec in plan[:2]]
+        assert "--skip" not in [spec.option for spec in plan]
+        assert plan is pi_with_arguments.get_argument_plan(pipe_name)
+        pipelines = copy.deepcopy(pi_with_arguments[PL_KEY])
+        pipelines[pipe_name]["arguments"]["--verbose"] = None
+        pi_with_arguments.add_entries({PL_KEY: pipelines})
+        assert pi_with_arguments.get_arg_string(
+            pipe_name, _arg_sample("s1")).endswith(" --verbose")
+
+    @staticmethod
+    def test_plan_refreshed_when_section_changes(pi_with_arguments):
+        """ A plan's reused until its pipeline's section is changed. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        other_name = pi_with_arguments.pipeline_names[1]
+        plan = pi_with_arguments.get_argument_plan(pipe_name)
+        other_plan = pi_with_arguments.get_argument_plan(other_name)
+        pi_with_arguments.get_arg_string(pipe_name, _arg_sample("s1"))
+        assert plan is pi_with_arguments.get_argument_plan(pipe_name)
+        section = pi_with_arguments[PL_KEY][pipe_name]
+        section["arguments"] = {"--sample": "sample_name"}
+        section["optional_arguments"] = {}
+        assert ("--sample", ) == tuple(
+            spec.option for spec in
+            pi_with_arguments.get_argument_plan(pipe_name))
+        assert other_plan == pi_with_arguments.get_argument_plan(other_name)
+        assert pi_with_arguments.get_arg_string(
+            pipe_name, _arg_sample("s1")).strip() == "--sample s1"
+
+    @staticmethod
+    def test_plan_follows_nested_changes(pi_with_arguments):
+        """ A pipeline's arguments modified in place are used. """
+        pipe_name = pi_with_arguments.pipeline_names[0]
+        plan = pi_with_arguments.get_argument_plan(pipe_name)
+        assert plan is pi_with_arguments.get_argument_plan(pipe_name)
+        pi_with_arguments[PL_KEY][pipe_name]["arguments"]["--verbose"] = None
+        assert pi_with_arguments.get_arg_string(
+            pipe_name, _arg_sample("s1")).endswith(" --verbose")
+        del pi_with_arguments.pipelines[pipe_name].optional_arguments["--lab"]
+        assert "--lab" not in pi_with_arguments.get_arg_string(
+            pipe_name, _arg_sample("s1", lab="mylab"))
+
+
 class ConstructorPathParsingTests:
     """ The constructor is responsible for expanding pipeline path(s). """
 
@@ -0,0 +1,161 @@
+""" Tests for staged, asynchronous job submission """
+
+import os
+import sys
+import time
+
+import pytest
+from looper.exceptions import JobSubmissionException
+from tests.test_conductor import \
+    _conduct, _read_submissions, _write_fake_submit
+from tests.test_submission_scripts import prj
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 5),
+    reason="Asynchronous submission requires Python 3.5 or later")
+
+
+def _pipeline(*args, **kwargs):
+    from looper.async_submission import SubmissionPipeline
+    return SubmissionPipeline(*args, **kwargs)
+
+
+def _scripts(prj):
+    """ Map each job script's name to its content. """
+    folder = prj.metadata.submission_subdir
+    scripts = {}
+    for f in os.listdir(folder):
+        if f.endswith(".sub"):
+            with open(os.path.join(folder, f), 'r') as fh:
+                scripts[f] = fh.read()
+    return scripts
+
+
+class SubmissionPipelineTests:
+    """ Tests for job submission through asynchronous stages """
+
+    @staticmethod
+    @pytest.mark.parametrize("kwargs", [
+        {"workers": 0}, {"workers": -1}, {"queue_size": 0}])
+    def test_sizes_must_be_positive(kwargs):
+        """ A pipeline needs a worker, and room between its stages. """
+        with pytest.raises(ValueError):
+            _pipeline(**kwargs)
+
+    @staticmethod
+    @pytest.mark.parametrize(["workers", "queue_size"], [(1, 1), (3, 8)])
+    def test_same_as_serial(prj, workers, queue_size):
+        """ Staged submission writes and submits what serial submission does. """
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        serial = _conduct(prj)
+        expected = _scripts(prj)
+        os.remove(os.path.join(prj.metadata.output_dir, "submissions.log"))
+        for f in expected:
+            os.remove(os.path.join(prj.metadata.submission_subdir, f))
+        pipeline = _pipeline(workers, queue_size=queue_size)
+        conductors = _conduct(prj, submission_pipeline=pipeline)
+        pipeline.join()
+        assert expected and expected == _scripts(prj)
+        assert len(prj.samples) == pipeline.num_submitted
+        assert len(prj.samples) == \
+            len(_read_submissions(prj.metadata.output_dir))
+        for attr in ["num_cmd_submissions", "num_job_submissions"]:
+            assert sum(getattr(c, attr) for c in serial.values()) == \
+                sum(getattr(c, attr) for c in conductors.values())
+        assert all(not c.failed_samples for c in conductors.values())
+
+    @staticmethod
+    def test_failures_are_collected(prj):
+        """ Failed staged submissions are held rather than raised. """
+        failing = prj.samples[0].name
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir, fail_pattern=failing)
+        pipeline = _pipeline(2)
+        conductors = _conduct(prj, submission_pipeline=pipeline)
+        pipeline.join()
+        failed = [n for c in conductors.values() for n in c.failed_samples]
+        errors = [e for c in conductors.values() for e in c.submission_errors]
+        assert [failing] == failed
+        assert 1 == len(errors)
+        assert isinstance(errors[0], JobSubmissionException)
+        assert failing in os.path.basename(errors[0].script)
+        assert len(prj.samples) - 1 == \
+            sum(c.num_cmd_submissions for c in conductors.values())
+
+    @staticmethod
+    def test_stage_error_is_failed_submission():
+        """ A job that fails before submission is reported as failed. """
+        pipeline = _pipeline()
+        results = []
+
+        def fail():
+            raise ValueError("bad settings")
+        pipeline.submit(fail, None, lambda *args: results.append(args))
+        pipeline.join()
+        assert [(False, None)] == results
+        assert 0 == pipeline.num_submitted
+
+    @staticmethod
+    def test_script_error_is_collected(prj, monkeypatch):
+        """ A job whose script can't be written is held as failed. """
+        from looper.conductor import SubmissionConductor
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        failing = prj.samples[0].name
+        write_script = SubmissionConductor.write_script
+
+        def write_or_fail(self, pool, *args, **kwargs):
+            if failing in [s.name for s, _ in pool]:
+                raise IOError("disk full")
+            return write_script(self, pool, *args, **kwargs)
+        monkeypatch.setattr(SubmissionConductor, "write_script", write_or_fail)
+        pipeline = _pipeline(2)
+        conductors = _conduct(prj, submission_pipeline=pipeline)
+        pipeline.join()
+        errors = [e for c in conductors.values() for e in c.submission_errors]
+        assert [failing] == \
+            [n for c in conductors.values() for n in c.failed_samples]
+        assert 1 == len(errors)
+        assert isinstance(errors[0], JobSubmissionException)
+        assert len(prj.samples) - 1 == pipeline.num_submitted
+
+    @staticmethod
+    def test_rate_limit_is_global(prj):
+        """ Submission starts are spaced by the delay across workers. """
+        delay = 0.2
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        pipeline = _pipeline(len(prj.samples), delay=delay)
+        _conduct(prj, submission_pipeline=pipeline)
+        pipeline.join()
+        starts = sorted(t for t, _ in _read_submissions(prj.metadata.output_dir))
+        assert len(prj.samples) == len(starts)
+        gaps = [t2 - t1 for t1, t2 in zip(starts[:-1], starts[1:])]
+        assert all(g > 0.75 * delay for g in gaps), \
+            "Submissions too close: {}".format(gaps)
+
+    @staticmethod
+    def test_throughput(prj):
+        """ Scheduler round-trips overlap, rather than adding up. """
+        latency = 0.25
+        prj.dcc.compute.submission_command = _write_fake_submit(
+            prj.metadata.output_dir, latency=latency)
+        start = time.time()
+        _conduct(prj)
+        serial = time.time() - start
+        pipeline = _pipeline(len(prj.samples))
+        start = time.time()
+        _conduct(prj, submission_pipeline=pipeline)
+        pipeline.join()
+        staged = time.time() - start
+        assert 2 * len(prj.samples) == \
+            len(_read_submissions(prj.metadata.output_dir))
+        assert serial >= len(prj.samples) * latency
+        assert staged < serial / 2, \
+            "Serial: {:.2f}s; staged: {:.2f}s".format(serial, staged)
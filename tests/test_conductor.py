@@ -0,0 +1,345 @@
+""" Tests for job submission conduction """
+
+import os
+import stat
+import subprocess
+
+import peppy.sample
+import pytest
+from looper.conductor import SubmissionPool, array_job_spec
+from looper.exceptions import JobSubmissionException
+import looper.looper
+from looper.utils import project_snapshot, sample_folder, ProjectSnapshot
+from tests.test_submission_scripts import prj, PLIFACE_DATA
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+FAKE_SUBMIT_FILENAME = "fake_submit.sh"
+SUBMISSIONS_LOG_FILENAME = "submissions.log"
+
+
+def _write_fake_submit(folder, fail_pattern=None, latency=0,
+                       name=FAKE_SUBMIT_FILENAME):
+    """
+    Write an executable that records each job script it's asked to submit.
+
+    Any options that precede the script are recorded along with it.
+
+    :param str folder: path to folder in which to write the executable
+    :param str fail_pattern: text which, if present in a job script's path,
+        should make the fake submission fail
+    :param float latency: time (in seconds) each fake submission takes, as
+        a scheduler's round-trip would
+    :param str name: name for the executable, e.g. a scheduler's
+    :return str: path to the fake submission executable
+    """
+    log = os.path.join(folder, SUBMISSIONS_LOG_FILENAME)
+    lines = ["#!/bin/sh",
+             'echo "$(date +%s.%N) $*" >> {}'.format(log)]
+    if latency:
+        lines.append("sleep {}".format(latency))
+    if fail_pattern:
+        lines.append('case "$1" in *{}*) exit 1;; esac'.format(fail_pattern))
+    path = os.path.join(folder, name)
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def _read_submissions(folder):
+    """ Parse the fake submission log into (start time, script) pairs. """
+    with open(os.path.join(folder, SUBMISSIONS_LOG_FILENAME), 'r') as f:
+        return [(float(t), script) for t, script in
+                (l.strip().split(" ", 1) for l in f if l.strip())]
+
+
+def _conduct(project, **kwargs):
+    """ Create a conductor for each pipeline and add each sample to its own. """
+    conductors, pipe_keys = looper.looper.process_protocols(
+        project, set(PLIFACE_DATA["protocol_mapping"].keys()), **kwargs)
+    for s in project.samples:
+        conductors[pipe_keys[s.protocol][0]].add_sample(s)
+    for c in conductors.values():
+        c.submit(force=True)
+    return conductors
+
+
+class SubmissionPoolTests:
+    """ Tests for concurrent, rate-limited job submission """
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [0, -1])
+    def test_worker_count_must_be_positive(workers):
+        """ A pool needs at least one worker. """
+        with pytest.raises(ValueError):
+            SubmissionPool(workers)
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_tallies_are_exact(prj, workers):
+        """ Pooled submission counts match serial submission counts. """
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        pool = SubmissionPool(workers)
+        conductors = _conduct(prj, submission_pool=pool)
+        pool.join()
+        assert len(prj.samples) == \
+            sum(c.num_cmd_submissions for c in conductors.values())
+        assert len(prj.samples) == \
+            sum(c.num_job_submissions for c in conductors.values())
+        assert len(prj.samples) == \
+            len(_read_submissions(prj.metadata.output_dir))
+        assert all(not c.failed_samples for c in conductors.values())
+
+    @staticmethod
+    def test_failures_are_collected(prj):
+        """ Failed pooled submissions are held rather than raised. """
+        failing = prj.samples[0].name
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir, fail_pattern=failing)
+        pool = SubmissionPool(2)
+        conductors = _conduct(prj, submission_pool=pool)
+        pool.join()
+        failed = [n for c in conductors.values() for n in c.failed_samples]
+        errors = [e for c in conductors.values() for e in c.submission_errors]
+        assert [failing] == failed
+        assert 1 == len(errors)
+        assert isinstance(errors[0], JobSubmissionException)
+        assert failing in os.path.basename(errors[0].script)
+        assert len(prj.samples) - 1 == \
+            sum(c.num_cmd_submissions for c in conductors.values())
+
+    @staticmethod
+    def test_rate_limit_is_global(prj):
+        """ Submission starts are spaced by the delay across workers. """
+        delay = 0.2
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        pool = SubmissionPool(len(prj.samples), delay=delay)
+        _conduct(prj, submission_pool=pool)
+        pool.join()
+        starts = sorted(t for t, _ in _read_submissions(prj.metadata.output_dir))
+        assert len(prj.samples) == len(starts)
+        # Allow some slack for process startup time between rate-limiting
+        # and the fake submission's timestamp.
+        gaps = [t2 - t1 for t1, t2 in zip(starts[:-1], starts[1:])]
+        assert all(g > 0.75 * delay for g in gaps), \
+            "Submissions too close: {}".format(gaps)
+
+
+class ProjectDataTests:
+    """ Tests for the project data given to each sample """
+
+    @staticmethod
+    def _pooled_samples(prj, **kwargs):
+        conductors, pipe_keys = looper.looper.process_protocols(
+            prj, set(PLIFACE_DATA["protocol_mapping"].keys()),
+            max_cmds=len(prj.samples), **kwargs)
+        for s in prj.samples:
+            conductors[pipe_keys[s.protocol][0]].add_sample(s)
+        return [[s for s, _ in c._pool] for c in conductors.values()]
+
+    @staticmethod
+    def test_snapshot_is_shared(prj):
+        """ Every sample references the single snapshot given. """
+        data = project_snapshot(prj)
+        pools = ProjectDataTests._pooled_samples(prj, project_data=data)
+        samples = [s for pool in pools for s in pool]
+        assert len(prj.samples) == len(samples)
+        assert all(s.prj is data for s in samples)
+
+    @staticmethod
+    def test_snapshot_per_conductor_by_default(prj):
+        """ Without a shared snapshot, a conductor's samples share its own. """
+        for pool in ProjectDataTests._pooled_samples(prj):
+            assert all(s.prj is pool[0].prj for s in pool)
+            assert isinstance(pool[0].prj, ProjectSnapshot)
+            assert prj.metadata.output_dir == pool[0].prj.metadata.output_dir
+
+
+class SkippedSampleScriptTests:
+    """ Tests for the scripts written for samples skipped for their flags """
+
+    @staticmethod
+    def _add_flagged(prj, repeats=1, **kwargs):
+        """ Flag every sample, then add each to its pipeline's conductor. """
+        conductors, pipe_keys = looper.looper.process_protocols(
+            prj, set(PLIFACE_DATA["protocol_mapping"].keys()), **kwargs)
+        for s in prj.samples:
+            key = pipe_keys[s.protocol][0]
+            flag = "{}_{}_completed.flag".format(
+                PLIFACE_DATA["pipelines"][key]["name"], s.name)
+            open(os.path.join(sample_folder(prj, s), flag), 'w').close()
+        for _ in range(repeats):
+            for s in prj.samples:
+                conductors[pipe_keys[s.protocol][0]].add_sample(s)
+        return conductors
+
+    @staticmethod
+    def _scripts(prj):
+        return sorted(f for f in os.listdir(prj.metadata.submission_subdir)
+                      if f.endswith(".sub"))
+
+    @staticmethod
+    @pytest.mark.parametrize("max_cmds", [1, 2])
+    def test_flushed_as_pools_fill(prj, max_cmds):
+        """ Flushed pools' scripts are written as each pool fills. """
+        conductors = SkippedSampleScriptTests._add_flagged(
+            prj, max_cmds=max_cmds, flush_skipped=True)
+        scripts = SkippedSampleScriptTests._scripts(prj)
+        assert len(prj.samples) // max_cmds == len(scripts)
+        assert all(not c.write_skipped_sample_scripts()
+                   for c in conductors.values())
+        assert all(0 == c.num_job_submissions for c in conductors.values())
+
+    @staticmethod
+    def test_held_until_written(prj):
+        """ By default, pools' scripts are written only when requested. """
+        conductors = SkippedSampleScriptTests._add_flagged(prj)
+        assert [] == SkippedSampleScriptTests._scripts(prj)
+        written = [os.path.basename(s) for c in conductors.values()
+                   for s in c.write_skipped_sample_scripts()]
+        assert len(prj.samples) == len(written)
+        assert sorted(written) == SkippedSampleScriptTests._scripts(prj)
+        # Each pool's written once.
+        assert all(not c.write_skipped_sample_scripts()
+                   for c in conductors.values())
+
+    @staticmethod
+    def test_lumps_named_apart(prj, monkeypatch):
+        """ Each lump of skipped samples has a script of its own. """
+        # Each sample fills a lump by its size alone.
+        monkeypatch.setattr(peppy.sample, "get_file_size", lambda _: 1)
+        conductors = SkippedSampleScriptTests._add_flagged(
+            prj, max_cmds=2, max_size=1)
+        written = [s for c in conductors.values()
+                   for s in c.write_skipped_sample_scripts()]
+        assert len(prj.samples) == len(set(written))
+        assert len(written) == len(SkippedSampleScriptTests._scripts(prj))
+
+    @staticmethod
+    def test_sample_skipped_again_is_held_once(prj):
+        """ A sample added again keeps the skip from its filled pool. """
+        conductors = SkippedSampleScriptTests._add_flagged(prj, repeats=3)
+        written = [os.path.basename(s) for c in conductors.values()
+                   for s in c.write_skipped_sample_scripts()]
+        assert len(prj.samples) == len(written)
+        assert sorted(written) == SkippedSampleScriptTests._scripts(prj)
+
+    @staticmethod
+    def test_flushed_sample_skipped_again_is_not_rewritten(prj):
+        """ A sample added again doesn't have its flushed script rewritten. """
+        conductors = SkippedSampleScriptTests._add_flagged(
+            prj, flush_skipped=True)
+        scripts = SkippedSampleScriptTests._scripts(prj)
+        assert len(prj.samples) == len(scripts)
+        for f in scripts:
+            os.remove(os.path.join(prj.metadata.submission_subdir, f))
+        for s in prj.samples:
+            key = PLIFACE_DATA["protocol_mapping"][s.protocol]
+            conductors[key].add_sample(s)
+        assert [] == SkippedSampleScriptTests._scripts(prj)
+        assert all(not c.write_skipped_sample_scripts()
+                   for c in conductors.values())
+
+
+class ArrayJobTests:
+    """ Tests for submission of a conductor's jobs as one array job """
+
+    @staticmethod
+    def _submit(prj, scheduler="sbatch", **kwargs):
+        prj.dcc.compute.submission_command = _write_fake_submit(
+            prj.metadata.output_dir, name=scheduler)
+        return _conduct(prj, **kwargs)
+
+    @staticmethod
+    def _task_commands(script, variable, index):
+        """ Find the command line that a task of an array job would run. """
+        with open(script, 'r') as f:
+            code = [l for l in f if l.startswith("eval ")][0]
+        env = dict(os.environ)
+        env[variable] = str(index)
+        return subprocess.check_output(
+            ["sh", "-c", "echo " + code.split(" ", 1)[1].split(" | ")[0]],
+            env=env).decode().strip()
+
+    @staticmethod
+    @pytest.mark.parametrize("max_cmds", [1, 2])
+    def test_one_submission_per_conductor(prj, max_cmds):
+        """ Each conductor's jobs become the tasks of one array job. """
+        conductors = ArrayJobTests._submit(
+            prj, max_cmds=max_cmds, array_size=100)
+        submissions = _read_submissions(prj.metadata.output_dir)
+        assert len(conductors) == len(submissions)
+        assert all(1 == c.num_job_submissions for c in conductors.values())
+        assert len(prj.samples) == \
+            sum(c.num_cmd_submissions for c in conductors.values())
+        scripts = sorted(script for _, script in submissions)
+        assert all(s.startswith("--array=1-") for s in scripts)
+        for option, path in (s.split(" ") for s in scripts):
+            with open(os.path.splitext(path)[0] + ".tasks", 'r') as f:
+                tasks = f.read().splitlines()
+            assert option == "--array=1-{}".format(len(tasks))
+            assert all(max_cmds == len(t.split(" ; ")) for t in tasks[:-1])
+
+    @staticmethod
+    @pytest.mark.parametrize("max_cmds", [1, 2])
+    def test_tasks_match_jobs(prj, max_cmds):
+        """ Each task runs the commands of the job it stands in for. """
+        jobs = _conduct(prj, max_cmds=max_cmds, dry_run=True)
+        arrays = ArrayJobTests._submit(prj, max_cmds=max_cmds, array_size=100)
+        for key in arrays:
+            names = [s.name for s in prj.samples
+                     if key == PLIFACE_DATA["protocol_mapping"][s.protocol]]
+            if max_cmds != 1:
+                names = ["lump{}".format(i + 1)
+                         for i in range(jobs[key].num_job_submissions)]
+            assert names
+            script = os.path.join(prj.metadata.submission_subdir,
+                                  "{}_array1.sub".format(key))
+            for i, name in enumerate(names):
+                with open(os.path.join(prj.metadata.submission_subdir,
+                                       "{}_{}.sub".format(key, name))) as f:
+                    lines = f.read().splitlines()
+                commands = ArrayJobTests._task_commands(
+                    script, "SLURM_ARRAY_TASK_ID", i + 1).split(" ; ")
+                assert commands[:-1] == lines[-len(commands):-1]
+                assert lines[-1].startswith(commands[-1] + " | tee ")
+
+    @staticmethod
+    def test_array_size_bounds_tasks(prj):
+        """ Once an array job has as many tasks as allowed, it's submitted. """
+        conductors = ArrayJobTests._submit(prj, array_size=2)
+        submissions = _read_submissions(prj.metadata.output_dir)
+        assert len(prj.samples) == \
+            sum(c.num_cmd_submissions for c in conductors.values())
+        assert sum(c.num_job_submissions for c in conductors.values()) == \
+            len(submissions)
+        assert all(o in ["--array=1-1", "--array=1-2"]
+                   for o, _ in (s.split(" ") for _, s in submissions))
+        assert len(submissions) < len(prj.samples)
+
+    @staticmethod
+    def test_sge(prj):
+        """ An SGE array job is made with its own option and task index. """
+        ArrayJobTests._submit(prj, scheduler="qsub", array_size=100)
+        for _, submission in _read_submissions(prj.metadata.output_dir):
+            option, script = submission.rsplit(" ", 1)
+            assert option.startswith("-t 1-")
+            assert ArrayJobTests._task_commands(script, "SGE_TASK_ID", 1)
+
+    @staticmethod
+    @pytest.mark.parametrize(["command", "supported"], [
+        ("sbatch", True), ("/usr/bin/qsub -V", True), ("sh", False),
+        ("bsub <", False), ("", False)])
+    def test_supported_schedulers(prj, command, supported):
+        """ Array jobs are made only for schedulers known to support them. """
+        assert supported == (array_job_spec(command) is not None)
+        prj.dcc.compute.submission_command = command
+        if not supported:
+            with pytest.raises(ValueError):
+                _conduct(prj, array_size=10)
@@ -0,0 +1,255 @@
+""" Tests for building HTML reports """
+
+from collections import OrderedDict
+import os
+import time
+
+import pandas as pd
+import pytest
+from attmap import AttMap
+from looper.html_reports import HTMLReportBuilder, ObjectsIndex
+from looper.looper import OBJECTS_COLUMNS
+from looper.sample_status import MEMORY_LOG_KEY, RUNTIME_LOG_KEY, \
+    SampleStatusIndex, scan_log
+from looper.summary_cache import SummaryCache
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+NUM_SAMPLES = 12
+
+
+class _Project(object):
+    """ Minimal stand-in for a project whose report is built. """
+    def __init__(self, output_dir):
+        self.name = "report_test"
+        self.subproject = None
+        self.samples = []
+        self.metadata = AttMap({
+            "output_dir": output_dir,
+            "results_subdir": os.path.join(output_dir, "results_pipeline")})
+
+
+def _pages(reports_dir):
+    """ Sample and object pages to render, each with distinct arguments. """
+    pages = []
+    for i in range(NUM_SAMPLES):
+        name = "sample{}".format(i)
+        stats = OrderedDict([("sample_name", name), ("reads", str(i * 100)),
+                             ("rate", "0.{}".format(i))])
+        pages.append((os.path.join(reports_dir, name + ".html"), "sample.html",
+                      dict(sample_name=name, sample_stats=stats, flag="Completed",
+                           button_class="btn btn-success", links=[],
+                           figures=[["a.pdf", "plot{}".format(i), "a.png"]])))
+    pages.append((os.path.join(reports_dir, "plota.html"), "object.html",
+                  dict(name="plotA", links=[["sample0", "a.pdf"]], figures=[])))
+    return pages
+
+
+def _read_pages(pages):
+    contents = []
+    for path, _, _ in pages:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+
+def _builder(output_dir, **kwargs):
+    prj = _Project(output_dir)
+    return HTMLReportBuilder(
+        prj, SampleStatusIndex.from_project(prj), **kwargs)
+
+
+SHARED_VARS = dict(navbar="<nav>links</nav>", footer="<footer>v</footer>")
+
+
+class PageRenderingTests:
+    """ Tests for rendering of per-sample and per-object pages """
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [2, 4])
+    def test_pool_matches_serial(tmpdir, workers):
+        """ Pages rendered in a pool are byte-identical to serial ones. """
+        serial = _builder(os.path.join(tmpdir.strpath, "serial"))
+        pooled = _builder(os.path.join(tmpdir.strpath, "pooled"),
+                          workers=workers)
+        serial_pages = _pages(serial.reports_dir)
+        pooled_pages = _pages(pooled.reports_dir)
+        serial._save_pages(serial_pages, SHARED_VARS)
+        pooled._save_pages(pooled_pages, SHARED_VARS)
+        expected = _read_pages(serial_pages)
+        assert all(SHARED_VARS["navbar"].encode() in c for c in expected)
+        assert expected == _read_pages(pooled_pages)
+
+    @staticmethod
+    def test_single_page_matches_batch(tmpdir):
+        """ A page saved alone matches the same page saved in a batch. """
+        builder = _builder(tmpdir.strpath)
+        path, template_name, template_vars = _pages(builder.reports_dir)[0]
+        builder._save_pages([(path, template_name, template_vars)], SHARED_VARS)
+        batched = _read_pages([(path, None, None)])
+        template_vars = dict(template_vars)
+        template_vars.update(SHARED_VARS)
+        builder._save_page(path, template_name, template_vars)
+        assert batched == _read_pages([(path, None, None)])
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_current_pages_are_skipped(tmpdir, workers):
+        """ With a cache, only pages whose inputs changed are rendered. """
+        cache = SummaryCache(os.path.join(tmpdir.strpath, "cache.json"))
+        builder = _builder(tmpdir.strpath, cache=cache, workers=workers)
+        pages = _pages(builder.reports_dir)
+        builder._save_pages(pages, SHARED_VARS)
+        # Blank each page, to see which are rendered again; remove one.
+        for path, _, _ in pages:
+            open(path, 'w').close()
+        os.remove(pages[0][0])
+        pages[1][2]["flag"] = "Failed"
+        builder._save_pages(pages, SHARED_VARS)
+        sizes = [os.path.getsize(p) for p, _, _ in pages]
+        # Removed and changed pages are rendered; others are left alone.
+        assert sizes[0] > 0 and sizes[1] > 0
+        assert not any(sizes[2:])
+
+
+LOG_KEYS = [RUNTIME_LOG_KEY, MEMORY_LOG_KEY]
+
+
+def _write_log(folder, lines, name="pipe_log.md"):
+    """ Write lines of bytes as a log file. """
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(b"\n".join(lines) + b"\n")
+    return path
+
+
+@pytest.fixture(scope="function")
+def log_lines():
+    """ Provide lines of a log, with the metrics of interest near its end. """
+    return [b"### Pipeline run code and environment:", b"",
+            b"* Command: `pipe.py --in a,b`"] + \
+        [b"noise, with: colons and, commas"] * 500 + \
+        [b"* Total elapsed time:  1:02:03", b"* Peak memory used:  2.5 GB",
+         b"", b"### Pipeline completed."]
+
+
+class LogScanTests:
+    """ Tests for extraction of values from pipeline logs """
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [3, 64, 1024 * 1024])
+    def test_values(tmpdir, log_lines, block_size):
+        """ Values follow the first colon, regardless of block boundaries. """
+        path = _write_log(tmpdir.strpath, log_lines)
+        assert {RUNTIME_LOG_KEY: "1:02:03", MEMORY_LOG_KEY: "2.5 GB"} == \
+            scan_log(path, LOG_KEYS, block_size=block_size)
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [5, 1024])
+    def test_last_occurrence_wins(tmpdir, log_lines, block_size):
+        """ For a log of multiple runs, values are from the latest one. """
+        path = _write_log(tmpdir.strpath, log_lines + [
+            b"* Total elapsed time:  2:00:00", b"no colon: Peak memory used"])
+        assert {RUNTIME_LOG_KEY: "2:00:00", MEMORY_LOG_KEY: "Peak memory used"} == \
+            scan_log(path, LOG_KEYS, block_size=block_size)
+
+    @staticmethod
+    def test_missing_values(tmpdir):
+        """ Keys that are absent, or lack a value, get null. """
+        path = _write_log(tmpdir.strpath, [
+            b"* Total elapsed time unknown", b"* Cores: 4"])
+        assert {RUNTIME_LOG_KEY: None, MEMORY_LOG_KEY: None} == \
+            scan_log(path, LOG_KEYS)
+
+    @staticmethod
+    def test_first_line(tmpdir):
+        """ A value on the very first line is found. """
+        path = _write_log(tmpdir.strpath, [b"Total elapsed time: 0:00:01"])
+        assert "0:00:01" == scan_log(path, [RUNTIME_LOG_KEY],
+                                      block_size=4)[RUNTIME_LOG_KEY]
+
+    @staticmethod
+    def test_encodings(tmpdir):
+        """ Lines are decoded with the first encoding that works. """
+        path = _write_log(tmpdir.strpath, [
+            u"* Peak memory used: 1 GB \u00b5".encode("latin-1"),
+            u"* Total elapsed time: 1:00 \u00b5".encode("utf-8")])
+        assert {RUNTIME_LOG_KEY: u"1:00 \u00b5", MEMORY_LOG_KEY: None} == \
+            scan_log(path, LOG_KEYS)
+        assert u"1 GB \u00b5" == scan_log(
+            path, LOG_KEYS, encodings=["utf-8", "latin-1"])[MEMORY_LOG_KEY]
+
+    @staticmethod
+    def test_missing_log(tmpdir):
+        """ A nonexistent log is an error. """
+        with pytest.raises(IOError):
+            scan_log(os.path.join(tmpdir.strpath, "nothing.md"), LOG_KEYS)
+
+
+def _objects_table(num_samples, objs_per_sample):
+    """ Build an objects table like that summarized from sample outputs. """
+    keys = ["plot{}".format(j) for j in range(objs_per_sample)]
+    names = ["sample{}".format(i) for i in range(num_samples)]
+    return pd.DataFrame({
+        "key": keys * num_samples,
+        "filename": ["{}.pdf".format(k) for k in keys] * num_samples,
+        "anchor_text": "Plot",
+        "anchor_image": ["{}.png".format(k) for k in keys] * num_samples,
+        "annotation": "PL1",
+        "sample_name": [n for n in names for _ in keys]},
+        columns=OBJECTS_COLUMNS + ["sample_name"])
+
+
+class ObjectsIndexTests:
+    """ Tests for lookup of a project's objects by sample and by key """
+
+    @staticmethod
+    def test_slices_match_filtering():
+        """ Fetched rows are those a filter of the whole table gives. """
+        objs = _objects_table(5, 3).sample(frac=1, random_state=1)
+        index = ObjectsIndex(objs)
+        for name in objs["sample_name"].unique():
+            assert objs[objs["sample_name"] == name].equals(index.sample(name))
+        for key in objs["key"].unique():
+            assert objs[objs["key"] == key].equals(index.key(key))
+
+    @staticmethod
+    def test_missing_label():
+        """ A sample or key without objects gets an empty table. """
+        index = ObjectsIndex(_objects_table(2, 2))
+        assert index.sample("nonexistent").empty
+        assert index.key("nonexistent").empty
+
+    @staticmethod
+    def test_empty_table():
+        """ An empty table has nothing to fetch. """
+        index = ObjectsIndex(pd.DataFrame())
+        assert index.sample("sample0").empty
+        assert index.key("plot0").empty
+
+    @staticmethod
+    def test_lookup_time_is_constant():
+        """ Time per sample lookup doesn't grow with the number of samples. """
+        objs_per_sample = 30
+        small, large = 2000, 20000
+        objs = _objects_table(large, objs_per_sample)
+
+        def time_per_sample(n):
+            sub = objs.iloc[:(n * objs_per_sample)]
+            index = ObjectsIndex(sub)
+            names = sub["sample_name"].unique()[::(n // num_lookups)]
+            start = time.time()
+            for name in names:
+                assert objs_per_sample == len(index.sample(name))
+            return (time.time() - start) / len(names)
+
+        num_lookups = 1000
+        small_time, large_time = time_per_sample(small), time_per_sample(large)
+        # Filtering the whole table per sample would make the per-sample
+        # time for the larger project about large/small times greater.
+        assert large_time < 3 * small_time, \
+            "Per-sample time: {:.2e}s for {} samples, {:.2e}s for {}".format(
+                small_time, small, large_time, large)
@@ -0,0 +1,310 @@
+""" Tests for the ledger of jobs submitted for samples """
+
+import argparse
+import os
+import stat
+import sys
+
+import pytest
+from looper import build_parser
+from looper.conductor import QUEUED_JOB_SKIP_REASON, SubmissionPool
+from looper.ledger import LEDGER_FILENAME, SubmissionLedger
+import looper.looper
+from looper.looper import Canceller, Runner
+from looper.sample_status import SampleStatusIndex
+from looper.scheduler import ScheduledJob, job_states_by_sample
+from tests.test_conductor import _conduct
+from tests.test_submission_scripts import prj
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+COMMANDS_LOG_FILENAME = "commands.log"
+SQUEUE_OUTPUT_FILENAME = "squeue.out"
+
+
+def _write_fake_scheduler(folder):
+    """
+    Write fake sbatch, squeue and scancel executables that log their
+    arguments.
+
+    The fake sbatch reports its process ID as the job's ID, and the fake
+    squeue lists the jobs set with _set_live_jobs.
+
+    :param str folder: path to folder in which to write the executables
+    :return str: path to the fake sbatch
+    """
+    log = os.path.join(folder, COMMANDS_LOG_FILENAME)
+    squeue_output = os.path.join(folder, SQUEUE_OUTPUT_FILENAME)
+    for name, lines in [("sbatch", ['echo "Submitted batch job $$"']),
+                        ("squeue", ["cat {} 2>/dev/null; true".
+                                    format(squeue_output)]),
+                        ("scancel", [])]:
+        path = os.path.join(folder, name)
+        with open(path, 'w') as f:
+            f.write("\n".join(["#!/bin/sh",
+                               'echo "{} $*" >> {}'.format(name, log)] +
+                              lines) + "\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return os.path.join(folder, "sbatch")
+
+
+def _set_live_jobs(folder, job_ids):
+    """ Set the jobs that the fake squeue lists as running. """
+    with open(os.path.join(folder, SQUEUE_OUTPUT_FILENAME), 'w') as f:
+        f.write("".join("{} RUNNING job{}\n".format(i, i) for i in job_ids))
+
+
+def _read_commands(folder, name):
+    """ Arguments of each call to a fake scheduler command. """
+    with open(os.path.join(folder, COMMANDS_LOG_FILENAME), 'r') as f:
+        return [l.split()[1:] for l in f if l.split()[0] == name]
+
+
+@pytest.fixture(scope="function")
+def scheduler(prj, tmpdir, monkeypatch):
+    """ Make the project's jobs submitted to a fake SLURM. """
+    folder = tmpdir.mkdir("bin").strpath
+    monkeypatch.setenv("PATH", folder + os.pathsep + os.environ["PATH"])
+    prj.dcc.compute.submission_command = _write_fake_scheduler(folder)
+    return folder
+
+
+def _check_recorded(prj, folder):
+    """ Check that each sample's submission was recorded in the ledger. """
+    submissions = _read_commands(folder, "sbatch")
+    ledger = SubmissionLedger.for_project(prj)
+    entries = [ledger.latest(s.name, {"ATAC": "pepatac.py",
+                                      "WGBS": "wgbs.py"}[s.protocol])
+               for s in prj.samples]
+    assert all(e.job_id and e.job_id.isdigit() for e in entries)
+    assert len(submissions) == len({e.job_id for e in entries})
+    assert {args[-1] for args in submissions} == {e.script for e in entries}
+    assert all(os.path.basename(e.script) == e.job_name + ".sub"
+               for e in entries)
+    assert all("sbatch" == os.path.basename(e.submission_command)
+               for e in entries)
+    assert all({"cores", "mem", "time"} <= set(e.resources) for e in entries)
+
+
+class SubmissionLedgerTests:
+    """ Tests for recording and looking up submissions """
+
+    @staticmethod
+    def test_latest_submission(tmpdir):
+        """ A sample's latest submission for a pipeline is found. """
+        path = os.path.join(tmpdir.strpath, LEDGER_FILENAME)
+        ledger = SubmissionLedger(path)
+        ledger.record("1", "a.py_lump1", "a.py", ["s1", "s2"], "lump1.sub",
+                      "sbatch", {"mem": "4000"})
+        ledger.record("2", "b.py_s1", "b.py", ["s1"], "s1.sub", "sbatch")
+        ledger.record(None, "a.py_s1", "a.py", ["s1"], "s1.sub", "sh")
+        for reader in [ledger, SubmissionLedger(path)]:
+            assert reader.latest("s1", "a.py").job_id is None
+            assert "2" == reader.latest("s1", "b.py").job_id
+            entry = reader.latest("s2", "a.py")
+            assert ("1", "a.py_lump1", {"mem": "4000"}) == \
+                (entry.job_id, entry.job_name, entry.resources)
+            assert reader.latest("s2", "b.py") is None
+
+    @staticmethod
+    def test_jobs(tmpdir):
+        """ Latest submissions are collected by known job ID. """
+        ledger = SubmissionLedger(os.path.join(tmpdir.strpath, LEDGER_FILENAME))
+        ledger.record("1", "a.py_lump1", "a.py", ["s1", "s2"], "", "sbatch")
+        ledger.record("2", "a.py_s2", "a.py", ["s2"], "", "sbatch")
+        ledger.record(None, "a.py_s3", "a.py", ["s3"], "", "sh")
+        jobs = ledger.jobs()
+        assert {"1": ["s1"], "2": ["s2"]} == \
+            {j: [e.sample for e in es] for j, es in jobs.items()}
+        assert ["2"] == list(ledger.jobs(["s2", "s3"]))
+
+    @staticmethod
+    def test_append_only(tmpdir):
+        """ Each record is appended, under a single header. """
+        path = os.path.join(tmpdir.strpath, LEDGER_FILENAME)
+        for i in range(3):
+            SubmissionLedger(path).record(str(i), "j", "a.py", ["s"], "", "")
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+        assert 4 == len(lines)
+        assert lines[0].startswith("time\tjob_id\t")
+        assert ["0", "1", "2"] == [l.split("\t")[1] for l in lines[1:]]
+
+    @staticmethod
+    def test_malformed_line_skipped(tmpdir):
+        """ A line cut short, e.g. by an interrupted write, is skipped. """
+        path = os.path.join(tmpdir.strpath, LEDGER_FILENAME)
+        ledger = SubmissionLedger(path)
+        ledger.record("1", "j", "a.py", ["s"], "", "")
+        with open(path, 'a') as f:
+            f.write("2019-05-01 00:00:00\t2\tj\ta.py\ts\t")
+        assert ["1"] == [e.job_id for e in SubmissionLedger(path).entries()]
+
+
+class LedgerSubmissionTests:
+    """ Tests for recording submitted jobs in the ledger """
+
+    @staticmethod
+    @pytest.mark.parametrize("kwargs", [
+        {}, {"max_cmds": 2}, {"array_size": 10}, {"pool": True}])
+    def test_job_ids_recorded(prj, scheduler, kwargs):
+        """ Each sample's job is recorded with its scheduler's job ID. """
+        kwargs = dict(kwargs)
+        pool = None
+        if kwargs.pop("pool", False):
+            pool = kwargs["submission_pool"] = SubmissionPool(2)
+        _conduct(prj, ledger=SubmissionLedger.for_project(prj), **kwargs)
+        if pool is not None:
+            pool.join()
+        _check_recorded(prj, scheduler)
+
+    @staticmethod
+    @pytest.mark.skipif(
+        sys.version_info < (3, 5),
+        reason="Asynchronous submission requires Python 3.5 or later")
+    def test_job_ids_recorded_async(prj, scheduler):
+        """ Jobs submitted asynchronously are recorded with their IDs. """
+        from looper.async_submission import SubmissionPipeline
+        pipeline = SubmissionPipeline(2)
+        _conduct(prj, ledger=SubmissionLedger.for_project(prj),
+                 submission_pipeline=pipeline)
+        pipeline.join()
+        _check_recorded(prj, scheduler)
+
+    @staticmethod
+    def test_dry_run_not_recorded(prj, scheduler):
+        """ Jobs of a dry run aren't submitted, so aren't recorded. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger, dry_run=True)
+        assert not os.path.exists(ledger.path)
+
+
+class CancellerTests:
+    """ Tests for canceling a project's jobs """
+
+    @staticmethod
+    @pytest.mark.parametrize(["dry_run", "cancels"], [(False, 1), (True, 0)])
+    def test_single_cancel_command(prj, scheduler, dry_run, cancels):
+        """ Each sample's latest job is canceled, with a single command. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger, max_cmds=2)
+        job_ids = sorted(ledger.jobs())
+        assert 2 == len(job_ids)
+        _set_live_jobs(scheduler, job_ids)
+        args = argparse.Namespace(dry_run=dry_run, force_yes=True)
+        assert 0 == Canceller(prj)(args)
+        canceled = _read_commands(scheduler, "scancel")
+        assert cancels == len(canceled)
+        if cancels:
+            assert job_ids == sorted(canceled[0])
+
+    @staticmethod
+    @pytest.mark.parametrize("live", [[0], []])
+    def test_finished_jobs_left_out(prj, scheduler, live):
+        """ Only the recorded jobs still in the scheduler are canceled. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger, max_cmds=2)
+        job_ids = sorted(ledger.jobs())
+        live_ids = [job_ids[i] for i in live]
+        _set_live_jobs(scheduler, live_ids + ["999"])
+        args = argparse.Namespace(dry_run=False, force_yes=True)
+        assert 0 == Canceller(prj)(args)
+        assert ([live_ids] if live_ids else []) == \
+            _read_commands(scheduler, "scancel")
+
+    @staticmethod
+    def test_nothing_to_cancel(prj, scheduler):
+        """ There's nothing to cancel without recorded jobs. """
+        args = argparse.Namespace(dry_run=False, force_yes=True)
+        assert 0 == Canceller(prj)(args)
+        assert not os.path.exists(
+            os.path.join(scheduler, COMMANDS_LOG_FILENAME))
+
+
+class LedgerJobStatesTests:
+    """ Tests for matching the scheduler's jobs to samples with the ledger """
+
+    @staticmethod
+    def test_lump_jobs_matched(prj, scheduler):
+        """ A lump's job is matched to each of its samples. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger, max_cmds=2)
+        job_states = {"wgbs.py_lump1": "running", "pepatac.py_lump1": "queued"}
+        assert {"queued": [("sample2", "PEPATAC"), ("sample3", "PEPATAC")],
+                "running": [("sample0", "WGBS"), ("sample1", "WGBS")]} == \
+            job_states_by_sample(prj, job_states,
+                                 SampleStatusIndex.from_project(prj),
+                                 ledger=ledger)
+
+
+def _add_samples(prj, **kwargs):
+    """ Add each sample to its pipeline's conductor, then submit. """
+    conductors, pipe_keys = looper.looper.process_protocols(
+        prj, {"ATAC", "WGBS"}, **kwargs)
+    skip_reasons = {}
+    for s in prj.samples:
+        skip_reasons[s.name] = \
+            conductors[pipe_keys[s.protocol][0]].add_sample(s)
+    for c in conductors.values():
+        c.submit(force=True)
+    return skip_reasons
+
+
+class QueuedJobSkipTests:
+    """ Tests for skipping samples whose jobs are still in the scheduler """
+
+    @staticmethod
+    def test_queued_jobs_not_submitted_again(prj, scheduler):
+        """ A sample whose latest job is still scheduled is skipped. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger, max_cmds=2)
+        jobs = [ScheduledJob(job_id, "", "queued")
+                for job_id in sorted(ledger.jobs())[:1]]
+        queued = {e.sample for e in ledger.jobs()[jobs[0].job_id]}
+        skip_reasons = _add_samples(
+            prj, ledger=ledger, scheduled_jobs=jobs, max_cmds=2)
+        assert {s: [QUEUED_JOB_SKIP_REASON] if s in queued else []
+                for s in skip_reasons} == skip_reasons
+        assert 3 == len(_read_commands(scheduler, "sbatch"))
+
+    @staticmethod
+    def test_finished_jobs_submitted_again(prj, scheduler):
+        """ A sample whose job has left the scheduler is submitted again. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger)
+        skip_reasons = _add_samples(prj, ledger=ledger, scheduled_jobs=[])
+        assert all(not r for r in skip_reasons.values())
+        assert 2 * len(prj.samples) == len(_read_commands(scheduler, "sbatch"))
+
+    @staticmethod
+    @pytest.mark.parametrize(["recorded_id", "skipped"],
+                             [(None, True), ("1", False), ("9", True)])
+    def test_job_found_by_id_or_name(prj, scheduler, recorded_id, skipped):
+        """ A recorded job is found by its ID; another, by its name. """
+        ledger = SubmissionLedger.for_project(prj)
+        if recorded_id:
+            ledger.record(recorded_id, "pepatac.py_sample2", "pepatac.py",
+                          ["sample2"], "", "sbatch")
+        skip_reasons = _add_samples(
+            prj, ledger=ledger,
+            scheduled_jobs=[ScheduledJob("9", "pepatac.py_sample2", "queued")])
+        assert skipped == (QUEUED_JOB_SKIP_REASON in skip_reasons["sample2"])
+        assert all(not skip_reasons[s] for s in ["sample0", "sample1", "sample3"])
+
+    @staticmethod
+    @pytest.mark.parametrize(["flags", "queries", "submissions"], [
+        ([], 1, 0), (["--ignore-queued"], 0, 4), (["--dry-run"], 0, 0)])
+    def test_scheduler_queried_by_run(
+            prj, scheduler, flags, queries, submissions):
+        """ A run queries the scheduler once, unless it can't submit again. """
+        ledger = SubmissionLedger.for_project(prj)
+        _conduct(prj, ledger=ledger)
+        _set_live_jobs(scheduler, ledger.jobs())
+        args = build_parser().parse_args(["run"] + flags + [prj.config_file])
+        Runner(prj)(args, [])
+        assert queries == len(_read_commands(scheduler, "squeue"))
+        assert len(prj.samples) + submissions == \
+            len(_read_commands(scheduler, "sbatch"))
@@ -8,12 +8,17 @@ The primary function under test here is the creation of a project instance.
 from collections import defaultdict
 import itertools
 import logging
+import os
 import random
+import subprocess
+import sys
 
 import numpy.random as nprand
 import pytest
 
+import looper
 from looper import build_parser
+from looper.const import STATUS_FLAGS
 from looper.looper import aggregate_exec_skip_reasons
 from tests.conftest import LOOPER_ARGS_BY_PIPELINE
 from tests.helpers import named_param
@@ -134,3 +139,67 @@ class CliParserTests:
         """ Helper for formatting flag vs. arg-accepting CLI option """
         opt_text = "--" + opt
         return opt_text if arg is None else "{} {}".format(opt_text, arg)
+
+
+# Dependencies that needn't be imported just to show a subcommand's usage
+DEFERRED_MODULES = {"colorama", "jinja2", "pandas", "peppy"}
+
+# Budget for the total time spent importing modules for 'looper check --help'
+CHECK_HELP_IMPORT_BUDGET = 0.3
+
+
+class CliStartupTests:
+    """ Tests for what the command-line interface imports at startup """
+
+    @staticmethod
+    def test_status_flags_match_peppy():
+        """ The parser's run status flags are peppy's. """
+        assert looper.FLAGS == STATUS_FLAGS
+
+    @staticmethod
+    @pytest.mark.skipif(sys.version_info < (3, 5),
+                        reason="Deferred package attributes need Python 3.5")
+    def test_check_help_imports():
+        """ Usage is shown without importing heavy dependencies. """
+        code = "import sys; sys.argv = ['looper', 'check', '--help']\n" \
+               "from looper.looper import main\n" \
+               "try:\n    main()\nexcept SystemExit:\n    pass\n" \
+               "print(' '.join(sys.modules))"
+        proc = subprocess.Popen(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.dirname(looper.__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        assert 0 == proc.returncode, err.decode()
+        assert b"usage: looper check" in out
+        imported = {name.split(".")[0]
+                    for name in out.decode().splitlines()[-1].split()}
+        assert set() == imported & DEFERRED_MODULES
+
+    @staticmethod
+    @pytest.mark.skipif(
+        sys.version_info < (3, 7), reason="-X importtime and deferred "
+                                          "package attributes need Python 3.7")
+    def test_check_help_import_time():
+        """ Usage is shown without importing heavy dependencies. """
+        code = "import sys; sys.argv = ['looper', 'check', '--help']; " \
+               "from looper.looper import main; main()"
+        proc = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=os.path.dirname(os.path.dirname(looper.__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        assert 0 == proc.returncode, err.decode()
+        assert b"usage: looper check" in out
+        # Lines are "import time: self [us] | cumulative | imported package"
+        times = {}
+        for line in err.decode().splitlines():
+            fields = line.split(":", 1)[-1].split("|")
+            if line.startswith("import time:") and fields[0].strip().isdigit():
+                times[fields[2].strip()] = int(fields[0])
+        imported = {name.split(".")[0] for name in times}
+        assert set() == imported & DEFERRED_MODULES
+        total = sum(times.values()) / 1e6
+        assert total < CHECK_HELP_IMPORT_BUDGET, \
+            "Import time {:.3f}s exceeds budget of {:.3f}s".format(
+                total, CHECK_HELP_IMPORT_BUDGET)
@@ -0,0 +1,167 @@
+""" Tests for assignment of samples to lumped jobs by bin-packing """
+
+import os
+import random
+
+import pytest
+import yaml
+from looper.conductor import SubmissionConductor
+from looper.packing import first_fit_decreasing, longest_processing_time, \
+    pack
+from looper.pipeline_interface import PipelineInterface
+from looper.project import Project
+from peppy import Sample
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+# Input sizes of a project's samples, in sample table order
+SIZES = [1, 1, 1, 1, 8, 8, 8]
+
+
+@pytest.fixture(scope="function")
+def prj(tmpdir):
+    """ Provide a project whose samples have the input sizes given. """
+    folder = tmpdir.strpath
+    with open(os.path.join(folder, "samples.csv"), 'w') as f:
+        f.write("\n".join(["sample_name,protocol,size"] + [
+            "s{},ATAC,{}".format(i, size) for i, size in enumerate(SIZES)]) +
+                "\n")
+    open(os.path.join(folder, "atac.py"), 'w').close()
+    with open(os.path.join(folder, "piface.yaml"), 'w') as f:
+        yaml.dump({"protocol_mapping": {"ATAC": "atac.py"},
+                   "pipelines": {"atac.py": {"name": "ATAC",
+                                             "path": "atac.py"}}}, f)
+    with open(os.path.join(folder, "prj.yaml"), 'w') as f:
+        yaml.dump({"metadata": {
+            "sample_table": "samples.csv", "output_dir": folder,
+            "pipeline_interfaces": "piface.yaml"}}, f)
+    return Project(os.path.join(folder, "prj.yaml"))
+
+
+def _conduct(prj, monkeypatch, **kwargs):
+    """ Submit a project's samples, returning each job's total input size. """
+    # Input size is determined from a sample's files as it's added, so it's
+    # set from the sample's annotation instead.
+    set_attributes = Sample.set_pipeline_attributes
+
+    def set_size(sample, *args, **kwargs):
+        set_attributes(sample, *args, **kwargs)
+        sample.input_file_size = float(sample.size)
+    monkeypatch.setattr(Sample, "set_pipeline_attributes", set_size)
+
+    sizes = []
+    choose = PipelineInterface.choose_resource_package
+
+    def record(iface, pipeline_name, file_size):
+        sizes.append(file_size)
+        return choose(iface, pipeline_name, file_size)
+    monkeypatch.setattr(PipelineInterface, "choose_resource_package", record)
+    iface = prj.interfaces_by_protocol["ATAC"][0]
+    conductor = SubmissionConductor(
+        "atac.py", iface, "atac.py", prj, dry_run=True, **kwargs)
+    for s in prj.samples:
+        conductor.add_sample(s)
+    conductor.submit(force=True)
+    return sizes
+
+
+class _History(object):
+    """ Stand-in resource history whose runtime prediction is fixed. """
+
+    @staticmethod
+    def predict_runtime(pipeline, size, cores=None):
+        return 10 - size
+
+
+class PackingTests:
+    """ Tests for the bin-packing heuristics """
+
+    @staticmethod
+    def test_first_fit_decreasing():
+        """ Each item goes to the first bin with room, largest first. """
+        assert [[0, 4], [1, 3], [2]] == \
+            first_fit_decreasing([5, 4, 3, 2, 1], max_size=6)
+
+    @staticmethod
+    def test_oversized_item_alone():
+        """ An item larger than a bin's limit gets a bin of its own. """
+        assert [[0, 2], [1]] == first_fit_decreasing([2, 9, 3], max_size=5)
+
+    @staticmethod
+    def test_longest_processing_time():
+        """ Each item, heaviest first, goes to the least loaded bin. """
+        assert [[0, 3], [1, 2], [4]] == longest_processing_time(
+            [1, 3, 5, 7, 9], max_count=2)
+
+    @staticmethod
+    def test_size_limit_is_hard():
+        """ Loads are balanced only among bins with room for the item. """
+        assert [[0], [1], [2]] == longest_processing_time(
+            [6, 6, 6], max_size=10)
+        assert [[0, 2], [1]] == longest_processing_time(
+            [2, 5, 1], max_size=5.5, weights=[3, 1, 1])
+
+    @staticmethod
+    @pytest.mark.parametrize("heuristic",
+                             [first_fit_decreasing, longest_processing_time])
+    @pytest.mark.parametrize(["max_size", "max_count"],
+                             [(float("inf"), 3), (10.0, None), (10.0, 2)])
+    def test_each_item_once_within_count(heuristic, max_size, max_count):
+        """ Every item is in exactly one bin, within the count limit. """
+        rng = random.Random(max_count)
+        sizes = [rng.uniform(0, 6) for _ in range(40)]
+        bins = heuristic(sizes, max_size=max_size, max_count=max_count)
+        assert list(range(len(sizes))) == sorted(i for b in bins for i in b)
+        assert all(len(b) <= (max_count or len(sizes)) for b in bins)
+        assert all(sum(sizes[i] for i in b) <= max_size for b in bins)
+
+    @staticmethod
+    def test_weights():
+        """ Loads may be balanced by weights other than sizes. """
+        assert [[0, 3], [1, 2]] == longest_processing_time(
+            [1, 1, 1, 1], max_count=2, weights=[4, 3, 2, 1])
+
+    @staticmethod
+    def test_unknown_method():
+        """ Only known heuristics may be named. """
+        with pytest.raises(ValueError):
+            pack([], "best-fit")
+
+
+class PackedSubmissionTests:
+    """ Tests for submission of jobs of packed samples """
+
+    @staticmethod
+    @pytest.mark.parametrize(["kwargs", "expected"], [
+        ({"max_cmds": 3}, [3, 17, 8]),
+        ({"max_cmds": 3, "packing": "lpt"}, [10, 9, 9]),
+        ({"max_size": 10}, [12, 16]),
+        ({"max_size": 10, "packing": "ffd"}, [10, 10, 8])])
+    def test_resources_by_job_size(prj, monkeypatch, kwargs, expected):
+        """ Resources are chosen by each job's total size, once packed. """
+        assert expected == _conduct(prj, monkeypatch, **kwargs)
+
+    @staticmethod
+    def test_balanced_by_predicted_runtime(prj, monkeypatch):
+        """ Jobs are balanced by runtimes predicted from the history. """
+        sizes = _conduct(prj, monkeypatch, max_cmds=3, packing="lpt",
+                         resource_history=_History())
+        # Larger inputs are predicted to run faster, so balancing by runtime
+        # rather than size groups a different set of samples.
+        assert [2, 17, 9] == sizes[-3:]
+
+    @staticmethod
+    def test_single_command_jobs_unpacked(prj, monkeypatch):
+        """ Jobs of one command each are submitted as samples are added. """
+        assert SIZES == _conduct(prj, monkeypatch, packing="ffd")
+
+    @staticmethod
+    def test_unknown_method(prj):
+        """ A conductor requires a known packing heuristic. """
+        with pytest.raises(ValueError):
+            SubmissionConductor(
+                "atac.py", prj.interfaces_by_protocol["ATAC"][0], "atac.py",
+                prj, max_cmds=2, packing="best-fit")
@@ -0,0 +1,136 @@
+""" Tests for reuse of the Project built from a configuration file """
+
+import os
+
+import pytest
+import looper.project
+from looper.project_cache import ProjectCache, build_project
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+CONFIG_LINES = """metadata:
+  sample_annotation: samples.csv
+  output_dir: out
+  pipeline_interfaces: piface.yaml
+"""
+
+PIPELINE_INTERFACE_LINES = """protocol_mapping:
+  RNA: rna.py
+pipelines:
+  rna.py:
+    name: RNA
+    path: rna.py
+"""
+
+SAMPLE_LINES = ["sample_name,protocol", "s1,RNA", "s2,RNA"]
+
+
+def _write(folder, name, text):
+    path = os.path.join(folder, name)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+@pytest.fixture(scope="function")
+def config_file(tmpdir):
+    """ Provide a path to a project configuration file. """
+    folder = tmpdir.mkdir("project").strpath
+    _write(folder, "samples.csv", "\n".join(SAMPLE_LINES))
+    _write(folder, "piface.yaml", PIPELINE_INTERFACE_LINES)
+    return _write(folder, "project_config.yaml", CONFIG_LINES)
+
+
+@pytest.fixture(scope="function")
+def cache_folder(tmpdir):
+    """ Provide a folder in which to cache projects. """
+    return os.path.join(tmpdir.strpath, "cache")
+
+
+@pytest.fixture(scope="function")
+def no_construction(monkeypatch):
+    """ Provide a function that prevents Project construction. """
+    def prevent():
+        def fail(*args, **kwargs):
+            raise AssertionError("Project constructed")
+        monkeypatch.setattr(looper.project.Project, "__init__", fail)
+    return prevent
+
+
+class ProjectCacheTests:
+    """ Tests for reuse of a Project built from unchanged files """
+
+    @staticmethod
+    def test_warm_start(config_file, cache_folder, no_construction):
+        """ A Project built from unchanged files isn't constructed again. """
+        built = build_project(config_file, cache_folder=cache_folder)
+        no_construction()
+        cached = build_project(config_file, cache_folder=cache_folder)
+        assert built.config_file == cached.config_file
+        assert ["s1", "s2"] == [s.name for s in cached.samples]
+        assert all(s.prj is cached for s in cached.samples)
+        assert ["RNA"] == list(cached.interfaces_by_protocol.keys())
+        assert built.metadata.output_dir == cached.metadata.output_dir
+        assert os.path.isdir(cached.metadata.submission_subdir)
+
+    @staticmethod
+    @pytest.mark.parametrize(["filename", "text"], [
+        ("samples.csv", "\n".join(SAMPLE_LINES + ["s3,RNA"])),
+        ("piface.yaml", PIPELINE_INTERFACE_LINES.replace("RNA:", "ATAC:")),
+        ("project_config.yaml",
+         CONFIG_LINES.replace("dir: out", "dir: results"))])
+    def test_changed_input(config_file, cache_folder, filename, text):
+        """ A Project is built again once a file it's built from changes. """
+        build_project(config_file, cache_folder=cache_folder)
+        _write(os.path.dirname(config_file), filename, text)
+        prj = build_project(config_file, cache_folder=cache_folder)
+        fresh = looper.project.Project(config_file)
+        assert [s.name for s in fresh.samples] == \
+            [s.name for s in prj.samples]
+        assert list(fresh.interfaces_by_protocol.keys()) == \
+            list(prj.interfaces_by_protocol.keys())
+        assert fresh.metadata.output_dir == prj.metadata.output_dir
+
+    @staticmethod
+    def test_changed_environment(config_file, cache_folder, monkeypatch,
+                                 no_construction):
+        """ A Project's built again once a variable its files use changes. """
+        folder = os.path.dirname(config_file)
+        _write(folder, "project_config.yaml",
+               CONFIG_LINES.replace("dir: out", "dir: ${RESULTS_ROOT}/out"))
+        monkeypatch.setenv("RESULTS_ROOT", os.path.join(folder, "a"))
+        build_project(config_file, cache_folder=cache_folder)
+        monkeypatch.setenv("RESULTS_ROOT", os.path.join(folder, "b"))
+        prj = build_project(config_file, cache_folder=cache_folder)
+        assert os.path.join(folder, "b", "out") == prj.metadata.output_dir
+        no_construction()
+        assert os.path.join(folder, "b", "out") == build_project(
+            config_file, cache_folder=cache_folder).metadata.output_dir
+
+    @staticmethod
+    def test_cache_disabled(config_file, cache_folder):
+        """ Without use of the cache, nothing's cached. """
+        build_project(config_file, use_cache=False, cache_folder=cache_folder)
+        assert not os.path.exists(cache_folder)
+
+    @staticmethod
+    def test_arguments_distinguish_projects(config_file, cache_folder):
+        """ A Project's cached separately for each way it's constructed. """
+        paths = {ProjectCache(config_file, folder=cache_folder, **kwargs).path
+                 for kwargs in [{}, {"subproject": "sp"},
+                                {"file_checks": True}]}
+        assert 3 == len(paths)
+
+    @staticmethod
+    def test_unreadable_cache(config_file, cache_folder):
+        """ An unreadable cache file is disregarded, then replaced. """
+        cache = ProjectCache(config_file, folder=cache_folder)
+        os.makedirs(cache_folder)
+        _write(cache_folder, os.path.basename(cache.path), "not a pickle")
+        assert cache.load() is None
+        assert 2 == len(build_project(
+            config_file, cache_folder=cache_folder).samples)
+        assert cache.load() is not None
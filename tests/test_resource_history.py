@@ -0,0 +1,213 @@
+""" Tests for the record of pipelines' resource use """
+
+import os
+
+import pytest
+from looper import build_parser
+import looper.looper
+from looper.resource_history import ResourceHistory, parse_memory, \
+    parse_runtime
+from looper.sample_status import SampleStatusIndex
+from tests.test_conductor import _write_fake_submit
+from tests.test_submission_scripts import prj, PLIFACE_DATA
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+PIPELINE = "PEPATAC"
+
+# Input size (GB), runtime (seconds) and peak memory (GB) of past runs
+USAGE = [(1.0, 100, 1.0), (2.0, 200, 2.0), (3.0, 300, 3.0)]
+
+
+def _complete(folder, sample, runtime, memory, pipeline=PIPELINE):
+    """ Write a completed run's flag and log to a sample's folder. """
+    folder = os.path.join(folder, sample)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    open(os.path.join(folder, pipeline + "_completed.flag"), 'w').close()
+    with open(os.path.join(folder, pipeline + "_log.md"), 'w') as f:
+        f.write("* Total elapsed time:   {}\n* Peak memory used: {}\n".
+                format(runtime, memory))
+
+
+@pytest.fixture(scope="function")
+def history(tmpdir):
+    """ Provide a history of completed runs of a pipeline. """
+    results = tmpdir.mkdir("results").strpath
+    path = os.path.join(tmpdir.strpath, "history.sqlite")
+    h = ResourceHistory(path)
+    samples = [("s{}".format(i), size) for i, (size, _, _) in
+               enumerate(USAGE)]
+    h.record_submission(PIPELINE, samples, cores=2)
+    for (name, _), (_, runtime, memory) in zip(samples, USAGE):
+        _complete(results, name, "0:{:02d}:{:02d}".format(*divmod(runtime, 60)),
+                  "{} GB".format(memory))
+    assert len(USAGE) == h.update(SampleStatusIndex(results))
+    h.close()
+    return ResourceHistory(path)
+
+
+class ParseTests:
+    """ Tests for parsing resource use as pypiper logs it """
+
+    @staticmethod
+    @pytest.mark.parametrize(["text", "expected"], [
+        ("0:00:07", 7), ("1:10:10", 4210), ("12:00:00.5", 43200.5),
+        ("2 days, 0:01:02", 172862), ("1 day, 1:00:00", 90000),
+        ("", None), ("NA", None), (None, None)])
+    def test_runtime(text, expected):
+        """ Runtime is parsed to seconds. """
+        assert expected == parse_runtime(text)
+
+    @staticmethod
+    @pytest.mark.parametrize(["text", "expected"], [
+        ("1.5 GB", 1.5), ("2GB", 2.0), ("512 MB", 0.5), ("0.25", 0.25),
+        ("1 TiB", 1024.0), ("many", None), (None, None)])
+    def test_memory(text, expected):
+        """ Memory is parsed to GB. """
+        assert expected == parse_memory(text)
+
+
+class ResourceHistoryTests:
+    """ Tests for recording and predicting resource use """
+
+    @staticmethod
+    def test_predict(history):
+        """ Use is predicted from a line fit to past use, with headroom. """
+        assert {"mem": "5120", "time": "00:08:20"} == \
+            history.predict(PIPELINE, 4.0, cores=2)
+
+    @staticmethod
+    def test_predict_lump(history):
+        """ A lump's time is for its samples in turn; memory, its largest. """
+        assert {"mem": "5120", "time": "00:08:20"} == \
+            history.predict(PIPELINE, 4.0, count=2, cores=2)
+
+    @staticmethod
+    def test_long_time_in_hours(history):
+        """ A time past a day is given in hours, as each scheduler takes. """
+        assert "34:43:20" == history.predict(PIPELINE, 1000.0, cores=2)["time"]
+
+    @staticmethod
+    @pytest.mark.parametrize(["pipeline", "cores"], [
+        (PIPELINE, 4), (PIPELINE, None), ("WGBS", 2)])
+    def test_no_prediction_without_history(history, pipeline, cores):
+        """ Nothing's predicted without enough runs of the same kind. """
+        assert history.predict(pipeline, 1.0, cores=cores) is None
+
+    @staticmethod
+    def test_predict_runtime(history):
+        """ A sample's runtime is predicted by the fit line, as is. """
+        assert 400.0 == history.predict_runtime(PIPELINE, 4.0, cores=2)
+        assert history.predict_runtime(PIPELINE, 4.0, cores=4) is None
+
+    @staticmethod
+    def test_minimum_request(history):
+        """ A prediction is never less than the minimum request. """
+        assert {"mem": "256", "time": "00:01:00"} == \
+            history.predict(PIPELINE, 0.0, cores=2)
+
+    @staticmethod
+    def test_logs_read_once(tmpdir):
+        """ A log is read again only once it's changed. """
+        results = tmpdir.mkdir("results").strpath
+        h = ResourceHistory(os.path.join(tmpdir.strpath, "history.sqlite"))
+        h.record_submission(PIPELINE, [("a", 1.0), ("b", 1.0)])
+        _complete(results, "a", "0:01:00", "1 GB")
+        assert 1 == h.update(SampleStatusIndex(results))
+        assert 0 == h.update(SampleStatusIndex(results))
+        _complete(results, "b", "0:01:00", "1 GB")
+        os.utime(os.path.join(results, "a", PIPELINE + "_log.md"), (1, 1))
+        assert 2 == h.update(SampleStatusIndex(results))
+
+    @staticmethod
+    def test_resubmission_clears_use(tmpdir):
+        """ A sample's submission replaces what was known of its last run. """
+        results = tmpdir.mkdir("results").strpath
+        path = os.path.join(tmpdir.strpath, "history.sqlite")
+        h = ResourceHistory(path)
+        samples = [(str(i), 1.0) for i in range(3)]
+        h.record_submission(PIPELINE, samples)
+        for name, _ in samples:
+            _complete(results, name, "0:01:00", "1 GB")
+        h.update(SampleStatusIndex(results))
+        h.record_submission(PIPELINE, samples[:1])
+        h.close()
+        assert ResourceHistory(path).predict(PIPELINE, 1.0) is None
+
+
+class ProjectHistoryTests:
+    """ Tests for a project's resource history across commands """
+
+    @staticmethod
+    def _record(prj):
+        """ Record submission of each sample, then complete its run. """
+        history = ResourceHistory.for_project(prj)
+        for i, s in enumerate(prj.samples):
+            pipeline = PLIFACE_DATA["pipelines"][
+                PLIFACE_DATA["protocol_mapping"][s.protocol]]["name"]
+            history.record_submission(pipeline, [(s.name, i)], cores=1)
+            _complete(prj.metadata.results_subdir, s.name,
+                      "0:00:{:02d}".format(10 * (i + 1)), "{} GB".format(i),
+                      pipeline=pipeline)
+        history.close()
+
+    @staticmethod
+    def _counts(prj):
+        """ Number of observations of each pipeline's resource use. """
+        history = ResourceHistory.for_project(prj, create=False)
+        counts = {}
+        for (pipeline, _), observed in history._observations.items():
+            counts[pipeline] = len(observed)
+        return counts
+
+    @staticmethod
+    @pytest.mark.parametrize(["executor", "expected"], [
+        (looper.looper.Checker, {}),
+        (looper.looper.Summarizer, {"PEPATAC": 2, "WGBS": 2})])
+    def test_summary_fills_in_use(prj, executor, expected):
+        """ Summarizing a project records its completed runs' use. """
+        assert ResourceHistory.for_project(prj, create=False) is None
+        ProjectHistoryTests._record(prj)
+        executor(prj)()
+        assert expected == ProjectHistoryTests._counts(prj)
+
+    @staticmethod
+    @pytest.mark.parametrize(["options", "expected"], [
+        ([], {}), (["--predict-resources"], {"PEPATAC": 2, "WGBS": 2}),
+        (["--predict-resources", "--dry-run"], {})])
+    def test_prediction_fills_in_use(prj, options, expected):
+        """ A run that predicts resource use first records what's new. """
+        ProjectHistoryTests._record(prj)
+        args = build_parser().parse_args(
+            ["run"] + options + [prj.config_file])
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        looper.looper.Runner(prj)(args, [])
+        assert expected == ProjectHistoryTests._counts(prj)
+
+    @staticmethod
+    @pytest.mark.parametrize(["compute_variables", "expected_mem"],
+                             [(None, "5120"), ({"mem": "1"}, "1")])
+    def test_conductor_predicts(prj, compute_variables, expected_mem):
+        """ A conductor requests predicted resources, unless overridden. """
+        history = ResourceHistory.for_project(prj)
+        history.record_submission(
+            PIPELINE, [(str(s), s) for s, _, _ in USAGE], cores=1)
+        for size, runtime, memory in USAGE:
+            _complete(prj.metadata.results_subdir, str(size),
+                      "0:0{}:00".format(int(runtime / 100)),
+                      "{} GB".format(memory))
+        history.update(SampleStatusIndex(prj.metadata.results_subdir))
+        history.close()
+        history = ResourceHistory.for_project(prj)
+        conductors, _ = looper.looper.process_protocols(
+            prj, {"ATAC"}, compute_variables, resource_history=history,
+            predict_resources=True)
+        settings, _, _ = conductors["pepatac.py"].\
+            _get_settings_looptext_prjtext(4.0)
+        assert expected_mem == settings["mem"]
+        assert "00:05:00" == settings["time"]
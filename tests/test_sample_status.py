@@ -0,0 +1,138 @@
+""" Tests for the index of sample output folder contents """
+
+import os
+
+import pytest
+from peppy import FLAGS
+from looper.sample_status import SampleStatusIndex
+from looper.utils import fetch_flag_files, fetch_sample_flags
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+PIPELINES = ["pipeA", "pipeB"]
+SAMPLE_NAMES = ["sample{}".format(i) for i in range(4)]
+
+
+def _touch(*parts):
+    """ Create an empty file, with enclosing folder(s) as needed. """
+    path = os.path.join(*parts)
+    folder = os.path.dirname(path)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'w'):
+        pass
+    return path
+
+
+@pytest.fixture(scope="function")
+def results_folder(tmpdir):
+    """ Provide a results folder with a mix of sample output files. """
+    results = tmpdir.strpath
+    for i, name in enumerate(SAMPLE_NAMES):
+        os.makedirs(os.path.join(results, name))
+        pl = PIPELINES[i % len(PIPELINES)]
+        _touch(results, name, "{}_{}.flag".format(pl, FLAGS[i % len(FLAGS)]))
+        _touch(results, name, "{}_log.md".format(pl))
+        _touch(results, name, "{}_cleanup.sh".format(pl))
+        _touch(results, name, "unrelated.txt")
+    _touch(results, SAMPLE_NAMES[0], "stats.tsv")
+    _touch(results, SAMPLE_NAMES[0], "{}_completed.flag".format(PIPELINES[1]))
+    return results
+
+
+class SampleStatusIndexTests:
+    """ Tests for querying an index of sample folders """
+
+    @staticmethod
+    def test_indexes_every_sample_folder(results_folder):
+        """ Without restriction, each subfolder is indexed. """
+        index = SampleStatusIndex(results_folder)
+        assert SAMPLE_NAMES == index.sample_names
+        assert all(n in index for n in SAMPLE_NAMES)
+
+    @staticmethod
+    def test_restriction_to_named_samples(results_folder):
+        """ Only the named samples are indexed when names are given. """
+        index = SampleStatusIndex(results_folder, SAMPLE_NAMES[:2])
+        assert SAMPLE_NAMES[:2] == index.sample_names
+        assert SAMPLE_NAMES[2] not in index
+        assert [] == index.flag_files(SAMPLE_NAMES[2])
+
+    @staticmethod
+    def test_missing_results_folder(tmpdir):
+        """ A nonexistent results folder gives an empty index. """
+        index = SampleStatusIndex(os.path.join(tmpdir.strpath, "nothing"))
+        assert 0 == len(index)
+
+    @staticmethod
+    def test_untracked_files_are_ignored(results_folder):
+        """ Only status-relevant files are indexed. """
+        index = SampleStatusIndex(results_folder)
+        assert index.get_file(SAMPLE_NAMES[0], "unrelated.txt") is None
+        assert index.get_file(SAMPLE_NAMES[0], "stats.tsv") is not None
+        assert index.get_file(SAMPLE_NAMES[1], "stats.tsv") is None
+
+    @staticmethod
+    def test_indexed_file_metadata(results_folder):
+        """ Each indexed file carries its path, mtime, and size. """
+        index = SampleStatusIndex(results_folder)
+        f = index.get_file(SAMPLE_NAMES[0], "stats.tsv")
+        assert os.path.join(results_folder, SAMPLE_NAMES[0], "stats.tsv") == f.path
+        assert os.path.getmtime(f.path) == f.mtime
+        assert 0 == f.size
+
+    @staticmethod
+    @pytest.mark.parametrize("pl_names", [None, PIPELINES[0], PIPELINES])
+    def test_flag_files_match_listing(results_folder, pl_names):
+        """ Indexed flags for a sample agree with a listing of its folder. """
+        prj = _Project(results_folder)
+        index = SampleStatusIndex(results_folder)
+        for name in SAMPLE_NAMES:
+            sample = {"sample_name": name}
+            assert sorted(fetch_sample_flags(prj, sample, pl_names)) == \
+                index.flag_files(name, pl_names)
+
+    @staticmethod
+    def test_files_by_flag_match_glob(results_folder):
+        """ Flag files by flag agree with the globbing implementation. """
+        index = SampleStatusIndex(results_folder)
+        expected = fetch_flag_files(results_folder=results_folder)
+        observed = index.files_by_flag()
+        assert set(expected.keys()) <= set(FLAGS)
+        for flag in FLAGS:
+            assert sorted(expected[flag]) == sorted(observed[flag])
+
+    @staticmethod
+    def test_flag_names(results_folder):
+        """ Flag names are parsed from flag filenames. """
+        index = SampleStatusIndex(results_folder)
+        assert sorted([FLAGS[0], "completed"]) == \
+            sorted(index.flags(SAMPLE_NAMES[0]))
+
+    @staticmethod
+    def test_match_file(results_folder):
+        """ Files may be found by filename ending. """
+        index = SampleStatusIndex(results_folder)
+        assert "{}_log.md".format(PIPELINES[1]) == \
+            index.match_file(SAMPLE_NAMES[1], "_log.md")
+        assert index.match_file(SAMPLE_NAMES[1], "_profile.tsv") is None
+
+    @staticmethod
+    def test_refresh(results_folder):
+        """ A single sample's folder may be re-indexed. """
+        index = SampleStatusIndex(results_folder)
+        name = SAMPLE_NAMES[1]
+        assert index.get_file(name, "objects.tsv") is None
+        _touch(results_folder, name, "objects.tsv")
+        assert index.get_file(name, "objects.tsv") is None
+        index.refresh(name)
+        assert index.get_file(name, "objects.tsv") is not None
+
+
+class _Project(object):
+    """ Minimal stand-in for the project data used to find sample folders. """
+    def __init__(self, results_folder):
+        self.metadata = {"results_subdir": results_folder}
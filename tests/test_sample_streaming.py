@@ -0,0 +1,124 @@
+""" Tests for building and running samples a chunk at a time """
+
+import os
+
+import pytest
+import yaml
+from looper import build_parser
+from looper.looper import Runner
+from looper.project import Project, iter_samples
+from peppy import ProjectContext
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+PROTOCOLS = ["ATAC", "WGBS", "ATAC", "RNA", "WGBS", "ATAC", "ATAC"]
+NAMES = ["s{}".format(i) for i in range(len(PROTOCOLS))]
+# Each ATAC sample has a pair of files given in the subsample table.
+SUBSAMPLE_LINES = ["sample_name,subsample_name,file"] + \
+    ["{0},{1},{0}_{1}.txt".format(n, i) for n, p in zip(NAMES, PROTOCOLS)
+     if p == "ATAC" for i in range(2)]
+PIPELINE_INTERFACE_DATA = {
+    "protocol_mapping": {"ATAC": "atac.py", "WGBS": "wgbs.py"},
+    "pipelines": {
+        "atac.py": {"name": "ATAC", "path": "atac.py",
+                    "arguments": {"--input": "file"}},
+        "wgbs.py": {"name": "WGBS", "path": "wgbs.py"}}}
+
+
+def _write_project(folder):
+    """ Write a project's files, returning the path to its config file. """
+    def write(name, lines):
+        with open(os.path.join(folder, name), 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    write("samples.csv", ["sample_name,protocol"] +
+          ["{},{}".format(n, p) for n, p in zip(NAMES, PROTOCOLS)])
+    write("subsamples.csv", SUBSAMPLE_LINES)
+    for pipeline in PIPELINE_INTERFACE_DATA["pipelines"]:
+        write(pipeline, ["#!/usr/bin/env python"])
+    with open(os.path.join(folder, "piface.yaml"), 'w') as f:
+        yaml.dump(PIPELINE_INTERFACE_DATA, f)
+    with open(os.path.join(folder, "prj.yaml"), 'w') as f:
+        yaml.dump({"metadata": {
+            "sample_table": "samples.csv", "subsample_table": "subsamples.csv",
+            "output_dir": "out", "pipeline_interfaces": "piface.yaml"}}, f)
+    return os.path.join(folder, "prj.yaml")
+
+
+@pytest.fixture(scope="function")
+def config_file(tmpdir):
+    """ Provide a path to a project configuration file. """
+    return _write_project(tmpdir.strpath)
+
+
+def _data(samples):
+    return [(s.name, s.protocol, getattr(s, "file", None)) for s in samples]
+
+
+class SampleChunkTests:
+    """ Tests for building a project's samples a chunk at a time """
+
+    @staticmethod
+    @pytest.mark.parametrize("chunk_size", [1, 3, len(NAMES), 100])
+    def test_chunks_match_samples(config_file, chunk_size):
+        """ Chunked samples match those built at once, and aren't kept. """
+        prj = Project(config_file, defer_sample_construction=True)
+        chunks = list(prj.iter_sample_chunks(chunk_size))
+        assert all(0 < len(c) <= chunk_size for c in chunks)
+        assert _data(Project(config_file).samples) == \
+            _data(s for c in chunks for s in c)
+        assert not prj.get("_samples")
+        assert len(NAMES) == len(prj.sample_table)
+
+    @staticmethod
+    def test_chunk_size_must_be_positive(config_file):
+        """ A chunk needs at least one sample. """
+        prj = Project(config_file, defer_sample_construction=True)
+        with pytest.raises(ValueError):
+            list(prj.iter_sample_chunks(0))
+
+    @staticmethod
+    @pytest.mark.parametrize("selection", [
+        {"selector_include": ["ATAC"]}, {"selector_exclude": ["ATAC"]},
+        {"selector_include": "RNA"}, {"selector_exclude": "CHIP"}])
+    def test_selection(config_file, selection):
+        """ A project context selects among chunked samples as a whole. """
+        context = ProjectContext(
+            Project(config_file, defer_sample_construction=True),
+            selector_attribute="protocol", **selection)
+        expected = ProjectContext(Project(config_file),
+                                  selector_attribute="protocol", **selection)
+        assert _data(expected.samples) == _data(iter_samples(context, 2))
+
+
+class StreamingRunTests:
+    """ Tests for a run of samples that are built as they're processed """
+
+    @staticmethod
+    @pytest.mark.parametrize("options", [[], ["--lumpn", "2"], ["--limit", "4"]])
+    def test_same_as_unstreamed(tmpdir, options):
+        """ A streamed run writes the same files as one that isn't. """
+        def run(name, stream_options, **kwargs):
+            folder = tmpdir.mkdir(name).strpath
+            args = build_parser().parse_args(
+                ["run", "--dry-run"] + options + stream_options +
+                [_write_project(folder)])
+            prj = Project(args.config_file, **kwargs)
+            for n in NAMES[:3]:
+                os.makedirs(os.path.join(prj.metadata.results_subdir, n))
+                open(os.path.join(prj.metadata.results_subdir, n,
+                                  "ATAC_completed.flag"), 'w').close()
+            Runner(prj)(args, [])
+            submission = prj.metadata.submission_subdir
+            contents = {}
+            for f in os.listdir(submission):
+                with open(os.path.join(submission, f), 'r') as fh:
+                    contents[f] = fh.read().replace(folder, "")
+            return contents
+
+        unstreamed = run("unstreamed", [])
+        streamed = run("streamed", ["--stream", "--chunk-size", "2"],
+                       defer_sample_construction=True)
+        assert unstreamed and unstreamed == streamed
@@ -0,0 +1,172 @@
+""" Tests for bulk writing of sample YAML files """
+
+import os
+
+import peppy
+import pytest
+import yaml
+from looper.sample_writer import PEPPY_YAML_VERSION, PROJECT_FILE_KEY, \
+    SampleWriter, sample_yaml_text
+from peppy import Sample
+from peppy.sample import PRJ_REF
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+class RNASample(Sample):
+    """ Sample subtype, to be written to a file of its own. """
+    pass
+
+
+def _sample(name, subtype=Sample, **data):
+    data.setdefault("protocol", "RNA")
+    data.setdefault("genome", "hg38")
+    data["sample_name"] = name
+    s = subtype(data)
+    _set_project(s, "data_source")
+    return s
+
+
+class Project(object):
+    """ Stand-in for a sample's project, which is part of its representation. """
+    def __init__(self, derived):
+        self.derived_attributes = [derived]
+
+
+def _set_project(sample, derived):
+    sample.prj = Project(derived)
+
+
+def _files(folder):
+    return sorted(os.listdir(folder))
+
+
+@pytest.fixture(scope="function")
+def subs_folder(tmpdir):
+    """ Provide a submission folder. """
+    return tmpdir.mkdir("submission").strpath
+
+
+class SampleYamlTextTests:
+    """ Tests for the YAML representation of a sample """
+
+    @staticmethod
+    @pytest.mark.parametrize("subtype", [Sample, RNASample])
+    def test_matches_peppy(subs_folder, tmpdir, subtype):
+        """ Text is what peppy writes, including the sample's file path. """
+        sample = _sample("s1", subtype=subtype, read1=None, reads=[1, 2])
+        sample.to_yaml(subs_folder_path=subs_folder)
+        with open(sample.yaml_file, 'r') as f:
+            expected = f.read()
+        assert "- data_source" in expected
+        path = os.path.join(subs_folder, sample.generate_filename())
+        assert expected == sample_yaml_text(sample, path), \
+            "Sample YAML differs from that of peppy {}; serialization " \
+            "mirrors peppy {}'s Sample.to_yaml".format(
+                peppy.__version__, PEPPY_YAML_VERSION)
+        assert path == sample.yaml_file
+
+
+class SampleWriterTests:
+    """ Tests for writing of sample files """
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_files(subs_folder, workers):
+        """ Each sample and subtype has its own file, written atomically. """
+        writer = SampleWriter(subs_folder, workers=workers)
+        samples = [_sample("s{}".format(i), subtype=t)
+                   for i in range(5) for t in [Sample, RNASample]]
+        paths = [writer.write(s) for s in samples]
+        writer.close()
+        assert sorted(os.path.basename(p) for p in paths) == _files(subs_folder)
+        for s, p in zip(samples, paths):
+            with open(p, 'r') as f:
+                assert sample_yaml_text(s, p) == f.read()
+        assert (len(samples), 0) == (writer.num_written, writer.num_unchanged)
+
+    @staticmethod
+    def test_unchanged_content_is_not_rewritten(subs_folder):
+        """ A file whose content would be the same is left as it is. """
+        sample = _sample("s1")
+        path = SampleWriter(subs_folder).write(sample)
+        os.utime(path, (1, 1))
+        writer = SampleWriter(subs_folder)
+        writer.write(sample)
+        writer.write(sample)
+        assert 1 == os.path.getmtime(path)
+        assert (0, 2) == (writer.num_written, writer.num_unchanged)
+        _set_project(sample, "read1")
+        writer.write(sample)
+        assert 1 != os.path.getmtime(path)
+        assert 1 == writer.num_written
+
+    @staticmethod
+    def test_file_modes(subs_folder):
+        """ A new file's mode follows the umask; a replaced file keeps its. """
+        umask = os.umask(0o027)
+        try:
+            writer = SampleWriter(subs_folder, workers=2)
+            sample = _sample("s1")
+            path = writer.write(sample)
+            writer.wait([path])
+            assert 0o640 == os.stat(path).st_mode & 0o777
+            os.chmod(path, 0o664)
+            _set_project(sample, "read1")
+            writer.write(sample)
+            prj_path = writer.write_project(Project("data_source"))
+            writer.close()
+            assert 3 == writer.num_written
+            assert 0o664 == os.stat(path).st_mode & 0o777
+            assert 0o640 == os.stat(prj_path).st_mode & 0o777
+        finally:
+            os.umask(umask)
+
+    @staticmethod
+    def test_last_write_wins(subs_folder):
+        """ Of writes to a file queued together, the last one's kept. """
+        writer = SampleWriter(subs_folder, workers=4)
+        sample = _sample("s1")
+        for i in range(20):
+            _set_project(sample, "attr{}".format(i))
+            path = writer.write(sample)
+        writer.wait([path])
+        with open(path, 'r') as f:
+            assert "- attr19" in f.read()
+        writer.close()
+        assert ["s1.yaml"] == _files(subs_folder)
+
+    @staticmethod
+    def test_has_written(subs_folder):
+        """ A writer knows which files it has handled. """
+        writer = SampleWriter(subs_folder)
+        path = writer.write(_sample("s1"))
+        assert writer.has_written(path)
+        assert not writer.has_written(os.path.join(subs_folder, "s2.yaml"))
+
+    @staticmethod
+    def test_failed_write_is_raised(tmpdir):
+        """ An error writing a file surfaces when its write is awaited. """
+        writer = SampleWriter(os.path.join(tmpdir.strpath, "missing"), workers=2)
+        writer.write(_sample("s1"))
+        with pytest.raises(OSError):
+            writer.close()
+
+    @staticmethod
+    def test_shared_project_file(subs_folder):
+        """ Samples may reference a file of project data, not embed it. """
+        sample = _sample("s1")
+        embedded = yaml.safe_load(sample_yaml_text(
+            sample, os.path.join(subs_folder, "s1.yaml")))
+        writer = SampleWriter(subs_folder, workers=2)
+        prj_path = writer.write_project(sample.prj)
+        path = writer.write(sample)
+        writer.close()
+        with open(prj_path, 'r') as f:
+            assert embedded.pop(PRJ_REF) == yaml.safe_load(f)
+        with open(path, 'r') as f:
+            written = yaml.safe_load(f)
+        assert prj_path == written.pop(PROJECT_FILE_KEY)
+        assert embedded == written
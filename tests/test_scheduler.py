@@ -0,0 +1,186 @@
+""" Tests for queries of a cluster scheduler for the state of jobs """
+
+import os
+import stat
+
+import pytest
+from looper.exceptions import SchedulerQueryException
+from looper.looper import Checker
+from looper.sample_status import SampleStatusIndex
+from looper.scheduler import LOST_STATE, job_states_by_sample, \
+    query_job_states, query_jobs
+from tests.test_submission_scripts import prj
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+QUERIES_LOG_FILENAME = "queries.log"
+
+SQUEUE_OUTPUT = """102 PENDING pepatac.py_sample2
+100 RUNNING wgbs.py_sample0
+103 RUNNING pepatac.py_sample3
+103 PENDING pepatac.py_sample3
+104 PENDING other job
+"""
+
+QSTAT_OUTPUT = """<?xml version='1.0'?>
+<job_info>
+  <queue_info>
+    <job_list state="running">
+      <JB_job_number>100</JB_job_number>
+      <JB_name>wgbs.py_sample0</JB_name>
+      <state>r</state>
+    </job_list>
+  </queue_info>
+  <job_info>
+    <job_list state="pending">
+      <JB_job_number>12</JB_job_number>
+      <JB_name>pepatac.py_sample2</JB_name>
+      <state>qw</state>
+    </job_list>
+    <job_list state="pending">
+      <JB_job_number>13</JB_job_number>
+      <JB_name>pepatac.py_sample3</JB_name>
+      <state>Eqw</state>
+    </job_list>
+  </job_info>
+</job_info>
+"""
+
+
+@pytest.fixture(scope="function")
+def fake_scheduler(tmpdir, monkeypatch):
+    """ Provide a function that puts a fake query command on the PATH. """
+    folder = tmpdir.mkdir("bin").strpath
+    monkeypatch.setenv("PATH", folder + os.pathsep + os.environ["PATH"])
+
+    def write(name, output, code=0):
+        output_file = os.path.join(folder, name + ".out")
+        with open(output_file, 'w') as f:
+            f.write(output)
+        path = os.path.join(folder, name)
+        with open(path, 'w') as f:
+            f.write("\n".join([
+                "#!/bin/sh",
+                'echo "$*" >> {}'.format(
+                    os.path.join(folder, QUERIES_LOG_FILENAME)),
+                "cat {}".format(output_file), "exit {}".format(code)]) + "\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return folder
+    return write
+
+
+def _queries(folder):
+    """ Read the arguments of each fake query made. """
+    with open(os.path.join(folder, QUERIES_LOG_FILENAME), 'r') as f:
+        return f.read().splitlines()
+
+
+def _flag(prj, sample, flag, pipeline="PEPATAC"):
+    """ Flag a sample's run of a pipeline. """
+    path = os.path.join(prj.metadata.results_subdir, sample,
+                        "{}_{}.flag".format(pipeline, flag))
+    open(path, 'w').close()
+
+
+class QueryJobStatesTests:
+    """ Tests for querying a scheduler for its jobs' states """
+
+    @staticmethod
+    def test_squeue(fake_scheduler):
+        """ SLURM's job states are read from a single squeue query. """
+        folder = fake_scheduler("squeue", SQUEUE_OUTPUT)
+        assert {"pepatac.py_sample2": "queued",
+                "wgbs.py_sample0": "running",
+                "pepatac.py_sample3": "running",
+                "other job": "queued"} == \
+            query_job_states("sbatch --partition=x", user="me")
+        assert ["--noheader --user=me --format=%A %T %j"] == _queries(folder)
+
+    @staticmethod
+    @pytest.mark.parametrize(["name", "output", "command"], [
+        ("squeue", SQUEUE_OUTPUT, "sbatch"), ("qstat", QSTAT_OUTPUT, "qsub")])
+    def test_job_ids(fake_scheduler, name, output, command):
+        """ Each job's ID is read along with its name and state. """
+        fake_scheduler(name, output)
+        jobs = query_jobs(command)
+        assert ("100", "wgbs.py_sample0", "running") == \
+            tuple(next(j for j in jobs if j.job_id == "100"))
+
+    @staticmethod
+    def test_qstat(fake_scheduler):
+        """ SGE's job states are read from qstat's XML. """
+        folder = fake_scheduler("qstat", QSTAT_OUTPUT)
+        assert {"wgbs.py_sample0": "running",
+                "pepatac.py_sample2": "queued",
+                "pepatac.py_sample3": "error"} == \
+            query_job_states("/opt/sge/bin/qsub", user="me")
+        assert ["-xml -u me"] == _queries(folder)
+
+    @staticmethod
+    @pytest.mark.parametrize(["name", "output", "code"], [
+        ("squeue", "", 1), ("qstat", "<job_info>", 0)])
+    def test_failed_query(fake_scheduler, name, output, code):
+        """ A query that fails, or whose output can't be read, is an error. """
+        fake_scheduler(name, output, code)
+        with pytest.raises(SchedulerQueryException):
+            query_job_states({"squeue": "sbatch", "qstat": "qsub"}[name])
+
+    @staticmethod
+    @pytest.mark.parametrize("command", ["sh", "", None])
+    def test_unknown_scheduler(command):
+        """ There's nothing to query for a scheduler that isn't known. """
+        assert query_job_states(command) is None
+
+
+class JobStatesBySampleTests:
+    """ Tests for joining scheduler's jobs with a project's samples """
+
+    @staticmethod
+    def test_jobs_matched_by_name(prj):
+        """ Each sample's job is found by the name it was submitted with. """
+        _flag(prj, "sample1", "running", pipeline="WGBS")
+        _flag(prj, "sample3", "running")
+        job_states = {"pepatac.py_sample2": "queued",
+                      "pepatac.py_sample3": "running",
+                      "other_job": "queued"}
+        assert {"queued": [("sample2", "PEPATAC")],
+                "running": [("sample3", "PEPATAC")],
+                LOST_STATE: [("sample1", "WGBS")]} == \
+            job_states_by_sample(prj, job_states,
+                                 SampleStatusIndex.from_project(prj))
+
+    @staticmethod
+    def test_lump_jobs_keep_samples_from_lost(prj):
+        """ A sample may be running in a pipeline's lump job. """
+        _flag(prj, "sample1", "running", pipeline="WGBS")
+        _flag(prj, "sample2", "running")
+        assert {LOST_STATE: [("sample2", "PEPATAC")]} == job_states_by_sample(
+            prj, {"wgbs.py_lump1": "running"},
+            SampleStatusIndex.from_project(prj))
+
+
+class SchedulerCheckTests:
+    """ Tests for checking a project's status with its scheduler """
+
+    @staticmethod
+    def test_check_queries_once(prj, fake_scheduler):
+        """ A check makes a single query, however many samples. """
+        folder = fake_scheduler("squeue", SQUEUE_OUTPUT)
+        prj.dcc.compute.submission_command = "sbatch"
+        _flag(prj, "sample1", "running", pipeline="WGBS")
+        states = Checker(prj)(scheduler=True)
+        assert 1 == len(_queries(folder))
+        assert {"queued": [("sample2", "PEPATAC")],
+                "running": [("sample0", "WGBS"), ("sample3", "PEPATAC")],
+                LOST_STATE: [("sample1", "WGBS")]} == states
+
+    @staticmethod
+    @pytest.mark.parametrize("command", ["sh", "sbatch"])
+    def test_check_without_scheduler(prj, fake_scheduler, command):
+        """ Flags are still checked if the scheduler can't be queried. """
+        fake_scheduler("squeue", "", 1)
+        prj.dcc.compute.submission_command = command
+        assert Checker(prj)(scheduler=True) is None
@@ -0,0 +1,170 @@
+""" Tests for reuse of Sample subtypes resolved from pipeline modules """
+
+import copy
+import os
+import sys
+
+import pytest
+from looper import build_parser
+from looper.looper import Runner, get_file_for_project
+from looper.pipeline_interface import SUBTYPE_CACHE, _import_sample_subtype, \
+    _load_sample_subtype
+from looper.project import Project
+from looper.subtype_cache import SubtypeCache
+from peppy import Sample
+from tests.test_conductor import _write_fake_submit
+from tests.test_sample_streaming import _write_project
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+# Each import of a pipeline module appends a line to a file beside it.
+PIPELINE_TEMPLATE = """
+import os
+with open(os.path.join(os.path.dirname(__file__), "imports.txt"), 'a') as f:
+    f.write("imported\\n")
+from peppy import Sample
+{}
+"""
+
+EXTERNAL_MODULE = "ext_subtypes"
+
+
+def _write_pipeline(folder, body="", name="pipe.py"):
+    path = os.path.join(folder, name)
+    with open(path, 'w') as f:
+        f.write(PIPELINE_TEMPLATE.format(body))
+    return path
+
+
+def _num_imports(folder):
+    try:
+        with open(os.path.join(folder, "imports.txt"), 'r') as f:
+            return len(f.readlines())
+    except IOError:
+        return 0
+
+
+@pytest.fixture(scope="function")
+def folder_on_path(request, tmpdir):
+    """ Provide a temporary folder from which modules may be imported. """
+    path_copy = copy.copy(sys.path)
+    sys.path.append(tmpdir.strpath)
+
+    def restore():
+        sys.path = path_copy
+        sys.modules.pop(EXTERNAL_MODULE, None)
+    request.addfinalizer(restore)
+    return tmpdir.strpath
+
+
+@pytest.fixture(scope="function")
+def cache_path(tmpdir):
+    """ Provide a path for a subtype cache file. """
+    return os.path.join(tmpdir.strpath, "subtype_cache.json")
+
+
+def _fetch(cache, path, subtype_name=None):
+    return cache.fetch(path, subtype_name, _load_sample_subtype)
+
+
+class SubtypeCacheTests:
+    """ Tests for reuse of Sample subtypes resolved from pipeline modules """
+
+    @staticmethod
+    def test_module_imported_once(tmpdir):
+        """ A pipeline module's imported once per subtype requested. """
+        path = _write_pipeline(
+            tmpdir.strpath, "class RNASample(Sample):\n    pass\n")
+        first = _import_sample_subtype(path)
+        assert "RNASample" == first.__name__
+        assert first is _import_sample_subtype(path)
+        named = _import_sample_subtype(path, "RNASample")
+        assert named is _import_sample_subtype(path, "RNASample")
+        assert 2 == _num_imports(tmpdir.strpath)
+        SUBTYPE_CACHE.clear()
+        assert first is not _import_sample_subtype(path)
+
+    @staticmethod
+    def test_changed_module_is_imported_again(tmpdir):
+        """ A resolution is reused only while the module file's unchanged. """
+        path = _write_pipeline(tmpdir.strpath)
+        cache = SubtypeCache()
+        assert Sample is _fetch(cache, path)
+        os.utime(path, (1, 1))
+        assert Sample is _fetch(cache, path)
+        assert 2 == _num_imports(tmpdir.strpath) == cache.num_imports
+
+    @staticmethod
+    def test_unmatched_request_is_not_cached(tmpdir):
+        """ A request for a subtype the module lacks fails each time. """
+        path = _write_pipeline(tmpdir.strpath)
+        cache = SubtypeCache()
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                _fetch(cache, path, "Missing")
+        assert 2 == _num_imports(tmpdir.strpath)
+
+    @staticmethod
+    def test_base_type_needs_no_import(tmpdir, cache_path):
+        """ A pipeline last found to use base Sample isn't imported again. """
+        path = _write_pipeline(tmpdir.strpath)
+        cache = SubtypeCache(cache_path)
+        assert Sample is _fetch(cache, path)
+        cache.save()
+        cache = SubtypeCache(cache_path)
+        assert Sample is _fetch(cache, path)
+        assert 1 == _num_imports(tmpdir.strpath)
+        assert 0 == cache.num_imports
+
+    @staticmethod
+    def test_external_subtype(folder_on_path, cache_path):
+        """ A subtype in a module of its own is imported from that module. """
+        with open(os.path.join(folder_on_path, EXTERNAL_MODULE + ".py"), 'w') as f:
+            f.write("from peppy import Sample\n"
+                    "class ChIPSample(Sample):\n    pass\n")
+        path = _write_pipeline(
+            folder_on_path, "from {} import ChIPSample\n".format(EXTERNAL_MODULE))
+        cache = SubtypeCache(cache_path)
+        subtype = _fetch(cache, path)
+        cache.save()
+        cache = SubtypeCache(cache_path)
+        assert subtype is _fetch(cache, path)
+        assert 1 == _num_imports(folder_on_path)
+        # The pipeline's imported again once the subtype's module changes.
+        os.utime(os.path.join(folder_on_path, EXTERNAL_MODULE + ".py"), (1, 1))
+        assert "ChIPSample" == SubtypeCache(cache_path).fetch(
+            path, None, _load_sample_subtype).__name__
+        assert 2 == _num_imports(folder_on_path)
+
+    @staticmethod
+    @pytest.mark.parametrize("reset", [False, True])
+    def test_internal_subtype_and_reset(tmpdir, cache_path, reset):
+        """ A subtype defined by the pipeline requires its import. """
+        internal = _write_pipeline(
+            tmpdir.strpath, "class RNASample(Sample):\n    pass\n")
+        base = _write_pipeline(tmpdir.strpath, name="base.py")
+        cache = SubtypeCache(cache_path)
+        _fetch(cache, internal)
+        _fetch(cache, base)
+        cache.save()
+        cache = SubtypeCache(cache_path, reset=reset)
+        assert "RNASample" == _fetch(cache, internal).__name__
+        assert Sample is _fetch(cache, base)
+        assert (2 if reset else 1) == cache.num_imports
+
+    @staticmethod
+    @pytest.mark.parametrize("dry_run", [False, True])
+    def test_saved_unless_dry_run(tmpdir, dry_run):
+        """ A run saves the project's cache, but a dry run doesn't. """
+        folder = tmpdir.strpath
+        args = build_parser().parse_args(
+            ["run"] + (["--dry-run"] if dry_run else []) +
+            [_write_project(folder)])
+        prj = Project(args.config_file)
+        prj.dcc.compute.submission_command = _write_fake_submit(folder)
+        Runner(prj)(args, [])
+        assert dry_run != os.path.isfile(
+            get_file_for_project(prj, "subtype_cache.json"))
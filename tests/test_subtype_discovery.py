@@ -0,0 +1,228 @@
+""" Tests for finding Sample subtypes without executing pipeline modules """
+
+import copy
+import os
+import sys
+import time
+import types
+
+import pytest
+from looper.exceptions import PipelineInterfaceConfigError
+from looper.pipeline_interface import PipelineInterface, \
+    STATIC_DISCOVERY, SUBTYPE_DISCOVERY_KEY, _find_sample_subtype, \
+    _import_sample_subtype
+from looper.subtype_discovery import find_sample_subtypes
+from peppy import Sample
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+# Executing a pipeline module leaves a mark beside it, and then exits.
+PIPELINE_TEMPLATE = """
+import os
+import sys
+from peppy import Sample
+{}
+with open(os.path.join(os.path.dirname(__file__), "executed.txt"), 'a') as f:
+    f.write("executed\\n")
+{}
+"""
+
+SUBTYPE_MODULE = "disc_subtypes"
+SUBTYPE_PACKAGE = "disc_pkg"
+
+
+def _write(folder, name, text):
+    path = os.path.join(folder, name)
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def _write_pipeline(folder, body="", tail="", name="pipe.py"):
+    return _write(folder, name, PIPELINE_TEMPLATE.format(body, tail))
+
+
+def _executed(folder):
+    return os.path.isfile(os.path.join(folder, "executed.txt"))
+
+
+@pytest.fixture(scope="function")
+def module_folder(request, tmpdir):
+    """ Provide a temporary folder, off the search path, for modules. """
+    assert tmpdir.strpath not in sys.path
+
+    def restore():
+        for name in list(sys.modules):
+            if name.split(".")[0] in [SUBTYPE_MODULE, SUBTYPE_PACKAGE]:
+                del sys.modules[name]
+    request.addfinalizer(restore)
+    return tmpdir.strpath
+
+
+class FindSampleSubtypesTests:
+    """ Tests for parsing of the subtypes bound by a pipeline module """
+
+    @staticmethod
+    def test_classes_in_module(tmpdir):
+        """ Subtypes derive from Sample, directly or not, by any name. """
+        path = _write_pipeline(tmpdir.strpath, "\n".join([
+            "import peppy",
+            "from peppy import Sample as Base",
+            "class Other(object): pass",
+            "class A(Sample): pass",
+            "class B(A): pass",
+            "class C(Base): pass",
+            "class D(Other, peppy.Sample): pass",
+            "class E(Other): pass",
+            "def F(): pass"]))
+        subtypes = find_sample_subtypes(path)
+        assert ["A", "B", "C", "D"] == list(subtypes.keys())
+        assert all(d.module is None and d.path == path and d.name == n
+                   for n, d in subtypes.items())
+
+    @staticmethod
+    def test_imported_classes(tmpdir):
+        """ Imported names are resolved to the modules that define them. """
+        folder = tmpdir.strpath
+        _write(folder, SUBTYPE_MODULE + ".py",
+               "from peppy import Sample\nclass Chip(Sample): pass\n"
+               "class Helper(object): pass\n")
+        _write(folder, os.path.join(SUBTYPE_PACKAGE, "__init__.py"),
+               "from .models import *\n")
+        models = _write(
+            folder, os.path.join(SUBTYPE_PACKAGE, "models.py"),
+            "from {} import Chip\nclass Atac(Chip): pass\n"
+            "class _Hidden(Chip): pass\n".format(SUBTYPE_MODULE))
+        path = _write_pipeline(folder, "\n".join([
+            "try:",
+            "    from {} import Chip as Renamed, Helper".format(
+                SUBTYPE_MODULE),
+            "except ImportError:",
+            "    pass",
+            "from {} import *".format(SUBTYPE_PACKAGE)]))
+        subtypes = find_sample_subtypes(path, search_path=[])
+        assert ["Renamed", "Chip", "Atac"] == list(subtypes.keys())
+        assert (SUBTYPE_MODULE, "Chip") == \
+            (subtypes["Renamed"].module, subtypes["Renamed"].name)
+        assert subtypes["Renamed"] == subtypes["Chip"]
+        assert (SUBTYPE_PACKAGE + ".models", models, "Atac") == \
+            (subtypes["Atac"].module, subtypes["Atac"].path,
+             subtypes["Atac"].name)
+
+    @staticmethod
+    def test_unparsable_module(tmpdir):
+        """ A pipeline that isn't valid Python can't be searched. """
+        path = _write(tmpdir.strpath, "pipe.py", "class A(Sample)\n")
+        with pytest.raises(SyntaxError):
+            find_sample_subtypes(path)
+
+
+class StaticDiscoveryTests:
+    """ Tests for use of a subtype found without executing the pipeline """
+
+    @staticmethod
+    @pytest.mark.parametrize("subtype_name", [None, "Chip"])
+    def test_pipeline_not_executed(module_folder, subtype_name):
+        """ A subtype defined elsewhere is imported from its own module. """
+        _write(module_folder, SUBTYPE_MODULE + ".py",
+               "from peppy import Sample\nclass Chip(Sample): pass\n")
+        path = _write_pipeline(
+            module_folder, "from {} import Chip".format(SUBTYPE_MODULE),
+            tail="sys.exit(1)")
+        path_copy = copy.copy(sys.path)
+        subtype = _find_sample_subtype(path, subtype_name)
+        assert sys.modules[SUBTYPE_MODULE].Chip is subtype
+        assert not _executed(module_folder)
+        assert path_copy == sys.path
+
+    @staticmethod
+    def test_packaged_subtype_not_executed(module_folder):
+        """ A subtype from a package beside the pipeline is imported too. """
+        _write(module_folder, SUBTYPE_MODULE + ".py",
+               "from peppy import Sample\nclass Chip(Sample): pass\n")
+        _write(module_folder, os.path.join(SUBTYPE_PACKAGE, "__init__.py"),
+               "from .models import *\n")
+        _write(module_folder, os.path.join(SUBTYPE_PACKAGE, "models.py"),
+               "from {} import Chip\nclass Atac(Chip): pass\n".format(
+                   SUBTYPE_MODULE))
+        path = _write_pipeline(
+            module_folder, "from {}.models import Atac".format(SUBTYPE_PACKAGE),
+            tail="sys.exit(1)")
+        subtype = _find_sample_subtype(path)
+        assert sys.modules[SUBTYPE_PACKAGE + ".models"].Atac is subtype
+        assert not _executed(module_folder)
+
+    @staticmethod
+    def test_other_module_of_same_name(module_folder):
+        """ A subtype isn't taken from another module by the same name. """
+        other = types.ModuleType(SUBTYPE_MODULE)
+        other.__file__ = os.path.join(os.path.dirname(module_folder),
+                                      SUBTYPE_MODULE + ".py")
+        other.Chip = type("Chip", (Sample, ), {})
+        sys.modules[SUBTYPE_MODULE] = other
+        _write(module_folder, SUBTYPE_MODULE + ".py",
+               "from peppy import Sample\nclass Chip(Sample): pass\n")
+        path = _write_pipeline(
+            module_folder, "from {} import Chip".format(SUBTYPE_MODULE))
+        assert "Chip" == _find_sample_subtype(path).__name__
+        assert _executed(module_folder)
+
+    @staticmethod
+    def test_no_subtypes(tmpdir):
+        """ Without subtypes, the base type is used, and nothing's run. """
+        path = _write_pipeline(tmpdir.strpath, tail="sys.exit(1)")
+        assert Sample is _find_sample_subtype(path)
+        with pytest.raises(ValueError):
+            _find_sample_subtype(path, "Missing")
+        assert not _executed(tmpdir.strpath)
+
+    @staticmethod
+    def test_subtype_in_pipeline(tmpdir):
+        """ A subtype defined by the pipeline itself requires its import. """
+        path = _write_pipeline(tmpdir.strpath, "class RNA(Sample): pass")
+        assert "RNA" == _find_sample_subtype(path).__name__
+        assert _executed(tmpdir.strpath)
+
+    @staticmethod
+    def test_selected_in_interface(module_folder):
+        """ A pipeline's interface section selects how its type's found. """
+        _write(module_folder, SUBTYPE_MODULE + ".py",
+               "from peppy import Sample\nclass Chip(Sample): pass\n")
+        path = _write_pipeline(
+            module_folder, "from {} import Chip".format(SUBTYPE_MODULE))
+        pipeline = {"name": "pipe", "path": path,
+                    SUBTYPE_DISCOVERY_KEY: STATIC_DISCOVERY}
+        piface = PipelineInterface({"protocol_mapping": {"ChIP": "pipe.py"},
+                                    "pipelines": {"pipe.py": pipeline}})
+        subtype = piface.fetch_sample_subtype("ChIP", "pipe.py", path)
+        assert sys.modules[SUBTYPE_MODULE].Chip is subtype
+        assert not _executed(module_folder)
+        piface.pipelines["pipe.py"][SUBTYPE_DISCOVERY_KEY] = "guess"
+        with pytest.raises(PipelineInterfaceConfigError):
+            piface.fetch_sample_subtype("ChIP", "pipe.py", path)
+
+    @staticmethod
+    def test_startup_time(tmpdir):
+        """ Finding a slow-to-import pipeline's type doesn't wait on it. """
+        delay = 0.5
+        pipelines = [_write_pipeline(
+            tmpdir.strpath, "import time\ntime.sleep({})".format(delay),
+            name="pipe{}.py".format(i)) for i in range(2)]
+
+        def startup_time(find_subtype, path):
+            start = time.time()
+            assert Sample is find_subtype(path)
+            return time.time() - start
+
+        import_time = startup_time(_import_sample_subtype, pipelines[0])
+        static_time = startup_time(_find_sample_subtype, pipelines[1])
+        assert import_time >= delay
+        assert static_time < delay / 5, \
+            "Startup time: {:.3f}s importing, {:.3f}s parsing".format(
+                import_time, static_time)
@@ -0,0 +1,290 @@
+""" Tests for project-level summarization of sample outputs """
+
+from collections import OrderedDict
+import os
+import time
+
+import pandas as pd
+import pytest
+from attmap import AttMap
+from looper.looper import LooperCounter, OBJECTS_COLUMNS, \
+    _create_obj_summary, _create_stats_summary
+from looper.sample_status import SampleStatusIndex
+from looper.summary_cache import SummaryCache
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+PROJECT_NAME = "summary_test"
+
+
+class _Sample(object):
+    """ Minimal stand-in for a sample that's summarized. """
+    def __init__(self, name, **sheet_data):
+        self.sample_name = name
+        self.name = name
+        self.protocol = "ATAC"
+        self._sheet = OrderedDict([("sample_name", name)])
+        self._sheet.update(sorted(sheet_data.items()))
+
+    def get_sheet_dict(self):
+        return OrderedDict(self._sheet)
+
+
+class _Project(object):
+    """ Minimal stand-in for a project that's summarized. """
+    def __init__(self, output_dir, samples):
+        self.name = PROJECT_NAME
+        self.subproject = None
+        self.samples = samples
+        self.metadata = AttMap({
+            "output_dir": output_dir,
+            "results_subdir": os.path.join(output_dir, "results_pipeline")})
+
+
+def _write_records(prj, sample_name, filename, records):
+    """ Write tab-separated records to a file in a sample's folder. """
+    folder = os.path.join(prj.metadata.results_subdir, sample_name)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(os.path.join(folder, filename), 'w') as f:
+        for rec in records:
+            f.write("\t".join(rec) + "\n")
+
+
+def _write_stats(prj, sample_name, records):
+    """ Write (key, value, pipeline) records as a sample's stats file. """
+    _write_records(prj, sample_name, "stats.tsv", records)
+
+
+def _write_objects(prj, sample_name, n=2):
+    """ Write a number of object records as a sample's objects file. """
+    _write_records(prj, sample_name, "objects.tsv", [
+        ("obj{}".format(i), "{}_{}.pdf".format(sample_name, i), "Object",
+         "{}_{}.png".format(sample_name, i) if i % 2 else "", "PL1")
+        for i in range(n)])
+
+
+def _rewrite_in_place(prj, sample_name, filename, old, new):
+    """ Replace text in a sample's file, keeping its size and times. """
+    path = os.path.join(prj.metadata.results_subdir, sample_name, filename)
+    st = os.stat(path)
+    with open(path, 'r') as f:
+        text = f.read()
+    assert len(old) == len(new)
+    with open(path, 'w') as f:
+        f.write(text.replace(old, new))
+    os.utime(path, (st.st_atime, st.st_mtime))
+
+
+def _summarize_objects(prj, **kwargs):
+    """ Summarize objects for a project. """
+    return _create_obj_summary(prj, LooperCounter(len(prj.samples)),
+                               SampleStatusIndex.from_project(prj), **kwargs)
+
+
+def _summarize(prj, cache=None):
+    """ Summarize stats for a project, returning the parsed summary file too. """
+    stats, columns = _create_stats_summary(
+        prj, LooperCounter(len(prj.samples)),
+        SampleStatusIndex.from_project(prj), cache=cache)
+    path = os.path.join(prj.metadata.output_dir,
+                        PROJECT_NAME + "_stats_summary.tsv")
+    with open(path, 'r', newline='') as f:
+        rows = [l.split("\t") for l in f.read().split("\r\n")[:-1]]
+    return stats, columns, rows
+
+
+@pytest.fixture(scope="function")
+def prj(tmpdir):
+    """ Provide a project in which some samples have stats. """
+    samples = [_Sample("s0", genome="hg38"), _Sample("s1", genome="mm10"),
+               _Sample("s2", genome="hg38", batch="b2")]
+    return _Project(tmpdir.strpath, samples)
+
+
+class StatsSummaryTests:
+    """ Tests for the aggregation of sample stats files """
+
+    @staticmethod
+    def test_columns_ordered_by_first_appearance(prj):
+        """ Sheet columns precede stats columns, sample by sample. """
+        _write_stats(prj, "s0", [("reads", "10", "PL1")])
+        _write_stats(prj, "s1", [("rate", "0.5", "PL1"), ("reads", "20", "PL1")])
+        _write_stats(prj, "s2", [("reads", "30", "PL1")])
+        _, columns, rows = _summarize(prj)
+        expected = ["sample_name", "genome", "reads", "rate", "batch"]
+        assert expected == columns
+        assert expected == rows[0]
+        assert [["s0", "hg38", "10", "", ""], ["s1", "mm10", "20", "0.5", ""],
+                ["s2", "hg38", "30", "", "b2"]] == rows[1:]
+
+    @staticmethod
+    def test_last_value_for_key_wins(prj):
+        """ A pipeline's repeated key takes its last value. """
+        _write_stats(prj, "s0", [("reads", "1", "PL1"), ("reads", "2", "PL1")])
+        stats, columns, rows = _summarize(prj)
+        assert "2" == stats[0]["reads"]
+        assert ["s0", "hg38", "2", ""] == rows[1]
+
+    @staticmethod
+    def test_key_shared_by_pipelines_is_qualified(prj):
+        """ A key reported by multiple pipelines is prefixed by pipeline. """
+        _write_stats(prj, "s0", [("reads", "1", "PL1"), ("reads", "2", "PL2"),
+                                 ("rate", "0.1", "PL2")])
+        _write_stats(prj, "s1", [("reads", "3", "PL1")])
+        stats, columns, rows = _summarize(prj)
+        assert ["sample_name", "genome", "PL1:reads", "PL2:reads", "rate",
+                "reads", "batch"] == columns
+        assert {"PL1:reads": "1", "PL2:reads": "2", "rate": "0.1"}.items() <= \
+            stats[0].items()
+        assert "reads" not in stats[0]
+        assert ["s1", "mm10", "", "", "", "3", ""] == rows[2]
+
+    @staticmethod
+    def test_values_are_kept_verbatim(prj):
+        """ Stats values aren't reformatted by type inference. """
+        _write_stats(prj, "s0", [("rate", "1.00", "PL1"), ("reads", "007", "PL1")])
+        _write_stats(prj, "s1", [("rate", "1", "PL1"), ("reads", "NA", "PL1")])
+        stats, _, rows = _summarize(prj)
+        assert [("1.00", "007"), ("1", "NA")] == \
+            [(s["rate"], s["reads"]) for s in stats]
+        assert [["s0", "hg38", "1.00", "007", ""],
+                ["s1", "mm10", "1", "NA", ""]] == rows[1:]
+
+    @staticmethod
+    def test_stats_override_sheet_values(prj):
+        """ A stat named like an annotation sheet column takes precedence. """
+        _write_stats(prj, "s0", [("genome", "hg19", "PL1")])
+        stats, columns, rows = _summarize(prj)
+        assert ["sample_name", "genome", "batch"] == columns
+        assert "hg19" == stats[0]["genome"]
+        assert ["s0", "hg19", ""] == rows[1]
+
+    @staticmethod
+    def test_samples_without_stats_contribute_only_columns(prj):
+        """ A sample lacking a stats file has no row but its columns count. """
+        _write_stats(prj, "s1", [("reads", "20", "PL1")])
+        stats, columns, rows = _summarize(prj)
+        assert ["s1"] == [s["sample_name"] for s in stats]
+        assert ["sample_name", "genome", "reads", "batch"] == columns
+        assert [["s1", "mm10", "20", ""]] == rows[1:]
+
+    @staticmethod
+    def test_cached_records_are_reused(prj, tmpdir):
+        """ An unchanged stats file isn't read again; a changed one is. """
+        cache = SummaryCache(os.path.join(tmpdir.strpath, "cache.json"))
+        _write_stats(prj, "s0", [("reads", "10", "PL1")])
+        _summarize(prj, cache)
+        # Same size and time, so the file looks unchanged.
+        _rewrite_in_place(prj, "s0", "stats.tsv", "10", "20")
+        stats, _, rows = _summarize(prj, cache)
+        assert "10" == stats[0]["reads"]
+        assert "10" == rows[1][2]
+        _write_stats(prj, "s0", [("reads", "300", "PL1")])
+        stats, _, _ = _summarize(prj, cache)
+        assert "300" == stats[0]["reads"]
+
+    @staticmethod
+    def test_no_stats(prj):
+        """ Without stats files, the summary has only a header. """
+        stats, columns, rows = _summarize(prj)
+        assert [] == stats
+        assert ["sample_name", "genome", "batch"] == columns
+        assert [columns] == rows
+
+
+class ObjectsSummaryTests:
+    """ Tests for the aggregation of sample objects files """
+
+    @staticmethod
+    def test_matches_files_read_individually(prj):
+        """ The summary has each file's records, labeled and in order. """
+        for s in prj.samples:
+            _write_objects(prj, s.name, n=3)
+        expected = []
+        for s in prj.samples:
+            t = pd.read_csv(
+                os.path.join(prj.metadata.results_subdir, s.name, "objects.tsv"),
+                sep="\t", header=None, names=OBJECTS_COLUMNS)
+            t["sample_name"] = s.name
+            expected.append(t)
+        expected = pd.concat(expected, ignore_index=True)
+        pd.testing.assert_frame_equal(expected, _summarize_objects(prj))
+
+    @staticmethod
+    @pytest.mark.parametrize(["workers", "chunk_size"], [(1, 1), (2, 1), (2, 2)])
+    def test_chunked_parse_matches_whole(prj, workers, chunk_size):
+        """ Parsing in chunks, serially or in a pool, gives the same table. """
+        for s in prj.samples:
+            _write_objects(prj, s.name)
+        pd.testing.assert_frame_equal(
+            _summarize_objects(prj),
+            _summarize_objects(prj, workers=workers, chunk_size=chunk_size))
+
+    @staticmethod
+    def test_samples_without_objects_are_skipped(prj):
+        """ Only samples with an objects file contribute records. """
+        _write_objects(prj, "s1")
+        _write_objects(prj, "s2", n=0)
+        objs = _summarize_objects(prj)
+        assert ["s1", "s1"] == objs["sample_name"].tolist()
+
+    @staticmethod
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_cached_records_are_reused(prj, tmpdir, workers):
+        """ An unchanged objects file isn't read again; a changed one is. """
+        cache = SummaryCache(os.path.join(tmpdir.strpath, "cache.json"))
+        for s in prj.samples:
+            _write_objects(prj, s.name)
+        first = _summarize_objects(prj, cache=cache)
+        _rewrite_in_place(prj, "s0", "objects.tsv", "Object", "Thingy")
+        _write_objects(prj, "s2", n=3)
+        objs = _summarize_objects(
+            prj, workers=workers, chunk_size=1, cache=cache)
+        assert "Thingy" not in objs["anchor_text"].tolist()
+        assert first[first["sample_name"] != "s2"].equals(
+            objs[objs["sample_name"] != "s2"])
+        assert 3 == (objs["sample_name"] == "s2").sum()
+
+    @staticmethod
+    def test_no_objects(prj):
+        """ Without objects files, the summary is empty. """
+        assert _summarize_objects(prj).empty
+
+    @staticmethod
+    def test_sample_names_are_text(tmpdir):
+        """ Numeric-looking sample names aren't converted. """
+        prj = _Project(tmpdir.strpath, [_Sample("01"), _Sample("2")])
+        for s in prj.samples:
+            _write_objects(prj, s.name, n=1)
+        assert ["01", "2"] == _summarize_objects(prj)["sample_name"].tolist()
+
+    @staticmethod
+    def test_scaling_is_linear(request, tmpdir):
+        """ Time per sample doesn't grow with the number of samples. """
+        small, large = 1000, \
+            50000 if request.config.getoption("--full-benchmarks") else 10000
+        prj = _Project(tmpdir.strpath,
+                       [_Sample("sample{}".format(i)) for i in range(large)])
+        for s in prj.samples:
+            _write_objects(prj, s.name)
+        index = SampleStatusIndex.from_project(prj)
+
+        def time_per_sample(n):
+            sub = _Project(tmpdir.strpath, prj.samples[:n])
+            times = []
+            for _ in range(3):
+                start = time.time()
+                _create_obj_summary(sub, LooperCounter(n), index)
+                times.append(time.time() - start)
+            return min(times) / n
+
+        small_time, large_time = time_per_sample(small), time_per_sample(large)
+        # Quadratic growth would make the per-sample time of the larger
+        # project about large/small times that of the smaller one.
+        assert large_time < 3 * small_time, \
+            "Per-sample time: {:.2e}s for {} samples, {:.2e}s for {}".format(
+                small_time, small, large_time, large)
@@ -0,0 +1,147 @@
+""" Tests for the persistent cache of summarized sample outputs """
+
+from collections import OrderedDict
+import json
+import os
+
+import pytest
+from looper.sample_status import IndexedFile
+from looper.summary_cache import SummaryCache, fingerprint
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+SAMPLE_NAME = "sample1"
+RECORDS = [["reads", "10", "PL1"]]
+
+
+@pytest.fixture(scope="function")
+def cache_path(tmpdir):
+    """ Provide a path for a cache file. """
+    return os.path.join(tmpdir.strpath, "summary_cache.json")
+
+
+def _indexed(mtime=1.5, size=10):
+    return IndexedFile(os.path.join("results", SAMPLE_NAME, "stats.tsv"),
+                       mtime, size)
+
+
+class SummaryCacheTests:
+    """ Tests for reuse of values parsed from sample files """
+
+    @staticmethod
+    def test_miss(cache_path):
+        """ Nothing is fetched for a file never stored. """
+        assert SummaryCache(cache_path).get(SAMPLE_NAME, _indexed()) is None
+
+    @staticmethod
+    def test_hit(cache_path):
+        """ A value's fetched for an unchanged file. """
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        assert RECORDS == cache.get(SAMPLE_NAME, _indexed())
+
+    @staticmethod
+    @pytest.mark.parametrize("changed", [_indexed(mtime=2.5), _indexed(size=11)])
+    def test_changed_file_misses(cache_path, changed):
+        """ A value isn't fetched once the file's time or size differs. """
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        assert cache.get(SAMPLE_NAME, changed) is None
+
+    @staticmethod
+    def test_persistence(cache_path):
+        """ Values and page digests survive a save and load. """
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        cache.set_page(cache_path, "abc")
+        cache.save()
+        reloaded = SummaryCache(cache_path)
+        assert RECORDS == reloaded.get(SAMPLE_NAME, _indexed())
+        assert reloaded.page_is_current(cache_path, "abc")
+
+    @staticmethod
+    def test_unused_entries_dropped(tmpdir, cache_path):
+        """ Entries not used in a pass, e.g. of removed samples, aren't saved. """
+        page = os.path.join(tmpdir.strpath, "page.html")
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        cache.put("removed", _indexed(), RECORDS)
+        cache.set_page(page, "abc")
+        cache.set_page(cache_path, "abc")
+        cache.save()
+        cache = SummaryCache(cache_path)
+        assert RECORDS == cache.get(SAMPLE_NAME, _indexed())
+        assert not cache.page_is_current(page, "abc")
+        cache.save()
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+        assert [SAMPLE_NAME] == list(data["files"])
+        assert [page] == list(data["pages"])
+
+    @staticmethod
+    def test_reset(cache_path):
+        """ Existing contents may be disregarded. """
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        cache.save()
+        assert SummaryCache(cache_path, reset=True).get(
+            SAMPLE_NAME, _indexed()) is None
+
+    @staticmethod
+    def test_other_version_is_ignored(cache_path):
+        """ A cache written by a different looper version isn't used. """
+        cache = SummaryCache(cache_path)
+        cache.put(SAMPLE_NAME, _indexed(), RECORDS)
+        cache.save()
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+        data["looper_version"] = "0.0.1"
+        with open(cache_path, 'w') as f:
+            json.dump(data, f)
+        assert SummaryCache(cache_path).get(SAMPLE_NAME, _indexed()) is None
+
+    @staticmethod
+    def test_unreadable_cache_is_ignored(cache_path):
+        """ A corrupt cache file is disregarded rather than an error. """
+        with open(cache_path, 'w') as f:
+            f.write("{not json")
+        assert SummaryCache(cache_path).get(SAMPLE_NAME, _indexed()) is None
+
+    @staticmethod
+    def test_page_must_exist_to_be_current(tmpdir, cache_path):
+        """ A page with a matching digest is stale if it's been removed. """
+        page = os.path.join(tmpdir.strpath, "page.html")
+        cache = SummaryCache(cache_path)
+        cache.set_page(page, "abc")
+        assert not cache.page_is_current(page, "abc")
+        with open(page, 'w'):
+            pass
+        assert cache.page_is_current(page, "abc")
+        assert not cache.page_is_current(page, "def")
+
+
+class FingerprintTests:
+    """ Tests for digests of page inputs """
+
+    @staticmethod
+    def test_argument_order_is_irrelevant():
+        """ The order in which template arguments are given doesn't matter. """
+        assert fingerprint("t.html", dict(a=1, b=[2, 3])) == \
+            fingerprint("t.html", dict(b=[2, 3], a=1))
+
+    @staticmethod
+    def test_ordered_values_are_ordered():
+        """ Rendering order of an ordered mapping is part of the digest. """
+        assert fingerprint("t.html", dict(s=OrderedDict([("x", 1), ("y", 2)]))) != \
+            fingerprint("t.html", dict(s=OrderedDict([("y", 2), ("x", 1)])))
+
+    @staticmethod
+    @pytest.mark.parametrize(["name", "template_vars"],
+                             [("u.html", dict(a=1)), ("t.html", dict(a=2))])
+    def test_inputs_matter(name, template_vars):
+        """ Template name and argument values are part of the digest. """
+        assert fingerprint("t.html", dict(a=1)) != \
+            fingerprint(name, template_vars)
@@ -1,11 +1,13 @@
 """ Tests for utility functions """
 
+import copy
 import os
+import pickle
 import random
 import string
 import pytest
-from looper.utils import determine_config_path, DEFAULT_CONFIG_SUFFIX, \
-    DEFAULT_METADATA_FOLDER
+from looper.utils import determine_config_path, project_snapshot, \
+    DEFAULT_CONFIG_SUFFIX, DEFAULT_METADATA_FOLDER, ProjectSnapshot
 
 __author__ = "Vince Reuter"
 __email__ = "vreuter@virginia.edu"
@@ -81,3 +83,50 @@ class ConfigPathDeterminationTests:
         with open(fp, 'w'):
             assert os.path.isfile(fp)
         assert fp == determine_config_path(root)
+
+
+@pytest.fixture(scope="function")
+def snapshot():
+    """ Provide a snapshot of project data, with nested sections. """
+    return ProjectSnapshot({
+        "metadata": {"output_dir": "out", "pipeline_interfaces": ["pi.yaml"]},
+        "derived_attributes": ["data_source"]})
+
+
+class ProjectSnapshotTests:
+    """ Tests for read-only project data shared by samples """
+
+    @staticmethod
+    @pytest.mark.parametrize("change", [
+        lambda d: d.__setitem__("metadata", {}),
+        lambda d: setattr(d, "derived_attributes", []),
+        lambda d: d.__delitem__("metadata"),
+        lambda d: d.add_entries({"genomes": {}}),
+        lambda d: setattr(d.metadata, "output_dir", "elsewhere"),
+        lambda d: d.metadata.__delitem__("output_dir")])
+    def test_read_only(snapshot, change):
+        """ Neither the snapshot nor its sections may change. """
+        with pytest.raises(TypeError):
+            change(snapshot)
+        assert "out" == snapshot.metadata.output_dir
+
+    @staticmethod
+    def test_copies_are_itself(snapshot):
+        """ Copying a read-only snapshot needn't copy its data. """
+        assert copy.copy(snapshot) is snapshot
+        assert copy.deepcopy(snapshot) is snapshot
+
+    @staticmethod
+    def test_pickle(snapshot):
+        """ A snapshot survives pickling, still read-only. """
+        restored = pickle.loads(pickle.dumps(snapshot))
+        assert snapshot == restored
+        with pytest.raises(TypeError):
+            restored.metadata.output_dir = "elsewhere"
+
+    @staticmethod
+    def test_sections(snapshot):
+        """ Only sample-independent sections of a project are taken. """
+        prj = dict(snapshot.items())
+        prj["samples"] = []
+        assert snapshot == project_snapshot(prj)
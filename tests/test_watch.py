@@ -0,0 +1,216 @@
+""" Tests for watching a project's sample table and submitting as it grows """
+
+import os
+
+import pytest
+import yaml
+from looper import build_parser
+import looper.looper
+from looper.looper import Runner
+from looper.project import Project
+from looper.watch import SampleTableWatcher
+from tests.test_conductor import _read_submissions, _write_fake_submit
+from tests.test_submission_scripts import prj
+
+
+__author__ = "Vince Reuter"
+__email__ = "vreuter@virginia.edu"
+
+
+PIPELINE_INTERFACE_DATA = {
+    "protocol_mapping": {"ATAC": "atac.py", "WGBS": "wgbs.py"},
+    "pipelines": {
+        "atac.py": {"name": "ATAC", "path": "atac.py",
+                    "required_input_files": ["file"],
+                    "arguments": {"--input": "file"}},
+        "wgbs.py": {"name": "WGBS", "path": "wgbs.py"}}}
+
+
+def _write_table(folder, rows):
+    """ Write a project's sample table, with each row's sample's file. """
+    with open(os.path.join(folder, "samples.csv"), 'w') as f:
+        f.write("\n".join(["sample_name,protocol,file"] + [
+            "{0},{1},{2}".format(n, p, os.path.join(folder, n + ".txt"))
+            for n, p in rows]) + "\n")
+
+
+def _write_project(folder, rows):
+    """ Write a project's files, returning the path to its config file. """
+    _write_table(folder, rows)
+    for pipeline in PIPELINE_INTERFACE_DATA["pipelines"]:
+        with open(os.path.join(folder, pipeline), 'w') as f:
+            f.write("#!/usr/bin/env python\n")
+    with open(os.path.join(folder, "piface.yaml"), 'w') as f:
+        yaml.dump(PIPELINE_INTERFACE_DATA, f)
+    with open(os.path.join(folder, "prj.yaml"), 'w') as f:
+        yaml.dump({"metadata": {
+            "sample_table": "samples.csv", "output_dir": "out",
+            "pipeline_interfaces": "piface.yaml"}}, f)
+    return os.path.join(folder, "prj.yaml")
+
+
+def _touch_input(folder, name):
+    """ Write a sample's input file. """
+    open(os.path.join(folder, name + ".txt"), 'w').close()
+
+
+class _ScriptedTime(object):
+    """ Stand-in for the time module whose sleep does the next step instead. """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+
+    def sleep(self, _):
+        self.steps.pop(0)()
+
+
+class SampleTableWatcherTests:
+    """ Tests for finding the samples added to or changed in a table """
+
+    @staticmethod
+    def test_unchanged_table(tmpdir):
+        """ Nothing's built while the table's file is unchanged. """
+        folder = tmpdir.strpath
+        prj = Project(_write_project(folder, [("a", "ATAC"), ("b", "WGBS")]))
+        assert [] == SampleTableWatcher(prj).changed_samples()
+
+    @staticmethod
+    def test_new_and_changed_rows(tmpdir):
+        """ Only the samples of new and changed rows are built. """
+        folder = tmpdir.strpath
+        prj = Project(_write_project(
+            folder, [("a", "ATAC"), ("b", "WGBS"), ("c", "ATAC")]))
+        watcher = SampleTableWatcher(prj)
+        _write_table(folder, [("a", "ATAC"), ("b", "ATAC"), ("c", "ATAC"),
+                              ("d", "WGBS")])
+        assert [("b", "ATAC"), ("d", "WGBS")] == \
+            [(s.name, s.protocol) for s in watcher.changed_samples()]
+        assert [] == watcher.changed_samples()
+        assert ["a", "b", "c", "d"] == [s.name for s in prj.samples]
+
+
+class ConductorFlushTests:
+    """ Tests for submitting jobs that aren't full, after a timeout """
+
+    @staticmethod
+    @pytest.mark.parametrize(["timeout", "submitted"],
+                             [(3600, False), (0, True)])
+    def test_partial_job_flushed(prj, timeout, submitted):
+        """ A job that's not full is submitted once its samples have waited. """
+        prj.dcc.compute.submission_command = \
+            _write_fake_submit(prj.metadata.output_dir)
+        conductors, _ = looper.looper.process_protocols(
+            prj, {"ATAC"}, max_cmds=3)
+        conductor = conductors["pepatac.py"]
+        conductor.add_sample(next(s for s in prj.samples
+                                  if s.protocol == "ATAC"))
+        assert submitted == conductor.flush(timeout)
+        assert (1 if submitted else 0) == conductor.num_cmd_submissions
+        # What's still waiting is submitted once it's waited long enough.
+        assert submitted != conductor.flush(0)
+        assert 1 == conductor.num_cmd_submissions
+
+
+class WatchedRunTests:
+    """ Tests for a run that submits samples as they become ready """
+
+    @staticmethod
+    def test_samples_submitted_as_ready(tmpdir, monkeypatch):
+        """ New samples, and those whose inputs appear, are submitted. """
+        folder = tmpdir.strpath
+        config_file = _write_project(
+            folder, [("a", "ATAC"), ("b", "ATAC"), ("c", "WGBS")])
+        _touch_input(folder, "a")
+        args = build_parser().parse_args(
+            ["run", "--watch", "--watch-interval", "1", config_file])
+        prj = Project(args.config_file)
+        prj.dcc.compute.submission_command = _write_fake_submit(folder)
+
+        def update_inputs():
+            _touch_input(folder, "b")
+            _touch_input(folder, "d")
+            _write_table(folder, [("a", "ATAC"), ("b", "ATAC"),
+                                  ("c", "WGBS"), ("d", "ATAC")])
+
+        def stop():
+            raise KeyboardInterrupt
+
+        clock = _ScriptedTime([update_inputs, stop])
+        monkeypatch.setattr(looper.looper, "time", clock)
+        Runner(prj)(args, [])
+        assert not clock.steps
+        assert ["atac.py_a", "wgbs.py_c", "atac.py_d", "atac.py_b"] == \
+            [os.path.basename(script).split(".sub")[0]
+             for _, script in _read_submissions(folder)]
+
+    @staticmethod
+    def test_waiting_sample_skipped_once(tmpdir, monkeypatch):
+        """ A sample still lacking inputs isn't held again at each look. """
+        folder = tmpdir.strpath
+        config_file = _write_project(
+            folder, [("a", "ATAC"), ("b", "ATAC"), ("c", "WGBS")])
+        _touch_input(folder, "a")
+        args = build_parser().parse_args(
+            ["run", "--watch", "--watch-interval", "1", "--lumpn", "2",
+             config_file])
+        prj = Project(args.config_file)
+        prj.dcc.compute.submission_command = _write_fake_submit(folder)
+
+        def wait():
+            pass
+
+        def stop():
+            raise KeyboardInterrupt
+
+        clock = _ScriptedTime(
+            [wait, wait, wait, lambda: _touch_input(folder, "b"), stop])
+        monkeypatch.setattr(looper.looper, "time", clock)
+        Runner(prj)(args, [])
+        assert not clock.steps
+        assert ["atac.py_lump1", "wgbs.py_lump1"] == \
+            [os.path.basename(script).split(".sub")[0]
+             for _, script in _read_submissions(folder)]
+        assert [] == [f for f in os.listdir(prj.metadata.submission_subdir)
+                      if "skipped" in f]
+
+    @staticmethod
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_waiting_sample_skipped_once_per_job(tmpdir, monkeypatch, stream):
+        """ With a job per sample, a waiting sample is held only once. """
+        folder = tmpdir.strpath
+        config_file = _write_project(
+            folder, [("a", "ATAC"), ("b", "ATAC"), ("c", "WGBS")])
+        _touch_input(folder, "a")
+        args = build_parser().parse_args(
+            ["run", "--watch", "--watch-interval", "1"] +
+            (["--stream"] if stream else []) + [config_file])
+        prj = Project(args.config_file)
+        prj.dcc.compute.submission_command = _write_fake_submit(folder)
+
+        # The waiting sample's script, whether skipped or submitted
+        script = os.path.join(prj.metadata.submission_subdir, "atac.py_b.sub")
+
+        def clear_skipped():
+            # A streamed run writes the waiting sample's script at once.
+            assert stream == os.path.isfile(script)
+            if stream:
+                os.remove(script)
+
+        def wait():
+            assert not os.path.exists(script)
+
+        def stop():
+            os.remove(script)
+            raise KeyboardInterrupt
+
+        clock = _ScriptedTime(
+            [clear_skipped, wait, wait, lambda: _touch_input(folder, "b"),
+             stop])
+        monkeypatch.setattr(looper.looper, "time", clock)
+        Runner(prj)(args, [])
+        assert not clock.steps
+        assert ["atac.py_a", "wgbs.py_c", "atac.py_b"] == \
+            [os.path.basename(script).split(".sub")[0]
+             for _, script in _read_submissions(folder)]
+        # Once submitted, the sample isn't written again as skipped.
+        assert not os.path.exists(script)